@@ -3,7 +3,8 @@ from django.utils.html import format_html
 from .models import (
     QualityDefectType,
     WcmChecklistTemplate, WcmChecklistItem, WcmChecklistTemplateItem, WcmLostTimeReason,
-    SpecItem, ParamItem, ProfileTemplate, ProfileSpecValue, ProfileParamValue
+    SpecItem, ParamItem, ProfileTemplate, ProfileSpecValue, ProfileParamValue,
+    ProductionAlertRule
 )
 
 
@@ -242,4 +243,28 @@ class ProfileTemplateAdmin(admin.ModelAdmin):
         if obj.belt_speed_m_per_minute:
             return f"{obj.belt_speed_m_per_minute} m/min"
         return "-"
-    belt_speed_display.short_description = "Vitesse tapis"
\ No newline at end of file
+    belt_speed_display.short_description = "Vitesse tapis"
+
+
+# ALERTES - Admin
+@admin.register(ProductionAlertRule)
+class ProductionAlertRuleAdmin(admin.ModelAdmin):
+    """Administration des règles d'alerte de production."""
+    
+    list_display = ['name', 'code', 'scope', 'metric', 'comparison', 'threshold', 'danger_threshold', 'severity', 'is_active']
+    list_filter = ['scope', 'metric', 'severity', 'is_active']
+    list_editable = ['threshold', 'danger_threshold', 'is_active']
+    search_fields = ['name', 'code']
+    ordering = ['scope', 'order', 'name']
+    
+    fieldsets = (
+        ('Identification', {
+            'fields': ('code', 'name', 'order', 'is_active')
+        }),
+        ('Condition', {
+            'fields': ('scope', 'metric', 'comparison', 'threshold', 'danger_threshold')
+        }),
+        ('Affichage', {
+            'fields': ('severity', 'message')
+        }),
+    )
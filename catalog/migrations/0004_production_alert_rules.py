@@ -0,0 +1,76 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:09
+
+from django.db import migrations, models
+
+
+# Règles reprenant les seuils historiques du dashboard, plus des exemples désactivés
+DEFAULT_RULES = [
+    {
+        'code': 'trs_low', 'name': 'TRS faible', 'scope': 'shift', 'metric': 'trs',
+        'comparison': 'below', 'threshold': 60, 'danger_threshold': 50, 'severity': 'warning',
+        'message': 'TRS faible pour {shift_id}: {value}%', 'order': 1,
+    },
+    {
+        'code': 'trs_below_target', 'name': "TRS sous l'objectif du profil", 'scope': 'shift', 'metric': 'trs',
+        'comparison': 'below', 'threshold': None, 'severity': 'warning',
+        'message': "TRS sous l'objectif pour {shift_id}: {value}% (objectif {threshold}%)", 'order': 2,
+        'is_active': False,
+    },
+    {
+        'code': 'blocking_defects_rate_high', 'name': 'Taux de défauts bloquants élevé', 'scope': 'shift',
+        'metric': 'blocking_defects_rate', 'comparison': 'above', 'threshold': 20, 'severity': 'warning',
+        'message': 'Défauts bloquants pour {shift_id}: {value}% des rouleaux', 'order': 3,
+        'is_active': False,
+    },
+    {
+        'code': 'blocking_defects_high', 'name': 'Défauts bloquants élevés', 'scope': 'day',
+        'metric': 'blocking_defects', 'comparison': 'above', 'threshold': 10, 'severity': 'danger',
+        'message': "{value} défauts bloquants aujourd'hui", 'order': 1,
+    },
+    {
+        'code': 'lost_time_high', 'name': 'Temps perdu élevé', 'scope': 'day',
+        'metric': 'lost_time', 'comparison': 'above', 'threshold': 120, 'severity': 'warning',
+        'message': "{value} minutes de temps perdu aujourd'hui", 'order': 2,
+    },
+]
+
+
+def create_default_rules(apps, schema_editor):
+    ProductionAlertRule = apps.get_model('catalog', 'ProductionAlertRule')
+    for rule in DEFAULT_RULES:
+        ProductionAlertRule.objects.get_or_create(code=rule['code'], defaults=rule)
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('catalog', '0003_allow_checklist_item_deletion'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='ProductionAlertRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.SlugField(help_text="Type d'alerte renvoyé au dashboard (ex: trs_low)", unique=True, verbose_name='Code')),
+                ('name', models.CharField(max_length=100, verbose_name='Nom de la règle')),
+                ('scope', models.CharField(choices=[('shift', 'Poste'), ('day', 'Journée')], default='shift', max_length=10, verbose_name='Portée')),
+                ('metric', models.CharField(choices=[('trs', 'TRS (%)'), ('blocking_defects', 'Défauts bloquants'), ('blocking_defects_rate', 'Défauts bloquants par rouleau (%)'), ('lost_time', 'Temps perdu (min)')], max_length=30, verbose_name='Indicateur')),
+                ('comparison', models.CharField(choices=[('below', 'Inférieur à'), ('above', 'Supérieur à')], max_length=10, verbose_name='Comparaison')),
+                ('threshold', models.DecimalField(blank=True, decimal_places=2, help_text='Vide : objectif TRS du profil (indicateur TRS uniquement)', max_digits=10, null=True, verbose_name='Seuil')),
+                ('danger_threshold', models.DecimalField(blank=True, decimal_places=2, help_text="Au-delà de ce seuil, l'alerte passe en sévérité critique", max_digits=10, null=True, verbose_name='Seuil critique')),
+                ('severity', models.CharField(choices=[('warning', 'Avertissement'), ('danger', 'Critique')], default='warning', max_length=10, verbose_name='Sévérité')),
+                ('message', models.CharField(help_text='Variables : {value}, {threshold}, {shift_id}, {date}', max_length=200, verbose_name='Message')),
+                ('order', models.IntegerField(default=0, verbose_name="Ordre d'affichage")),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': "Règle d'alerte de production",
+                'verbose_name_plural': "Règles d'alerte de production",
+                'ordering': ['scope', 'order', 'name'],
+            },
+        ),
+        migrations.RunPython(create_default_rules, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,7 @@
+import string
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
 from django.db import models
 
 
@@ -646,4 +650,175 @@ class ProfileParamValue(models.Model):
         # Si c'est un paramètre de vitesse tapis, forcer le recalcul du profil
         if self.param_item.name.lower() in ['belt_speed', 'speed_belt', 'vitesse_tapis', 'vitesse tapis']:
             # Forcer le recalcul en sauvegardant le profil
-            self.profile.save()
\ No newline at end of file
+            self.profile.save()
+
+
+# ALERTES - Règles d'alerte de production
+class ProductionAlertRule(models.Model):
+    """Règle d'alerte déclarative évaluée sur les données agrégées de production."""
+    
+    SCOPE_CHOICES = [
+        ('shift', 'Poste'),
+        ('day', 'Journée'),
+    ]
+    
+    METRIC_CHOICES = [
+        ('trs', 'TRS (%)'),
+        ('blocking_defects', 'Défauts bloquants'),
+        ('blocking_defects_rate', 'Défauts bloquants par rouleau (%)'),
+        ('lost_time', 'Temps perdu (min)'),
+    ]
+    
+    COMPARISON_CHOICES = [
+        ('below', 'Inférieur à'),
+        ('above', 'Supérieur à'),
+    ]
+    
+    SEVERITY_CHOICES = [
+        ('warning', 'Avertissement'),
+        ('danger', 'Critique'),
+    ]
+    
+    # Identification
+    code = models.SlugField(
+        max_length=50,
+        unique=True,
+        verbose_name="Code",
+        help_text="Type d'alerte renvoyé au dashboard (ex: trs_low)"
+    )
+    
+    name = models.CharField(
+        max_length=100,
+        verbose_name="Nom de la règle"
+    )
+    
+    # Condition
+    scope = models.CharField(
+        max_length=10,
+        choices=SCOPE_CHOICES,
+        default='shift',
+        verbose_name="Portée"
+    )
+    
+    metric = models.CharField(
+        max_length=30,
+        choices=METRIC_CHOICES,
+        verbose_name="Indicateur"
+    )
+    
+    comparison = models.CharField(
+        max_length=10,
+        choices=COMPARISON_CHOICES,
+        verbose_name="Comparaison"
+    )
+    
+    threshold = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Seuil",
+        help_text="Vide : objectif TRS du profil (indicateur TRS uniquement)"
+    )
+    
+    danger_threshold = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Seuil critique",
+        help_text="Au-delà de ce seuil, l'alerte passe en sévérité critique"
+    )
+    
+    # Affichage
+    severity = models.CharField(
+        max_length=10,
+        choices=SEVERITY_CHOICES,
+        default='warning',
+        verbose_name="Sévérité"
+    )
+    
+    message = models.CharField(
+        max_length=200,
+        verbose_name="Message",
+        help_text="Variables : {value}, {threshold}, {shift_id}, {date}"
+    )
+    
+    # Configuration
+    order = models.IntegerField(
+        default=0,
+        verbose_name="Ordre d'affichage"
+    )
+    
+    is_active = models.BooleanField(
+        default=True,
+        verbose_name="Active"
+    )
+    
+    # Métadonnées
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Règle d'alerte de production"
+        verbose_name_plural = "Règles d'alerte de production"
+        ordering = ['scope', 'order', 'name']
+    
+    def __str__(self):
+        return f"{self.name} ({self.get_scope_display()})"
+    
+    # Variables disponibles dans le message (valeurs les plus longues possibles,
+    # pour la validation : seuil sur 10 chiffres, identifiant de poste sur 50)
+    MESSAGE_VARIABLES = {
+        'value': -12345678.123456789,
+        'threshold': -12345678.12,
+        'shift_id': 'X' * 50,
+        'date': '31/12/2025',
+    }
+    
+    @staticmethod
+    def get_message_max_length():
+        """Longueur maximale du message d'une alerte (ProductionAlert.message)."""
+        return apps.get_model('management', 'ProductionAlert')._meta.get_field('message').max_length
+    
+    def clean(self):
+        """Refuser un message que l'alerte ne pourrait pas formater."""
+        super().clean()
+        if not self.message:
+            return
+        try:
+            for _, field_name, _, _ in string.Formatter().parse(self.message):
+                if field_name is not None and field_name not in self.MESSAGE_VARIABLES:
+                    raise ValidationError({'message': (
+                        f"Variable inconnue « {{{field_name}}} ». "
+                        f"Variables disponibles : {', '.join('{' + name + '}' for name in self.MESSAGE_VARIABLES)}"
+                    )})
+            rendered = self.message.format(**self.MESSAGE_VARIABLES)
+        except (ValueError, IndexError, KeyError) as e:
+            raise ValidationError({'message': f"Message invalide : {e}"})
+        
+        max_length = self.get_message_max_length()
+        if len(rendered) > max_length:
+            raise ValidationError({'message': (
+                f"Message trop long une fois les variables remplacées "
+                f"({len(rendered)} caractères, maximum {max_length})"
+            )})
+    
+    def format_message(self, value, threshold, shift_id='', date=''):
+        """Message de l'alerte (message par défaut si le texte saisi est invalide)."""
+        try:
+            return self.message.format(value=value, threshold=threshold, shift_id=shift_id, date=date)
+        except (ValueError, IndexError, KeyError, AttributeError):
+            return f"{self.name} : {value} (seuil {threshold}) {shift_id or date}"
+    
+    def is_triggered(self, value, threshold):
+        """Indique si la valeur déclenche l'alerte pour ce seuil."""
+        if self.comparison == 'below':
+            return value < threshold
+        return value > threshold
+    
+    def get_severity(self, value):
+        """Sévérité de l'alerte, critique au-delà du seuil critique."""
+        if self.danger_threshold is not None and self.is_triggered(value, self.danger_threshold):
+            return 'danger'
+        return self.severity
@@ -1,3 +1,62 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase
+
+from .models import ProductionAlertRule
+
+
+class ProductionAlertRuleTests(SimpleTestCase):
+    """Condition, sévérité et validation du message des règles d'alerte."""
+
+    def build_rule(self, **kwargs):
+        values = {
+            'code': 'trs_low',
+            'name': 'TRS faible',
+            'metric': 'trs',
+            'comparison': 'below',
+            'threshold': Decimal('60'),
+            'danger_threshold': Decimal('40'),
+            'message': 'TRS {value:.1f}% sous {threshold}% ({shift_id})',
+        }
+        values.update(kwargs)
+        return ProductionAlertRule(**values)
+
+    def test_comparison(self):
+        below, above = self.build_rule(), self.build_rule(comparison='above')
+
+        self.assertTrue(below.is_triggered(59.9, 60.0))
+        self.assertFalse(below.is_triggered(60.0, 60.0))
+        self.assertTrue(above.is_triggered(60.1, 60.0))
+        self.assertFalse(above.is_triggered(60.0, 60.0))
+
+    def test_severity_escalates_past_danger_threshold(self):
+        rule = self.build_rule()
+
+        self.assertEqual(rule.get_severity(50), 'warning')
+        self.assertEqual(rule.get_severity(39), 'danger')
+        self.assertEqual(self.build_rule(danger_threshold=None).get_severity(10), 'warning')
+
+    def test_format_message(self):
+        rule = self.build_rule()
+
+        self.assertEqual(rule.format_message(55.25, 60.0, shift_id='P1'), 'TRS 55.2% sous 60.0% (P1)')
+        # Texte invalide enregistré sans validation : message par défaut
+        rule.message = '{valeur}'
+        self.assertEqual(rule.format_message(55, 60.0, shift_id='P1'), 'TRS faible : 55 (seuil 60.0) P1')
+
+    def test_clean_rejects_unknown_variable(self):
+        with self.assertRaises(ValidationError) as context:
+            self.build_rule(message='TRS {valeur}').clean()
+        self.assertIn('message', context.exception.message_dict)
+
+    def test_clean_rejects_invalid_format(self):
+        with self.assertRaises(ValidationError):
+            self.build_rule(message='TRS {value:%}x {').clean()
+
+    def test_clean_bounds_rendered_length(self):
+        max_length = ProductionAlertRule.get_message_max_length()
+
+        with self.assertRaises(ValidationError):
+            self.build_rule(message=f'{{value:>{max_length + 1}}}').clean()
+        self.build_rule(message=f'{{shift_id}}{"x" * (max_length - 50)}').clean()
@@ -1,3 +1,17 @@
 from django.contrib import admin
+from .models import ExportQueueItem
 
-# Register your models here.
+
+@admin.register(ExportQueueItem)
+class ExportQueueItemAdmin(admin.ModelAdmin):
+    """Administration de la file d'attente des exports Excel."""
+    
+    list_display = ['kind', 'object_id', 'action', 'attempts', 'created_at', 'updated_at']
+    list_filter = ['kind', 'action']
+    search_fields = ['object_id']
+    ordering = ['created_at']
+    readonly_fields = ['kind', 'object_id', 'action', 'attempts', 'last_error', 'created_at', 'updated_at']
+    
+    def has_add_permission(self, request):
+        """Les entrées sont créées uniquement par les signaux."""
+        return False
@@ -0,0 +1,165 @@
+import json
+import os
+import time
+
+
+def atomic_write_json(path, data):
+    """Écrire un JSON dans un fichier temporaire puis le renommer (remplacement atomique)."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class ExportRowIndex:
+    """
+    Index persistant ID en base → numéro de ligne d'un fichier d'export.
+
+    Stocké à côté du classeur (ex: rolls_export.index.json), il évite de
+    parcourir la colonne A pour retrouver la ligne d'un rouleau ou d'un shift.
+    Si le fichier Excel a été modifié en dehors de l'exporter, l'index est
+    reconstruit en un seul parcours.
+
+    max_row est le nombre de lignes physiquement présentes dans le classeur,
+    pending_rows celles écrites dans des fichiers partiels pas encore fusionnés.
+    Les numéros de ligne de l'index sont ceux qu'auront les lignes après fusion.
+    """
+
+    def __init__(self, workbook_path):
+        self.path = os.path.splitext(workbook_path)[0] + '.index.json'
+        self.rows = {}
+        self.max_row = 1
+        self.pending_rows = 0
+
+    def load_file(self):
+        """Charger l'index depuis le disque sans ouvrir le classeur."""
+        self.rows = {}
+        self.max_row = None
+        self.pending_rows = 0
+
+        if not os.path.exists(self.path):
+            return False
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (ValueError, OSError):
+            return False
+
+        self.rows = {int(k): v for k, v in data.get('rows', {}).items()}
+        self.max_row = data.get('max_row', 1)
+        self.pending_rows = data.get('pending_rows', 0)
+        return True
+
+    def load(self, ws):
+        """Charger l'index et le reconstruire s'il ne correspond pas à la feuille."""
+        self.load_file()
+        if self.max_row != ws.max_row:
+            self.rebuild(ws)
+
+    def rebuild(self, ws):
+        """Reconstruire l'index en parcourant une fois la colonne A."""
+        self.rows = {}
+        for row_num, (value,) in enumerate(
+            ws.iter_rows(min_row=2, max_col=1, values_only=True), start=2
+        ):
+            if value is not None:
+                self.rows[value] = row_num
+        self.max_row = ws.max_row
+        self.pending_rows = 0
+
+    def find(self, ws, object_id):
+        """Retourner la ligne d'un objet, en vérifiant la cellule pointée."""
+        row_num = self.rows.get(object_id)
+        if row_num is None:
+            return None
+
+        if ws.cell(row=row_num, column=1).value != object_id:
+            # Index désynchronisé : reconstruction complète
+            self.rebuild(ws)
+            return self.rows.get(object_id)
+
+        return row_num
+
+    def add(self, object_id, row_num):
+        """Enregistrer la ligne d'un objet ajouté."""
+        self.rows[object_id] = row_num
+
+    def remove(self, object_id):
+        """Retirer un objet et décaler les lignes suivantes."""
+        row_num = self.rows.pop(object_id, None)
+        if row_num is None:
+            return None
+
+        for key, value in self.rows.items():
+            if value > row_num:
+                self.rows[key] = value - 1
+        return row_num
+
+    def save(self, ws=None):
+        """Écrire l'index sur disque après la sauvegarde du classeur."""
+        if ws is not None:
+            self.max_row = ws.max_row
+        atomic_write_json(self.path, {
+            'max_row': self.max_row,
+            'pending_rows': self.pending_rows,
+            'rows': self.rows
+        })
+
+    def reset(self):
+        """Supprimer l'index (rotation ou suppression du classeur)."""
+        self.rows = {}
+        self.max_row = 1
+        self.pending_rows = 0
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class ExportMetadata:
+    """
+    Métadonnées légères d'un fichier d'export (ex: rolls_export.meta.json).
+
+    Contient le nombre de lignes de données, mis à jour par l'exporter à
+    chaque écriture : la décision de rotation et le statut de l'export
+    coûtent une petite lecture au lieu d'un chargement du classeur.
+    """
+
+    def __init__(self, workbook_path):
+        self.path = os.path.splitext(workbook_path)[0] + '.meta.json'
+
+    def read(self):
+        """Lire les métadonnées (None si absentes ou illisibles)."""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return None
+
+    def update(self, **values):
+        """Mettre à jour certaines valeurs en conservant les autres."""
+        data = self.read() or {}
+        data.update(values)
+        data['updated_at'] = time.time()
+        atomic_write_json(self.path, data)
+        return data
+
+    def record_lock_wait(self, wait_ms):
+        """Cumuler les temps d'attente du verrou d'écriture (contention)."""
+        data = self.read() or {}
+        lock = data.get('lock', {})
+        lock['acquisitions'] = lock.get('acquisitions', 0) + 1
+        lock['last_wait_ms'] = wait_ms
+        lock['max_wait_ms'] = max(lock.get('max_wait_ms', 0), wait_ms)
+        lock['total_wait_ms'] = round(lock.get('total_wait_ms', 0) + wait_ms, 1)
+        if wait_ms >= 10:
+            lock['contended'] = lock.get('contended', 0) + 1
+        data['lock'] = lock
+        atomic_write_json(self.path, data)
+
+    def reset(self):
+        """Remettre le compteur à zéro (rotation du classeur), sans perdre les statistiques du verrou."""
+        data = self.read() or {}
+        data.pop('row_count', None)
+        atomic_write_json(self.path, data)
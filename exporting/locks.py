@@ -0,0 +1,95 @@
+import logging
+import os
+import time
+from functools import wraps
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+class ExportFileLock:
+    """
+    Verrou inter-processus autour des écritures d'un fichier d'export.
+
+    Plusieurs workers Gunicorn (ou le worker de la file d'attente) peuvent
+    écrire le même classeur : le verrou (fichier <nom>.lock) sérialise les
+    cycles chargement/modification/sauvegarde. Il est réentrant pour un même
+    exporter, et le temps d'attente est enregistré dans les métadonnées.
+    """
+
+    def __init__(self, workbook_path, meta=None):
+        self.path = os.path.splitext(workbook_path)[0] + '.lock'
+        self.meta = meta
+        self.wait_time = 0
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self._depth += 1
+        if self._depth > 1:
+            return self
+
+        started = time.monotonic()
+        self._file = open(self.path, 'a+')
+        try:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            else:
+                self._file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(0.05)
+        except Exception:
+            self._file.close()
+            self._file = None
+            self._depth -= 1
+            raise
+
+        self.wait_time = time.monotonic() - started
+        wait_ms = round(self.wait_time * 1000, 1)
+
+        if self.wait_time >= 0.5:
+            logger.warning(f"Verrou export {os.path.basename(self.path)} obtenu après {wait_ms} ms")
+        else:
+            logger.debug(f"Verrou export {os.path.basename(self.path)} obtenu après {wait_ms} ms")
+
+        if self.meta is not None:
+            try:
+                self.meta.record_lock_wait(wait_ms)
+            except OSError as e:
+                logger.error(f"Erreur enregistrement attente verrou: {str(e)}")
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._depth -= 1
+        if self._depth > 0:
+            return False
+
+        try:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+        return False
+
+
+def with_export_lock(method):
+    """Décorateur : exécuter une méthode d'exporter sous son verrou (self.lock)."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
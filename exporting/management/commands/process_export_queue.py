@@ -0,0 +1,58 @@
+import time
+from django.core.management.base import BaseCommand
+from exporting.services import ExportQueueService
+
+
+class Command(BaseCommand):
+    help = 'Traite la file d\'attente des exports Excel (rouleaux et shifts) par lots'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Tourner en continu (mode worker)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Pause en secondes entre deux passages en mode --loop (défaut: 5)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Nombre maximum d\'entrées traitées par fichier et par passage (défaut: 500)',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        batch_size = options['batch_size']
+
+        if not options['loop']:
+            self.process(batch_size)
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'Worker export démarré (intervalle {interval}s)'))
+        try:
+            while True:
+                processed = self.process(batch_size)
+                # Enchaîner directement tant que la file n'est pas vide
+                if not processed:
+                    time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write('\nWorker export arrêté')
+
+    def process(self, batch_size):
+        """Effectue un passage sur la file et affiche le résultat."""
+        stats = ExportQueueService.process_pending(batch_size=batch_size)
+        processed = stats['roll'] + stats['shift']
+
+        if processed:
+            self.stdout.write(
+                f"{stats['roll']} rouleau(x), {stats['shift']} shift(s) exporté(s)"
+            )
+        if stats['errors']:
+            self.stdout.write(self.style.ERROR(f"{stats['errors']} entrée(s) en erreur"))
+
+        return processed
@@ -0,0 +1,45 @@
+import os
+import time
+from django.core.management.base import BaseCommand
+from exporting.rebuild import ExportRebuildService
+
+
+class Command(BaseCommand):
+    help = 'Régénère entièrement les fichiers d\'export Excel (rouleaux et shifts) depuis la base'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            choices=['rolls', 'shifts'],
+            help='Ne régénérer qu\'un seul export',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Nombre de process en parallèle (défaut: nombre de CPU)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Nombre de lignes par fichier (défaut: seuil de rotation de l\'exporter)',
+        )
+
+    def handle(self, *args, **options):
+        service = ExportRebuildService(
+            workers=options['workers'],
+            chunk_size=options['chunk_size']
+        )
+        kinds = [options['only']] if options['only'] else ['rolls', 'shifts']
+
+        for kind in kinds:
+            started = time.monotonic()
+            self.stdout.write(f'Régénération de l\'export {kind}...')
+            result = service.rebuild(kind)
+            elapsed = time.monotonic() - started
+
+            self.stdout.write(self.style.SUCCESS(
+                f"  ✓ {result['rows']} ligne(s) en {result['files']} fichier(s) ({elapsed:.1f}s)"
+            ))
+            if result['previous_archives']:
+                self.stdout.write(f"  Anciennes archives déplacées dans {result['previous_archives']}")
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportQueueItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('roll', 'Rouleau'), ('shift', 'Poste')], max_length=10, verbose_name="Type d'objet")),
+                ('object_id', models.PositiveBigIntegerField(help_text="ID en base du rouleau ou du poste (colonne A de l'Excel)", verbose_name="ID de l'objet")),
+                ('action', models.CharField(choices=[('upsert', 'Ajout / mise à jour'), ('delete', 'Suppression')], default='upsert', max_length=10, verbose_name='Action')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentatives')),
+                ('last_error', models.TextField(blank=True, verbose_name='Dernière erreur')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Export en attente',
+                'verbose_name_plural': 'Exports en attente',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['kind', 'created_at'], name='exporting_e_kind_9bee78_idx')],
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+    ]
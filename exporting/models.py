@@ -1,3 +1,62 @@
 from django.db import models
 
-# Create your models here.
+
+class ExportQueueItem(models.Model):
+    """File d'attente (outbox) des exports Excel à traiter par le worker."""
+
+    KIND_CHOICES = [
+        ('roll', 'Rouleau'),
+        ('shift', 'Poste'),
+    ]
+
+    ACTION_CHOICES = [
+        ('upsert', 'Ajout / mise à jour'),
+        ('delete', 'Suppression'),
+    ]
+
+    # Objet concerné
+    kind = models.CharField(
+        max_length=10,
+        choices=KIND_CHOICES,
+        verbose_name="Type d'objet"
+    )
+
+    object_id = models.PositiveBigIntegerField(
+        verbose_name="ID de l'objet",
+        help_text="ID en base du rouleau ou du poste (colonne A de l'Excel)"
+    )
+
+    action = models.CharField(
+        max_length=10,
+        choices=ACTION_CHOICES,
+        default='upsert',
+        verbose_name="Action"
+    )
+
+    # Suivi du traitement
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Tentatives"
+    )
+
+    last_error = models.TextField(
+        blank=True,
+        verbose_name="Dernière erreur"
+    )
+
+    # Métadonnées
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Export en attente"
+        verbose_name_plural = "Exports en attente"
+        ordering = ['created_at', 'id']
+        # Une seule entrée par objet : les modifications successives sont fusionnées
+        unique_together = [['kind', 'object_id']]
+        indexes = [
+            models.Index(fields=['kind', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.object_id} ({self.action})"
@@ -0,0 +1,190 @@
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from django.db import connections
+
+from production.models import Roll, Shift
+from .services import OnDemandExportService, RollExcelExporter, ShiftExcelExporter
+
+
+EXPORTS = {
+    'rolls': {
+        'exporter': RollExcelExporter,
+        'model': Roll,
+        'sheet_title': 'Rouleaux',
+    },
+    'shifts': {
+        'exporter': ShiftExcelExporter,
+        'model': Shift,
+        'sheet_title': 'Shifts',
+    },
+}
+
+
+def _init_worker():
+    """Initialiser Django dans un process du pool (nécessaire hors fork)."""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _get_export_queryset(kind, first_id, last_id):
+    """Queryset d'un bloc d'export avec ses relations préchargées."""
+    queryset = EXPORTS[kind]['model'].objects.filter(id__gte=first_id, id__lte=last_id)
+    return EXPORTS[kind]['exporter'].prepare_queryset(queryset).order_by('id')
+
+
+def _build_export_chunk(kind, first_id, last_id, path):
+    """
+    Construire un classeur pour un bloc d'IDs (exécuté dans un process du pool).
+
+    Returns:
+        list: IDs écrits, dans l'ordre des lignes
+    """
+    exporter = EXPORTS[kind]['exporter']()
+    get_row_data = exporter._get_roll_data if kind == 'rolls' else exporter._get_shift_data
+    written_ids = []
+
+    def get_row(obj):
+        written_ids.append(obj.id)
+        return get_row_data(obj)
+
+    template = exporter._create_workbook().active
+    column_widths = {col: dim.width for col, dim in template.column_dimensions.items()}
+
+    OnDemandExportService.write_xlsx(
+        _get_export_queryset(kind, first_id, last_id),
+        exporter.headers,
+        get_row,
+        EXPORTS[kind]['sheet_title'],
+        get_fill=exporter.get_row_fill,
+        output=path,
+        column_widths=column_widths
+    )
+    connections.close_all()
+    return written_ids
+
+
+class ExportRebuildService:
+    """
+    Régénération complète des fichiers d'export depuis la base.
+
+    Les IDs sont découpés en blocs de la taille de rotation (un fichier
+    d'archive par bloc), construits en parallèle dans un pool de process,
+    puis installés d'un coup. Le verrou de l'exporter est tenu de la lecture
+    des IDs à l'installation : le worker de la file d'attente ne peut pas
+    purger des éléments pendant la reconstruction, il les rejoue ensuite
+    sur les fichiers reconstruits.
+    """
+
+    def __init__(self, workers=None, chunk_size=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+
+    def _get_chunks(self, kind, chunk_size):
+        """Découper les IDs existants en intervalles (premier ID, dernier ID)."""
+        ids = list(EXPORTS[kind]['model'].objects.order_by('id').values_list('id', flat=True))
+        return [
+            (chunk[0], chunk[-1])
+            for chunk in (ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size))
+        ]
+
+    def rebuild(self, kind):
+        """
+        Régénérer le fichier courant et les archives d'un export.
+
+        Returns:
+            dict: Nombre de lignes, de fichiers et chemin des anciennes archives
+        """
+        exporter = EXPORTS[kind]['exporter']()
+        with exporter.lock:
+            return self._rebuild(kind, exporter)
+
+    def _rebuild(self, kind, exporter):
+        """Construire puis installer les fichiers (verrou de l'exporter tenu)."""
+        # Même taille que la rotation : max_rows lignes en-têtes comprises
+        chunk_size = self.chunk_size or exporter.max_rows - 1
+        chunks = self._get_chunks(kind, chunk_size)
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        prefix = os.path.splitext(exporter.filename)[0]
+        staging_dir = os.path.join(exporter.excel_dir, f'rebuild_{prefix}_{timestamp}')
+        os.makedirs(staging_dir, exist_ok=True)
+
+        # Les process du pool ouvrent leurs propres connexions
+        connections.close_all()
+
+        try:
+            paths = [
+                os.path.join(staging_dir, f'{prefix}_{timestamp}_{number:03d}.xlsx')
+                for number in range(1, len(chunks) + 1)
+            ]
+            if chunks:
+                with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+                    results = list(pool.map(
+                        _build_export_chunk,
+                        [kind] * len(chunks),
+                        [first_id for first_id, _ in chunks],
+                        [last_id for _, last_id in chunks],
+                        paths
+                    ))
+            else:
+                results = []
+
+            return self._install(exporter, paths, results, timestamp)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def _install(self, exporter, paths, results, timestamp):
+        """Remplacer le fichier courant et les archives par les fichiers reconstruits."""
+        prefix = os.path.splitext(exporter.filename)[0]
+        archives_dir = os.path.join(exporter.excel_dir, 'archives')
+        previous_dir = os.path.join(archives_dir, f'before_rebuild_{timestamp}')
+        moved_archives = False
+
+        with exporter.lock:
+            # Conserver les anciennes archives à part plutôt que de les supprimer
+            if os.path.isdir(archives_dir):
+                old_archives = [
+                    name for name in os.listdir(archives_dir)
+                    if name.startswith(f'{prefix}_') and name.endswith('.xlsx')
+                ]
+                if old_archives:
+                    os.makedirs(previous_dir, exist_ok=True)
+                    for name in old_archives:
+                        shutil.move(os.path.join(archives_dir, name), os.path.join(previous_dir, name))
+                    moved_archives = True
+
+            # Tous les blocs sauf le dernier deviennent des archives
+            os.makedirs(archives_dir, exist_ok=True)
+            for path in paths[:-1]:
+                shutil.move(path, os.path.join(archives_dir, os.path.basename(path)))
+
+            # Le dernier bloc devient le fichier courant
+            if paths:
+                os.replace(paths[-1], exporter.filepath)
+                current_ids = results[-1]
+            else:
+                if os.path.exists(exporter.filepath):
+                    os.remove(exporter.filepath)
+                current_ids = []
+
+            # Fichiers partiels obsolètes (rouleaux en flux)
+            for part_path in getattr(exporter, '_get_part_files', lambda: [])():
+                os.remove(part_path)
+
+            # Index et compteur cohérents avec le nouveau fichier
+            exporter.index.rows = {object_id: row for row, object_id in enumerate(current_ids, start=2)}
+            exporter.index.pending_rows = 0
+            exporter.index.max_row = len(current_ids) + 1
+            exporter.index.save()
+            exporter.meta.update(row_count=len(current_ids))
+
+        return {
+            'rows': sum(len(ids) for ids in results),
+            'files': len(paths),
+            'previous_archives': previous_dir if moved_archives else None,
+        }
@@ -1,10 +1,30 @@
+import csv
+import logging
 import os
 import shutil
+import tempfile
 from datetime import datetime
 from django.conf import settings
+from django.db.models import Count, F, IntegerField, OuterRef, Q, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment
 from production.models import Roll, CurrentProfile, Shift
+from .index import ExportMetadata, ExportRowIndex
+from .locks import ExportFileLock, with_export_lock
+from .models import ExportQueueItem
+
+logger = logging.getLogger(__name__)
+
+
+def _count_subquery(queryset, field):
+    """Sous-requête comptant les lignes liées à l'objet courant (0 si aucune)."""
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+        count=Count('id')
+    ).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
 
 
 class RollExcelExporter:
@@ -15,6 +35,15 @@ class RollExcelExporter:
         self.filename = 'rolls_export.xlsx'
         self.filepath = os.path.join(self.excel_dir, self.filename)
         self.max_rows = 10000  # Rotation après 10000 lignes
+        self.index = ExportRowIndex(self.filepath)  # ID → ligne
+        self.meta = ExportMetadata(self.filepath)  # Compteur de lignes
+        self.lock = ExportFileLock(self.filepath, meta=self.meta)  # Écritures multi-process
+        
+        # Mode ajout en flux : les nouveaux rouleaux sont écrits dans des
+        # fichiers partiels, fusionnés au téléchargement ou avant une modification
+        self.streaming_append = True
+        self.parts_dir = os.path.join(self.excel_dir, 'parts')
+        self._current_profile_name = None  # Cache du profil actuel
         
         # Créer le répertoire si nécessaire
         os.makedirs(self.excel_dir, exist_ok=True)
@@ -76,6 +105,32 @@ class RollExcelExporter:
             
         return wb
     
+    @staticmethod
+    def prepare_queryset(queryset):
+        """Précharger les relations utilisées par _get_roll_data (nombre de requêtes constant)."""
+        return queryset.select_related(
+            'shift__operator',
+            'fabrication_order'
+        ).prefetch_related(
+            'defects__defect_type'
+        )
+    
+    def _get_current_profile_name(self):
+        """Nom du profil actuel, lu une seule fois par instance d'exporter."""
+        if self._current_profile_name is None:
+            current_profile = CurrentProfile.objects.select_related('profile').first()
+            if current_profile and current_profile.profile:
+                self._current_profile_name = current_profile.profile.name
+            else:
+                self._current_profile_name = ''
+        return self._current_profile_name
+    
+    def get_row_fill(self, roll):
+        """Remplissage de la ligne d'un rouleau (rouge si non conforme)."""
+        if roll.status != 'CONFORME':
+            return PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
+        return None
+    
     def _get_roll_data(self, roll):
         """Extraire TOUTES les données d'un rouleau pour l'export."""
         # Défauts
@@ -86,12 +141,8 @@ class RollExcelExporter:
         ])
         
         # Profil - récupérer depuis CurrentProfile ou depuis l'OF
-        profile_name = ''
-        
-        # Essayer depuis CurrentProfile d'abord
-        current_profile = CurrentProfile.objects.first()
-        if current_profile and current_profile.profile:
-            profile_name = current_profile.profile.name
+        # Essayer depuis CurrentProfile d'abord (une seule requête par exporter)
+        profile_name = self._get_current_profile_name()
         
         # Sinon essayer depuis l'OF
         if not profile_name and roll.fabrication_order and hasattr(roll.fabrication_order, 'profile'):
@@ -121,13 +172,25 @@ class RollExcelExporter:
             roll.comment or ''
         ]
     
+    def _get_row_count(self):
+        """Nombre de lignes de données, lu dans les métadonnées."""
+        meta = self.meta.read()
+        if meta is not None and 'row_count' in meta:
+            return meta['row_count']
+        
+        # Métadonnées absentes (fichier antérieur) : un seul comptage en lecture seule
+        row_count = 0
+        if os.path.exists(self.filepath):
+            wb = load_workbook(self.filepath, read_only=True)
+            row_count = wb.active.max_row - 1  # -1 pour les en-têtes
+            wb.close()
+        self.meta.update(row_count=row_count)
+        return row_count
+    
     def _check_rotation(self):
         """Vérifier si le fichier doit être archivé."""
         if os.path.exists(self.filepath):
-            wb = load_workbook(self.filepath)
-            ws = wb.active
-            row_count = ws.max_row
-            wb.close()
+            row_count = self._get_row_count() + 1  # +1 pour les en-têtes
             
             if row_count >= self.max_rows:
                 # Archiver le fichier
@@ -138,89 +201,253 @@ class RollExcelExporter:
                 # Créer le répertoire d'archives
                 os.makedirs(os.path.dirname(archive_path), exist_ok=True)
                 
-                # Déplacer le fichier
+                # Déplacer le fichier (l'index et le compteur repartent de zéro)
                 shutil.move(self.filepath, archive_path)
+                self.index.reset()
+                self.meta.reset()
                 return True
         return False
     
+    def _load_workbook(self):
+        """Charger le fichier existant (et son index) ou en créer un nouveau."""
+        if os.path.exists(self.filepath):
+            wb = load_workbook(self.filepath)
+        else:
+            wb = self._create_workbook()
+        self.index.load(wb.active)
+        return wb
+    
+    def _save_workbook(self, wb):
+        """Sauvegarder le fichier (remplacement atomique) puis l'index et le compteur."""
+        tmp_path = f"{self.filepath}.{os.getpid()}.tmp"
+        wb.save(tmp_path)
+        os.replace(tmp_path, self.filepath)
+        self.index.save(wb.active)
+        self.meta.update(row_count=self.index.max_row - 1 + self.index.pending_rows)
+        wb.close()
+    
+    def _find_row(self, ws, object_id):
+        """Chercher la ligne d'un objet par son ID via l'index."""
+        return self.index.find(ws, object_id)
+    
+    def _delete_row(self, ws, object_id):
+        """Supprimer la ligne d'un objet. Retourne le numéro de ligne supprimée."""
+        row_to_delete = self._find_row(ws, object_id)
+        if row_to_delete:
+            ws.delete_rows(row_to_delete, 1)
+            self.index.remove(object_id)
+        return row_to_delete
+    
+    def _write_roll(self, ws, roll, update=True):
+        """Écrire (ajout ou mise à jour) la ligne d'un rouleau dans la feuille."""
+        # Récupérer les données du rouleau
+        row_data = self._get_roll_data(roll)
+        
+        # Chercher si le rouleau existe déjà (par ID en colonne A)
+        roll_row = self._find_row(ws, roll.id) if update else None
+        
+        if roll_row:
+            # Mettre à jour la ligne existante
+            for col, value in enumerate(row_data, 1):
+                ws.cell(row=roll_row, column=col, value=value)
+        else:
+            # Ajouter une nouvelle ligne
+            ws.append(row_data)
+            roll_row = ws.max_row
+            self.index.add(roll.id, roll_row)
+        
+        # Style pour les rouleaux non conformes
+        # (retirer le style rouge si le rouleau est devenu conforme)
+        fill = self.get_row_fill(roll) or PatternFill()
+        for col in range(1, len(self.headers) + 1):
+            ws.cell(row=roll_row, column=col).fill = fill
+    
+    def _get_part_files(self):
+        """Lister les fichiers partiels en attente de fusion, dans l'ordre d'écriture."""
+        if not os.path.isdir(self.parts_dir):
+            return []
+        prefix = os.path.splitext(self.filename)[0] + '.part-'
+        return sorted(
+            os.path.join(self.parts_dir, name)
+            for name in os.listdir(self.parts_dir)
+            if name.startswith(prefix) and name.endswith('.xlsx')
+        )
+    
+    def _can_stream(self, rolls, update=True):
+        """Vérifier que les rouleaux peuvent être ajoutés en flux (nouveaux ou update=False)."""
+        if not self.streaming_append:
+            return False
+        if not self.index.load_file():
+            # Pas d'index : possible seulement si le classeur n'existe pas encore
+            if os.path.exists(self.filepath):
+                return False
+            self.index.max_row = 1  # Ligne d'en-têtes du futur classeur
+        return not update or not any(roll.id in self.index.rows for roll in rolls)
+    
+    def _append_rolls(self, rolls):
+        """
+        Ajouter de nouveaux rouleaux dans un fichier partiel en écriture seule.
+        
+        Le coût ne dépend pas de la taille de rolls_export.xlsx : le classeur
+        principal n'est ni chargé ni réécrit.
+        """
+        if self.index.max_row + self.index.pending_rows >= self.max_rows:
+            # Rotation : fusionner puis archiver avant d'ajouter
+            self.consolidate()
+            self._check_rotation()
+            if not self.index.load_file():
+                self.index.max_row = 1
+        
+        os.makedirs(self.parts_dir, exist_ok=True)
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title="Rouleaux")
+        
+        next_row = self.index.max_row + self.index.pending_rows
+        for roll in rolls:
+            fill = self.get_row_fill(roll)
+            row = []
+            for value in self._get_roll_data(roll):
+                cell = WriteOnlyCell(ws, value=value)
+                if fill:
+                    cell.fill = fill
+                row.append(cell)
+            ws.append(row)
+            
+            next_row += 1
+            self.index.add(roll.id, next_row)
+        
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        part_name = f"{os.path.splitext(self.filename)[0]}.part-{timestamp}.xlsx"
+        part_path = os.path.join(self.parts_dir, part_name)
+        wb.save(f"{part_path}.tmp")
+        os.replace(f"{part_path}.tmp", part_path)
+        
+        self.index.pending_rows += len(rolls)
+        self.index.save()
+        self.meta.update(row_count=self.index.max_row - 1 + self.index.pending_rows)
+        
+        return True, part_path
+    
+    @with_export_lock
+    def consolidate(self):
+        """
+        Fusionner les fichiers partiels dans rolls_export.xlsx.
+        
+        Returns:
+            bool: True si des fichiers partiels ont été fusionnés
+        """
+        parts = self._get_part_files()
+        if not parts:
+            return False
+        
+        wb = self._load_workbook()
+        ws = wb.active
+        fill = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
+        status_col = self.headers.index('Statut')
+        
+        for part_path in parts:
+            part_wb = load_workbook(part_path, read_only=True)
+            for row_data in part_wb.active.iter_rows(values_only=True):
+                ws.append(list(row_data))
+                self.index.add(row_data[0], ws.max_row)
+                
+                if row_data[status_col] != 'CONFORME':
+                    for col in range(1, len(self.headers) + 1):
+                        ws.cell(row=ws.max_row, column=col).fill = fill
+            part_wb.close()
+        
+        self.index.pending_rows = 0
+        self._save_workbook(wb)
+        
+        for part_path in parts:
+            os.remove(part_path)
+        
+        return True
+    
+    @with_export_lock
     def export_roll(self, roll, update=True):
         """Ajouter ou mettre à jour un rouleau dans le fichier Excel."""
         try:
+            # Nouveau rouleau : ajout en flux dans un fichier partiel
+            if self._can_stream([roll], update=update):
+                return self._append_rolls([roll])
+            
+            # Modification sur place : fusionner d'abord les fichiers partiels
+            self.consolidate()
+            
             # Vérifier la rotation
             self._check_rotation()
             
             # Charger ou créer le fichier
-            if os.path.exists(self.filepath):
-                wb = load_workbook(self.filepath)
-                ws = wb.active
-            else:
-                wb = self._create_workbook()
-                ws = wb.active
-            
-            # Récupérer les données du rouleau
-            row_data = self._get_roll_data(roll)
-            
-            # Chercher si le rouleau existe déjà (par ID en colonne A)
-            roll_row = None
-            if update:
-                for row_num in range(2, ws.max_row + 1):  # Commencer à 2 pour skip les en-têtes
-                    if ws.cell(row=row_num, column=1).value == roll.id:
-                        roll_row = row_num
-                        break
-            
-            if roll_row:
-                # Mettre à jour la ligne existante
-                for col, value in enumerate(row_data, 1):
-                    ws.cell(row=roll_row, column=col, value=value)
-            else:
-                # Ajouter une nouvelle ligne
-                ws.append(row_data)
-                roll_row = ws.max_row
-            
-            # Style pour les rouleaux non conformes
-            if roll.status != 'CONFORME':
-                fill = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
-                for col in range(1, len(self.headers) + 1):
-                    ws.cell(row=roll_row, column=col).fill = fill
-            else:
-                # Retirer le style rouge si le rouleau est devenu conforme
-                for col in range(1, len(self.headers) + 1):
-                    ws.cell(row=roll_row, column=col).fill = PatternFill()
+            wb = self._load_workbook()
+            self._write_roll(wb.active, roll, update=update)
             
             # Sauvegarder
-            wb.save(self.filepath)
-            wb.close()
+            self._save_workbook(wb)
             
             return True, self.filepath
             
         except Exception as e:
             return False, str(e)
     
+    @with_export_lock
+    def export_rolls(self, rolls, deleted_ids=None):
+        """
+        Appliquer un lot de modifications en un seul chargement/sauvegarde.
+        
+        Args:
+            rolls: Rouleaux à ajouter ou mettre à jour
+            deleted_ids: IDs des rouleaux à retirer du fichier
+        """
+        try:
+            if isinstance(rolls, QuerySet):
+                rolls = self.prepare_queryset(rolls)
+            rolls = list(rolls)
+            
+            # Uniquement des nouveaux rouleaux : ajout en flux
+            if rolls and not deleted_ids and self._can_stream(rolls):
+                return self._append_rolls(rolls)
+            
+            # Modification sur place : fusionner d'abord les fichiers partiels
+            self.consolidate()
+            self._check_rotation()
+            
+            wb = self._load_workbook()
+            ws = wb.active
+            
+            for roll_id in deleted_ids or []:
+                self._delete_row(ws, roll_id)
+            
+            for roll in rolls:
+                self._write_roll(ws, roll)
+            
+            self._save_workbook(wb)
+            
+            return True, self.filepath
+            
+        except Exception as e:
+            return False, str(e)
+    
+    @with_export_lock
     def delete_roll(self, roll):
         """Supprimer un rouleau du fichier Excel."""
         try:
+            # La ligne peut se trouver dans un fichier partiel
+            self.consolidate()
+            
             # Si le fichier n'existe pas, c'est un succès (rien à supprimer)
             if not os.path.exists(self.filepath):
                 return True, "Fichier Excel inexistant"
             
             # Charger le fichier
-            wb = load_workbook(self.filepath)
-            ws = wb.active
+            wb = self._load_workbook()
             
-            # Chercher la ligne par ID (colonne A)
-            row_to_delete = None
-            for row_num in range(2, ws.max_row + 1):  # Commencer à 2 pour skip les en-têtes
-                if ws.cell(row=row_num, column=1).value == roll.id:
-                    row_to_delete = row_num
-                    break
+            # Supprimer la ligne trouvée via l'index
+            row_to_delete = self._delete_row(wb.active, roll.id)
             
             if row_to_delete:
-                # Supprimer la ligne
-                ws.delete_rows(row_to_delete, 1)
-                
                 # Sauvegarder
-                wb.save(self.filepath)
-                wb.close()
+                self._save_workbook(wb)
                 
                 return True, f"Ligne {row_to_delete} supprimée de {self.filepath}"
             else:
@@ -234,6 +461,33 @@ class RollExcelExporter:
     def get_export_path(self):
         """Retourner le chemin du fichier Excel."""
         return self.filepath
+    
+    def get_status(self):
+        """Statut de l'export (lignes, dernière mise à jour) sans ouvrir le classeur."""
+        pending_parts = self._get_part_files()
+        if not os.path.exists(self.filepath) and not pending_parts:
+            return {
+                'exists': False,
+                'row_count': 0
+            }
+        
+        meta = self.meta.read() or {}
+        status = {
+            'exists': True,
+            'row_count': self._get_row_count(),
+            'pending_rows': self.index.pending_rows if self.index.load_file() else 0,
+            'last_modified': meta.get('updated_at'),
+            'file_size': 0,
+            'filepath': self.filepath,
+            'lock': meta.get('lock', {})
+        }
+        
+        if os.path.exists(self.filepath):
+            stats = os.stat(self.filepath)
+            status['file_size'] = stats.st_size
+            status['last_modified'] = max(status['last_modified'] or 0, stats.st_mtime)
+        
+        return status
 
 
 class ShiftExcelExporter:
@@ -244,6 +498,9 @@ class ShiftExcelExporter:
         self.filename = 'shifts_export.xlsx'
         self.filepath = os.path.join(self.excel_dir, self.filename)
         self.max_rows = 10000  # Rotation après 10000 lignes
+        self.index = ExportRowIndex(self.filepath)  # ID → ligne
+        self.meta = ExportMetadata(self.filepath)  # Compteur de lignes
+        self.lock = ExportFileLock(self.filepath, meta=self.meta)  # Écritures multi-process
         
         # Créer le répertoire si nécessaire
         os.makedirs(self.excel_dir, exist_ok=True)
@@ -335,6 +592,34 @@ class ShiftExcelExporter:
         minutes = (total_seconds % 3600) // 60
         return f"{hours:02d}:{minutes:02d}"
     
+    @staticmethod
+    def prepare_queryset(queryset):
+        """
+        Précharger les relations et annoter les compteurs utilisés par
+        _get_shift_data : un lot de shifts s'exporte en une seule requête.
+        """
+        from wcm.models import LostTimeEntry
+        
+        return queryset.select_related('operator', 'trs').annotate(
+            export_nb_rolls=_count_subquery(Roll.objects.all(), 'shift'),
+            export_nb_rolls_conforme=_count_subquery(Roll.objects.filter(status='CONFORME'), 'shift'),
+            export_nb_lost_times=_count_subquery(LostTimeEntry.objects.all(), 'shift'),
+        )
+    
+    def get_row_fill(self, shift):
+        """Remplissage de la ligne d'un shift selon la performance TRS."""
+        if not (hasattr(shift, 'trs') and shift.trs):
+            return None
+        
+        trs_percentage = float(shift.trs.trs_percentage) if shift.trs.trs_percentage else 0
+        if trs_percentage < 60:  # TRS faible - rouge
+            return PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
+        elif trs_percentage < 75:  # TRS moyen - orange
+            return PatternFill(start_color="FFEACC", end_color="FFEACC", fill_type="solid")
+        elif trs_percentage >= 85:  # TRS excellent - vert
+            return PatternFill(start_color="CCFFCC", end_color="CCFFCC", fill_type="solid")
+        return None
+    
     def _get_shift_data(self, shift):
         """Extraire TOUTES les données d'un shift pour l'export."""
         
@@ -382,15 +667,17 @@ class ShiftExcelExporter:
                 'belt_speed': float(trs.belt_speed_m_per_min) if trs.belt_speed_m_per_min else 0
             })
         
-        # Agrégats depuis les rouleaux associés
-        rolls = shift.rolls.all()
-        nb_rolls_total = rolls.count()
-        nb_rolls_conforme = rolls.filter(status='CONFORME').count()
-        
-        # Agrégats depuis les temps perdus
-        from wcm.models import LostTimeEntry
-        lost_times = LostTimeEntry.objects.filter(shift=shift)
-        nb_lost_times = lost_times.count()
+        # Agrégats annotés par prepare_queryset, sinon comptés pour ce shift
+        if hasattr(shift, 'export_nb_rolls'):
+            nb_rolls_total = shift.export_nb_rolls
+            nb_rolls_conforme = shift.export_nb_rolls_conforme
+            nb_lost_times = shift.export_nb_lost_times
+        else:
+            from wcm.models import LostTimeEntry
+            rolls = shift.rolls.all()
+            nb_rolls_total = rolls.count()
+            nb_rolls_conforme = rolls.filter(status='CONFORME').count()
+            nb_lost_times = LostTimeEntry.objects.filter(shift=shift).count()
         
         # Formatage sécurisé des dates/heures
         from datetime import date, time, datetime
@@ -445,13 +732,25 @@ class ShiftExcelExporter:
             safe_date_format(shift.updated_at, '%Y-%m-%d %H:%M:%S')
         ]
     
+    def _get_row_count(self):
+        """Nombre de lignes de données, lu dans les métadonnées."""
+        meta = self.meta.read()
+        if meta is not None and 'row_count' in meta:
+            return meta['row_count']
+        
+        # Métadonnées absentes (fichier antérieur) : un seul comptage en lecture seule
+        row_count = 0
+        if os.path.exists(self.filepath):
+            wb = load_workbook(self.filepath, read_only=True)
+            row_count = wb.active.max_row - 1  # -1 pour les en-têtes
+            wb.close()
+        self.meta.update(row_count=row_count)
+        return row_count
+    
     def _check_rotation(self):
         """Vérifier si le fichier doit être archivé."""
         if os.path.exists(self.filepath):
-            wb = load_workbook(self.filepath)
-            ws = wb.active
-            row_count = ws.max_row
-            wb.close()
+            row_count = self._get_row_count() + 1  # +1 pour les en-têtes
             
             if row_count >= self.max_rows:
                 # Archiver le fichier
@@ -462,11 +761,69 @@ class ShiftExcelExporter:
                 # Créer le répertoire d'archives
                 os.makedirs(os.path.dirname(archive_path), exist_ok=True)
                 
-                # Déplacer le fichier
+                # Déplacer le fichier (l'index et le compteur repartent de zéro)
                 shutil.move(self.filepath, archive_path)
+                self.index.reset()
+                self.meta.reset()
                 return True
         return False
     
+    def _load_workbook(self):
+        """Charger le fichier existant (et son index) ou en créer un nouveau."""
+        if os.path.exists(self.filepath):
+            wb = load_workbook(self.filepath)
+        else:
+            wb = self._create_workbook()
+        self.index.load(wb.active)
+        return wb
+    
+    def _save_workbook(self, wb):
+        """Sauvegarder le fichier (remplacement atomique) puis l'index et le compteur."""
+        tmp_path = f"{self.filepath}.{os.getpid()}.tmp"
+        wb.save(tmp_path)
+        os.replace(tmp_path, self.filepath)
+        self.index.save(wb.active)
+        self.meta.update(row_count=self.index.max_row - 1 + self.index.pending_rows)
+        wb.close()
+    
+    def _find_row(self, ws, object_id):
+        """Chercher la ligne d'un objet par son ID via l'index."""
+        return self.index.find(ws, object_id)
+    
+    def _delete_row(self, ws, object_id):
+        """Supprimer la ligne d'un objet. Retourne le numéro de ligne supprimée."""
+        row_to_delete = self._find_row(ws, object_id)
+        if row_to_delete:
+            ws.delete_rows(row_to_delete, 1)
+            self.index.remove(object_id)
+        return row_to_delete
+    
+    def _write_shift(self, ws, shift, update=True):
+        """Écrire (ajout ou mise à jour) la ligne d'un shift dans la feuille."""
+        # Récupérer les données du shift
+        row_data = self._get_shift_data(shift)
+        
+        # Chercher si le shift existe déjà (par ID en colonne A)
+        shift_row = self._find_row(ws, shift.id) if update else None
+        
+        if shift_row:
+            # Mettre à jour la ligne existante
+            for col, value in enumerate(row_data, 1):
+                ws.cell(row=shift_row, column=col, value=value)
+        else:
+            # Ajouter une nouvelle ligne
+            ws.append(row_data)
+            shift_row = ws.max_row
+            self.index.add(shift.id, shift_row)
+        
+        # Style conditionnel selon performance TRS (TRS bon - pas de couleur)
+        if hasattr(shift, 'trs') and shift.trs:
+            fill = self.get_row_fill(shift) or PatternFill()
+            
+            for col in range(1, len(self.headers) + 1):
+                ws.cell(row=shift_row, column=col).fill = fill
+    
+    @with_export_lock
     def export_shift(self, shift, update=True):
         """Ajouter ou mettre à jour un shift dans le fichier Excel."""
         try:
@@ -474,58 +831,50 @@ class ShiftExcelExporter:
             self._check_rotation()
             
             # Charger ou créer le fichier
-            if os.path.exists(self.filepath):
-                wb = load_workbook(self.filepath)
-                ws = wb.active
-            else:
-                wb = self._create_workbook()
-                ws = wb.active
-            
-            # Récupérer les données du shift
-            row_data = self._get_shift_data(shift)
-            
-            # Chercher si le shift existe déjà (par ID en colonne A)
-            shift_row = None
-            if update:
-                for row_num in range(2, ws.max_row + 1):  # Commencer à 2 pour skip les en-têtes
-                    if ws.cell(row=row_num, column=1).value == shift.id:
-                        shift_row = row_num
-                        break
-            
-            if shift_row:
-                # Mettre à jour la ligne existante
-                for col, value in enumerate(row_data, 1):
-                    ws.cell(row=shift_row, column=col, value=value)
-            else:
-                # Ajouter une nouvelle ligne
-                ws.append(row_data)
-                shift_row = ws.max_row
-            
-            # Style conditionnel selon performance TRS
-            if hasattr(shift, 'trs') and shift.trs:
-                trs_percentage = float(shift.trs.trs_percentage) if shift.trs.trs_percentage else 0
-                
-                if trs_percentage < 60:  # TRS faible - rouge
-                    fill = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
-                elif trs_percentage < 75:  # TRS moyen - orange
-                    fill = PatternFill(start_color="FFEACC", end_color="FFEACC", fill_type="solid")
-                elif trs_percentage >= 85:  # TRS excellent - vert
-                    fill = PatternFill(start_color="CCFFCC", end_color="CCFFCC", fill_type="solid")
-                else:  # TRS bon - pas de couleur
-                    fill = PatternFill()
-                
-                for col in range(1, len(self.headers) + 1):
-                    ws.cell(row=shift_row, column=col).fill = fill
+            wb = self._load_workbook()
+            self._write_shift(wb.active, shift, update=update)
             
             # Sauvegarder
-            wb.save(self.filepath)
-            wb.close()
+            self._save_workbook(wb)
+            
+            return True, self.filepath
+            
+        except Exception as e:
+            return False, str(e)
+    
+    @with_export_lock
+    def export_shifts(self, shifts, deleted_ids=None):
+        """
+        Appliquer un lot de modifications en un seul chargement/sauvegarde.
+        
+        Args:
+            shifts: Shifts à ajouter ou mettre à jour (un queryset est préparé
+                par prepare_queryset)
+            deleted_ids: IDs des shifts à retirer du fichier
+        """
+        try:
+            if isinstance(shifts, QuerySet):
+                shifts = self.prepare_queryset(shifts)
+            
+            self._check_rotation()
+            
+            wb = self._load_workbook()
+            ws = wb.active
+            
+            for shift_id in deleted_ids or []:
+                self._delete_row(ws, shift_id)
+            
+            for shift in shifts:
+                self._write_shift(ws, shift)
+            
+            self._save_workbook(wb)
             
             return True, self.filepath
             
         except Exception as e:
             return False, str(e)
     
+    @with_export_lock
     def delete_shift(self, shift):
         """Supprimer un shift du fichier Excel."""
         try:
@@ -534,23 +883,14 @@ class ShiftExcelExporter:
                 return True, "Fichier Excel inexistant"
             
             # Charger le fichier
-            wb = load_workbook(self.filepath)
-            ws = wb.active
+            wb = self._load_workbook()
             
-            # Chercher la ligne par ID (colonne A)
-            row_to_delete = None
-            for row_num in range(2, ws.max_row + 1):  # Commencer à 2 pour skip les en-têtes
-                if ws.cell(row=row_num, column=1).value == shift.id:
-                    row_to_delete = row_num
-                    break
+            # Supprimer la ligne trouvée via l'index
+            row_to_delete = self._delete_row(wb.active, shift.id)
             
             if row_to_delete:
-                # Supprimer la ligne
-                ws.delete_rows(row_to_delete, 1)
-                
                 # Sauvegarder
-                wb.save(self.filepath)
-                wb.close()
+                self._save_workbook(wb)
                 
                 return True, f"Ligne {row_to_delete} supprimée de {self.filepath}"
             else:
@@ -563,4 +903,287 @@ class ShiftExcelExporter:
     
     def get_export_path(self):
         """Retourner le chemin du fichier Excel."""
-        return self.filepath
\ No newline at end of file
+        return self.filepath
+    
+    def get_status(self):
+        """Statut de l'export (lignes, dernière mise à jour) sans ouvrir le classeur."""
+        if not os.path.exists(self.filepath):
+            return {
+                'exists': False,
+                'row_count': 0
+            }
+        
+        stats = os.stat(self.filepath)
+        return {
+            'exists': True,
+            'row_count': self._get_row_count(),
+            'last_modified': stats.st_mtime,
+            'file_size': stats.st_size,
+            'filepath': self.filepath,
+            'lock': (self.meta.read() or {}).get('lock', {})
+        }
+
+
+class ExportQueueService:
+    """Service de gestion de la file d'attente (outbox) des exports Excel."""
+    
+    # Au-delà, l'entrée est mise de côté (visible dans l'admin avec sa dernière erreur)
+    max_attempts = 5
+    
+    @staticmethod
+    def enqueue(kind, object_id, action='upsert'):
+        """
+        Mettre en file une modification à reporter dans l'Excel.
+        
+        Une seule entrée est conservée par objet : plusieurs sauvegardes
+        successives d'un même rouleau ne coûtent qu'une écriture. Une
+        nouvelle modification relance une entrée mise de côté.
+        """
+        ExportQueueItem.objects.update_or_create(
+            kind=kind,
+            object_id=object_id,
+            defaults={'action': action, 'attempts': 0, 'last_error': ''}
+        )
+    
+    @staticmethod
+    def enqueue_many(kind, object_ids, action='upsert'):
+        """
+        Mettre en file plusieurs objets modifiés en masse (update(), sans post_save).
+        
+        Trois requêtes quel que soit le nombre d'objets. updated_at est
+        renseigné explicitement : le worker ne purge pas une entrée relancée
+        pendant son traitement.
+        """
+        object_ids = set(object_ids)
+        existing = set(ExportQueueItem.objects.filter(
+            kind=kind, object_id__in=object_ids
+        ).values_list('object_id', flat=True))
+        
+        ExportQueueItem.objects.filter(kind=kind, object_id__in=existing).update(
+            action=action, attempts=0, last_error='', updated_at=timezone.now()
+        )
+        ExportQueueItem.objects.bulk_create(
+            [
+                ExportQueueItem(kind=kind, object_id=object_id, action=action)
+                for object_id in sorted(object_ids - existing)
+            ],
+            ignore_conflicts=True
+        )
+    
+    @staticmethod
+    def _flush_rolls(items):
+        """Reporter un lot de rouleaux dans rolls_export.xlsx."""
+        upsert_ids = [item.object_id for item in items if item.action == 'upsert']
+        deleted_ids = {item.object_id for item in items if item.action == 'delete'}
+        
+        rolls = list(
+            RollExcelExporter.prepare_queryset(Roll.objects.filter(id__in=upsert_ids)).order_by('id')
+        )
+        
+        # Rouleaux supprimés entre la mise en file et le traitement
+        deleted_ids.update(set(upsert_ids) - {roll.id for roll in rolls})
+        
+        return RollExcelExporter().export_rolls(rolls, deleted_ids=sorted(deleted_ids))
+    
+    @staticmethod
+    def _flush_shifts(items):
+        """Reporter un lot de shifts dans shifts_export.xlsx."""
+        upsert_ids = [item.object_id for item in items if item.action == 'upsert']
+        deleted_ids = {item.object_id for item in items if item.action == 'delete'}
+        
+        shifts = list(
+            ShiftExcelExporter.prepare_queryset(Shift.objects.filter(id__in=upsert_ids)).order_by('id')
+        )
+        
+        # Shifts supprimés entre la mise en file et le traitement
+        deleted_ids.update(set(upsert_ids) - {shift.id for shift in shifts})
+        
+        return ShiftExcelExporter().export_shifts(shifts, deleted_ids=sorted(deleted_ids))
+    
+    @classmethod
+    def process_pending(cls, batch_size=500):
+        """
+        Traiter les entrées en attente, un chargement/sauvegarde par fichier.
+        
+        Returns:
+            dict: Nombre d'entrées traitées et en erreur par type
+        """
+        stats = {'roll': 0, 'shift': 0, 'errors': 0}
+        handlers = [
+            ('roll', ExportQueueService._flush_rolls),
+            ('shift', ExportQueueService._flush_shifts),
+        ]
+        
+        for kind, flush in handlers:
+            # Les entrées modifiées après ce point seront retraitées au prochain passage
+            started_at = timezone.now()
+            items = list(
+                ExportQueueItem.objects.filter(kind=kind, attempts__lt=cls.max_attempts)[:batch_size]
+            )
+            if not items:
+                continue
+            
+            done, failed = cls._flush_batch(flush, items, started_at)
+            stats[kind] = done
+            stats['errors'] += failed
+        
+        return stats
+    
+    @classmethod
+    def _flush_batch(cls, flush, items, started_at):
+        """
+        Reporter un lot ; en cas d'échec, le couper en deux et recommencer
+        pour isoler les entrées en erreur sans bloquer les autres.
+        
+        Returns:
+            tuple: (entrées traitées, entrées en erreur)
+        """
+        try:
+            success, result = flush(items)
+        except Exception as e:
+            success, result = False, str(e)
+        
+        item_ids = [item.pk for item in items]
+        
+        if success:
+            ExportQueueItem.objects.filter(
+                pk__in=item_ids,
+                updated_at__lte=started_at
+            ).delete()
+            return len(items), 0
+        
+        if len(items) == 1:
+            ExportQueueItem.objects.filter(pk__in=item_ids).update(
+                attempts=F('attempts') + 1,
+                last_error=result
+            )
+            if items[0].attempts + 1 >= cls.max_attempts:
+                logger.error(
+                    f"Export {items[0]} mis de côté après {cls.max_attempts} tentatives: {result}"
+                )
+            return 0, 1
+        
+        middle = len(items) // 2
+        done_first, failed_first = cls._flush_batch(flush, items[:middle], started_at)
+        done_second, failed_second = cls._flush_batch(flush, items[middle:], started_at)
+        return done_first + done_second, failed_first + failed_second
+
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer : renvoie la ligne au lieu de l'écrire."""
+    
+    def write(self, value):
+        return value
+
+
+class OnDemandExportService:
+    """
+    Génération des exports à la demande, directement depuis la base.
+    
+    Indépendant des fichiers maintenus par la file d'attente : les lignes sont
+    lues par paquets avec iterator() et écrites en flux (CSV) ou dans un
+    classeur en écriture seule (XLSX), sans tout garder en mémoire.
+    """
+    
+    chunk_size = 500
+    
+    @staticmethod
+    def filter_rolls(date_from=None, date_to=None, of=None, operator=None):
+        """Rouleaux à exporter selon les filtres (dates de création, OF, opérateur)."""
+        queryset = RollExcelExporter.prepare_queryset(Roll.objects.all())
+        
+        if date_from:
+            queryset = queryset.filter(created_at__date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(created_at__date__lte=date_to)
+        if of:
+            queryset = queryset.filter(fabrication_order__order_number=of)
+        if operator:
+            queryset = queryset.filter(shift__operator_id=operator)
+        
+        return queryset.order_by('id')
+    
+    @staticmethod
+    def filter_shifts(date_from=None, date_to=None, of=None, operator=None):
+        """Shifts à exporter selon les filtres (dates du poste, OF produit, opérateur)."""
+        queryset = ShiftExcelExporter.prepare_queryset(Shift.objects.all())
+        
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+        if of:
+            queryset = queryset.filter(rolls__fabrication_order__order_number=of).distinct()
+        if operator:
+            queryset = queryset.filter(operator_id=operator)
+        
+        return queryset.order_by('id')
+    
+    @classmethod
+    def iter_rows(cls, queryset, get_row_data):
+        """Parcourir le queryset par paquets et produire les lignes d'export."""
+        for obj in queryset.iterator(chunk_size=cls.chunk_size):
+            yield obj, get_row_data(obj)
+    
+    @classmethod
+    def iter_csv(cls, queryset, headers, get_row_data):
+        """Générer le CSV ligne par ligne (séparateur ';' pour Excel en français)."""
+        writer = csv.writer(_Echo(), delimiter=';')
+        yield '\ufeff' + writer.writerow(headers)  # BOM UTF-8 pour Excel
+        for obj, row_data in cls.iter_rows(queryset, get_row_data):
+            yield writer.writerow(row_data)
+    
+    @classmethod
+    def write_xlsx(cls, queryset, headers, get_row_data, sheet_title, get_fill=None,
+                   output=None, column_widths=None):
+        """
+        Écrire le classeur en mode écriture seule.
+        
+        Mémoire bornée (lignes écrites au fil de l'eau dans des fichiers
+        temporaires d'openpyxl) mais pas de flux : l'archive XLSX n'est
+        complète qu'après wb.save().
+        
+        Args:
+            output: Chemin du fichier à écrire (par défaut un fichier temporaire)
+            column_widths: Largeurs des colonnes {lettre: largeur}
+        
+        Returns:
+            Le chemin fourni, ou le fichier temporaire positionné au début
+            (à servir avec FileResponse)
+        """
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title=sheet_title)
+        
+        for col, width in (column_widths or {}).items():
+            ws.column_dimensions[col].width = width
+        
+        header_row = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = Font(bold=True)
+            cell.fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
+            cell.alignment = Alignment(horizontal="center", vertical="center")
+            header_row.append(cell)
+        ws.append(header_row)
+        
+        for obj, row_data in cls.iter_rows(queryset, get_row_data):
+            fill = get_fill(obj) if get_fill else None
+            if fill:
+                row = []
+                for value in row_data:
+                    cell = WriteOnlyCell(ws, value=value)
+                    cell.fill = fill
+                    row.append(cell)
+                ws.append(row)
+            else:
+                ws.append(row_data)
+        
+        if output is not None:
+            wb.save(output)
+            return output
+        
+        output = tempfile.TemporaryFile()
+        wb.save(output)
+        output.seek(0)
+        return output
+
@@ -1,3 +1,230 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import threading
+from datetime import date, time as dt_time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from planification.models import FabricationOrder, Operator
+from production.models import Roll, Shift
+from .locks import ExportFileLock, fcntl
+from .models import ExportQueueItem
+from .services import ExportQueueService, RollExcelExporter
+
+
+class ExportTestMixin:
+    """Données minimales et répertoire d'export temporaire."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.operator = Operator.objects.create(first_name='Jean', last_name='Test')
+        self.fabrication_order = FabricationOrder.objects.create(order_number='1234')
+        self.shift = Shift.objects.create(
+            date=date(2025, 1, 1), operator=self.operator, vacation='Matin',
+            start_time=dt_time(6), end_time=dt_time(14)
+        )
+
+    def create_roll(self, number, **kwargs):
+        values = {
+            'fabrication_order': self.fabrication_order,
+            'roll_number': number,
+            'shift': self.shift,
+            'length': Decimal('100'),
+            'tube_mass': Decimal('1'),
+            'total_mass': Decimal('81'),
+        }
+        values.update(kwargs)
+        return Roll.objects.create(**values)
+
+    def get_exported_ids(self, exporter):
+        wb = load_workbook(exporter.filepath, read_only=True)
+        ids = [row[0] for row in wb.active.iter_rows(min_row=2, values_only=True)]
+        wb.close()
+        return ids
+
+
+class ExportQueueServiceTests(ExportTestMixin, TestCase):
+    """File d'attente des exports : fusion des entrées, découpage des lots en erreur."""
+
+    def test_successive_saves_share_one_entry(self):
+        roll = self.create_roll(1)
+        roll.comment = 'Modifié'
+        roll.save()
+
+        self.assertEqual(ExportQueueItem.objects.filter(kind='roll', object_id=roll.id).count(), 1)
+
+    def test_enqueue_resets_parked_entry(self):
+        roll = self.create_roll(1)
+        ExportQueueItem.objects.filter(object_id=roll.id).update(attempts=5, last_error='Erreur')
+
+        ExportQueueService.enqueue('roll', roll.id)
+
+        item = ExportQueueItem.objects.get(kind='roll', object_id=roll.id)
+        self.assertEqual((item.attempts, item.last_error), (0, ''))
+
+    def test_enqueue_many_creates_and_resets_entries(self):
+        ExportQueueItem.objects.create(kind='roll', object_id=1, attempts=5, last_error='Erreur')
+
+        ExportQueueService.enqueue_many('roll', [1, 2, 3])
+
+        self.assertEqual(
+            list(ExportQueueItem.objects.filter(kind='roll').order_by('object_id').values_list('object_id', 'attempts')),
+            [(1, 0), (2, 0), (3, 0)]
+        )
+
+    def test_failing_item_is_isolated_by_bisection(self):
+        items = [ExportQueueItem.objects.create(kind='roll', object_id=object_id) for object_id in range(1, 9)]
+        flushed_sizes = []
+
+        def flush(batch):
+            flushed_sizes.append(len(batch))
+            if any(item.object_id == 6 for item in batch):
+                return False, 'Rouleau 6 illisible'
+            return True, ''
+
+        done, failed = ExportQueueService._flush_batch(flush, items, timezone.now())
+
+        self.assertEqual((done, failed), (7, 1))
+        # 8 → 4 (ok) + 4 → 2 → 1 (ok) + 1, puis 2 (ok) : pas un appel par entrée
+        self.assertEqual(flushed_sizes, [8, 4, 4, 2, 1, 1, 2])
+        remaining = ExportQueueItem.objects.get(kind='roll')
+        self.assertEqual((remaining.object_id, remaining.attempts), (6, 1))
+        self.assertEqual(remaining.last_error, 'Rouleau 6 illisible')
+
+    def test_item_updated_during_flush_is_kept(self):
+        item = ExportQueueItem.objects.create(kind='roll', object_id=1)
+        started_at = timezone.now() - timedelta(seconds=1)
+
+        ExportQueueService._flush_batch(lambda batch: (True, ''), [item], started_at)
+
+        self.assertTrue(ExportQueueItem.objects.filter(pk=item.pk).exists())
+
+    def test_item_is_parked_after_max_attempts(self):
+        roll = self.create_roll(1)
+        ExportQueueItem.objects.filter(object_id=roll.id).update(attempts=ExportQueueService.max_attempts - 1)
+        failing_flush = mock.Mock(return_value=(False, 'Disque plein'))
+
+        with mock.patch.object(ExportQueueService, '_flush_rolls', failing_flush), \
+                self.assertLogs('exporting.services', level='ERROR'):
+            stats = ExportQueueService.process_pending()
+        self.assertEqual(stats['errors'], 1)
+        self.assertEqual(ExportQueueItem.objects.get(object_id=roll.id).attempts, ExportQueueService.max_attempts)
+
+        # Mise de côté : plus retraitée aux passages suivants
+        with mock.patch.object(ExportQueueService, '_flush_rolls', failing_flush):
+            stats = ExportQueueService.process_pending()
+        self.assertEqual(stats['errors'], 0)
+        self.assertEqual(failing_flush.call_count, 1)
+
+    def test_process_pending_writes_and_purges(self):
+        rolls = [self.create_roll(number) for number in (1, 2, 3)]
+
+        stats = ExportQueueService.process_pending()
+
+        self.assertEqual(stats['roll'], 3)
+        self.assertFalse(ExportQueueItem.objects.filter(kind='roll').exists())
+        exporter = RollExcelExporter()
+        exporter.consolidate()
+        self.assertEqual(self.get_exported_ids(exporter), [roll.id for roll in rolls])
+
+
+class RollExcelExporterTests(ExportTestMixin, TestCase):
+    """Ajout en flux dans des fichiers partiels, fusion et remplacement atomique."""
+
+    def test_new_rolls_are_streamed_then_consolidated(self):
+        first, second, third = (self.create_roll(number) for number in (1, 2, 3))
+        exporter = RollExcelExporter()
+
+        exporter.export_rolls([first, second])
+        exporter.export_roll(third)
+
+        self.assertFalse(os.path.exists(exporter.filepath))
+        self.assertEqual(len(exporter._get_part_files()), 2)
+        self.assertEqual(exporter.get_status()['pending_rows'], 3)
+
+        self.assertTrue(exporter.consolidate())
+
+        self.assertEqual(exporter._get_part_files(), [])
+        self.assertEqual(self.get_exported_ids(exporter), [first.id, second.id, third.id])
+        self.assertEqual(exporter.index.rows, {first.id: 2, second.id: 3, third.id: 4})
+        self.assertFalse(exporter.consolidate())
+
+    def test_update_consolidates_before_writing_in_place(self):
+        roll = self.create_roll(1)
+        exporter = RollExcelExporter()
+        exporter.export_roll(roll)
+
+        roll.comment = 'Corrigé'
+        success, _ = exporter.export_roll(roll)
+
+        self.assertTrue(success)
+        self.assertEqual(exporter._get_part_files(), [])
+        self.assertEqual(self.get_exported_ids(exporter), [roll.id])
+        wb = load_workbook(exporter.filepath, read_only=True)
+        self.assertEqual(list(wb.active.iter_rows(min_row=2, values_only=True))[0][-1], 'Corrigé')
+        wb.close()
+
+    def test_failed_save_leaves_previous_file_intact(self):
+        roll = self.create_roll(1)
+        exporter = RollExcelExporter()
+        exporter.export_roll(roll)
+        exporter.consolidate()
+        with open(exporter.filepath, 'rb') as f:
+            before = f.read()
+
+        wb = exporter._load_workbook()
+        wb.active.append([999])
+        with mock.patch.object(wb, 'save', side_effect=OSError('Disque plein')):
+            with self.assertRaises(OSError):
+                exporter._save_workbook(wb)
+
+        with open(exporter.filepath, 'rb') as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(
+            [name for name in os.listdir(exporter.excel_dir) if name.endswith('.tmp')], []
+        )
+
+
+class ExportFileLockTests(TestCase):
+    """Verrou inter-processus des fichiers d'export."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.workbook_path = os.path.join(self.directory, 'rolls_export.xlsx')
+
+    def test_lock_is_reentrant(self):
+        lock = ExportFileLock(self.workbook_path)
+        with lock:
+            with lock:
+                self.assertEqual(lock._depth, 2)
+            self.assertIsNotNone(lock._file)
+        self.assertIsNone(lock._file)
+
+    def test_second_holder_waits_for_release(self):
+        if fcntl is None:
+            self.skipTest("flock indisponible sur cette plateforme")
+        acquired = threading.Event()
+
+        def take_lock():
+            with ExportFileLock(self.workbook_path):
+                acquired.set()
+
+        with ExportFileLock(self.workbook_path):
+            thread = threading.Thread(target=take_lock)
+            thread.start()
+            self.assertFalse(acquired.wait(0.2))
+
+        thread.join(5)
+        self.assertTrue(acquired.is_set())
@@ -6,9 +6,11 @@ app_name = 'exporting'
 urlpatterns = [
     # Export des rouleaux
     path('api/export/rolls/download/', views.download_rolls_export, name='download_rolls'),
+    path('api/export/rolls/generate/', views.generate_rolls_export, name='generate_rolls'),
     path('api/export/rolls/status/', views.export_status, name='export_status'),
     
     # Export des shifts
     path('api/export/shifts/download/', views.download_shifts_export, name='download_shifts'),
+    path('api/export/shifts/generate/', views.generate_shifts_export, name='generate_shifts'),
     path('api/export/shifts/status/', views.shifts_export_status, name='shifts_export_status'),
 ]
\ No newline at end of file
@@ -1,8 +1,57 @@
 import os
-from django.http import FileResponse, JsonResponse
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.views.decorators.http import require_http_methods
 from rest_framework.decorators import api_view
-from .services import RollExcelExporter, ShiftExcelExporter
+from .services import OnDemandExportService, RollExcelExporter, ShiftExcelExporter
+
+
+def _get_export_filters(request):
+    """Lire les filtres d'export (date_from, date_to, of, operator) de la requête."""
+    filters = {
+        'of': request.GET.get('of', '').strip() or None,
+        'operator': request.GET.get('operator', '').strip() or None,
+    }
+    for key in ('date_from', 'date_to'):
+        value = request.GET.get(key, '').strip()
+        if value and not parse_date(value):
+            raise ValueError(f"Date invalide pour {key} (format attendu: AAAA-MM-JJ)")
+        filters[key] = parse_date(value) if value else None
+    if filters['operator'] and not filters['operator'].isdigit():
+        raise ValueError("L'opérateur doit être fourni par son ID")
+    return filters
+
+
+def _build_export_response(queryset, headers, get_row_data, name, sheet_title, get_fill=None, export_format='xlsx'):
+    """
+    Construire la réponse de téléchargement (CSV ou XLSX).
+    
+    Le CSV est produit en flux pendant la lecture de la base. Le XLSX est
+    une archive zip qu'openpyxl n'assemble qu'à l'enregistrement : il est
+    d'abord écrit entièrement dans un fichier temporaire (disque, pas
+    mémoire), puis servi par morceaux avec FileResponse. Le premier octet
+    n'arrive donc qu'une fois toutes les lignes écrites.
+    """
+    filename = f"{name}_{timezone.now().strftime('%Y%m%d_%H%M%S')}"
+    
+    if export_format == 'csv':
+        response = StreamingHttpResponse(
+            OnDemandExportService.iter_csv(queryset, headers, get_row_data),
+            content_type='text/csv; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+        return response
+    
+    output = OnDemandExportService.write_xlsx(
+        queryset, headers, get_row_data, sheet_title, get_fill=get_fill
+    )
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f"{filename}.xlsx",
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
 
 
 @api_view(['GET'])
@@ -10,6 +59,8 @@ def download_rolls_export(request):
     """Télécharger le fichier Excel des rouleaux."""
     try:
         exporter = RollExcelExporter()
+        # Fusionner les rouleaux ajoutés en flux avant de servir le fichier
+        exporter.consolidate()
         filepath = exporter.get_export_path()
         
         if os.path.exists(filepath):
@@ -23,7 +74,34 @@ def download_rolls_export(request):
             return JsonResponse({
                 'error': 'Aucun fichier d\'export trouvé'
             }, status=404)
-            
+        
+    except Exception as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=500)
+
+
+@api_view(['GET'])
+def generate_rolls_export(request):
+    """Générer à la demande l'export des rouleaux depuis la base (dates, OF, opérateur)."""
+    try:
+        filters = _get_export_filters(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    try:
+        exporter = RollExcelExporter()
+        
+        return _build_export_response(
+            OnDemandExportService.filter_rolls(**filters),
+            exporter.headers,
+            exporter._get_roll_data,
+            name='rolls_export',
+            sheet_title='Rouleaux',
+            get_fill=exporter.get_row_fill,
+            export_format=request.GET.get('output', 'xlsx')
+        )
+        
     except Exception as e:
         return JsonResponse({
             'error': str(e)
@@ -35,31 +113,8 @@ def export_status(request):
     """Obtenir le statut de l'export (nombre de lignes, dernière mise à jour)."""
     try:
         exporter = RollExcelExporter()
-        filepath = exporter.get_export_path()
+        return JsonResponse(exporter.get_status())
         
-        if os.path.exists(filepath):
-            from openpyxl import load_workbook
-            wb = load_workbook(filepath, read_only=True)
-            ws = wb.active
-            row_count = ws.max_row - 1  # -1 pour les en-têtes
-            wb.close()
-            
-            stats = os.stat(filepath)
-            last_modified = stats.st_mtime
-            
-            return JsonResponse({
-                'exists': True,
-                'row_count': row_count,
-                'last_modified': last_modified,
-                'file_size': stats.st_size,
-                'filepath': filepath
-            })
-        else:
-            return JsonResponse({
-                'exists': False,
-                'row_count': 0
-            })
-            
     except Exception as e:
         return JsonResponse({
             'error': str(e)
@@ -84,7 +139,34 @@ def download_shifts_export(request):
             return JsonResponse({
                 'error': 'Aucun fichier d\'export trouvé'
             }, status=404)
-            
+        
+    except Exception as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=500)
+
+
+@api_view(['GET'])
+def generate_shifts_export(request):
+    """Générer à la demande l'export des shifts depuis la base (dates, OF, opérateur)."""
+    try:
+        filters = _get_export_filters(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    try:
+        exporter = ShiftExcelExporter()
+        
+        return _build_export_response(
+            OnDemandExportService.filter_shifts(**filters),
+            exporter.headers,
+            exporter._get_shift_data,
+            name='shifts_export',
+            sheet_title='Shifts',
+            get_fill=exporter.get_row_fill,
+            export_format=request.GET.get('output', 'xlsx')
+        )
+        
     except Exception as e:
         return JsonResponse({
             'error': str(e)
@@ -96,32 +178,9 @@ def shifts_export_status(request):
     """Obtenir le statut de l'export des shifts (nombre de lignes, dernière mise à jour)."""
     try:
         exporter = ShiftExcelExporter()
-        filepath = exporter.get_export_path()
+        return JsonResponse(exporter.get_status())
         
-        if os.path.exists(filepath):
-            from openpyxl import load_workbook
-            wb = load_workbook(filepath, read_only=True)
-            ws = wb.active
-            row_count = ws.max_row - 1  # -1 pour les en-têtes
-            wb.close()
-            
-            stats = os.stat(filepath)
-            last_modified = stats.st_mtime
-            
-            return JsonResponse({
-                'exists': True,
-                'row_count': row_count,
-                'last_modified': last_modified,
-                'file_size': stats.st_size,
-                'filepath': filepath
-            })
-        else:
-            return JsonResponse({
-                'exists': False,
-                'row_count': 0
-            })
-            
     except Exception as e:
         return JsonResponse({
             'error': str(e)
-        }, status=500)
\ No newline at end of file
+        }, status=500)
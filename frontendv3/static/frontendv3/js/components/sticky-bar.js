@@ -334,7 +334,15 @@ function stickyBar() {
             }
             
             try {
-                const response = await fetch(`${window.stickyBarConfig.api.nextRollNumber}?of=${this.ofNumber}`);
+                const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]')?.value || window.csrfToken || '';
+                const response = await fetch(window.stickyBarConfig.api.nextRollNumber, {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRFToken': csrfToken
+                    },
+                    body: JSON.stringify({ of: this.ofNumber })
+                });
                 if (!response.ok) throw new Error(`HTTP ${response.status}`);
                 
                 const data = await response.json();
@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .models import (
+    UserProfile, DailyProductionRollup, VacationProductionRollup, OperatorProductionRollup,
+    ProductionAlert, PickListJob
+)
 
 
 class UserProfileInline(admin.StackedInline):
@@ -48,3 +51,55 @@ class ExtendedUserAdmin(UserAdmin):
 
 # Réenregistrer avec notre admin étendu
 admin.site.register(User, ExtendedUserAdmin)
+
+
+class ProductionRollupAdmin(admin.ModelAdmin):
+    """Consultation des cumuls de production (recalculés automatiquement)."""
+    
+    date_hierarchy = 'date'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DailyProductionRollup)
+class DailyProductionRollupAdmin(ProductionRollupAdmin):
+    list_display = ['date', 'shifts_count', 'total_production', 'rolls_count', 'defects_count', 'lost_time', 'updated_at']
+
+
+@admin.register(VacationProductionRollup)
+class VacationProductionRollupAdmin(ProductionRollupAdmin):
+    list_display = ['date', 'vacation', 'shifts_count', 'total_production', 'rolls_count', 'defects_count', 'lost_time']
+    list_filter = ['vacation']
+
+
+@admin.register(OperatorProductionRollup)
+class OperatorProductionRollupAdmin(ProductionRollupAdmin):
+    list_display = ['date', 'vacation', 'operator', 'shifts_count', 'total_production', 'rolls_count', 'defects_count']
+    list_filter = ['vacation', 'operator']
+
+
+@admin.register(ProductionAlert)
+class ProductionAlertAdmin(ProductionRollupAdmin):
+    """Consultation des alertes de production (recalculées automatiquement)."""
+    
+    list_display = ['date', 'shift', 'rule', 'severity', 'message']
+    list_filter = ['severity', 'rule']
+    list_select_related = ['shift', 'rule']
+
+
+@admin.register(PickListJob)
+class PickListJobAdmin(admin.ModelAdmin):
+    """Suivi des générations de pick-lists (traitées par le worker)."""
+    
+    list_display = ['report_name', 'status', 'rolls_count', 'attempts', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['report_name']
+    readonly_fields = ['roll_ids', 'file_path', 'rolls_count', 'total_length', 'unique_ofs', 'attempts',
+                       'created_by', 'created_at', 'started_at', 'finished_at']
+    
+    def has_add_permission(self, request):
+        return False
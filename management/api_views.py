@@ -2,17 +2,31 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, action, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.db.models import Count, Q, Avg, Sum
-from django.http import JsonResponse
+from django.db.models import Count, Q, Avg, Sum, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import asyncio
+import base64
+import binascii
+import json
+import os
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
 from django.utils import timezone
+from django.utils.cache import parse_etags
+from django.urls import reverse
 from datetime import datetime, timedelta
 
-from production.models import Shift, Roll
+from production.models import Shift, Roll, RollSearchTerm
 from wcm.models import ChecklistResponse
+from quality.models import RollDefect
 from planification.models import Operator
-from .models import UserProfile
+from .models import UserProfile, PickListJob
 from .services import StatisticsService, ChecklistService
 from .services.report_service import ReportService
+from .services.dashboard_cache import DashboardCache
+from .services.pick_list_job_service import PickListJobService
 from .serializers import (
     ShiftReportSerializer,
     ChecklistReviewSerializer,
@@ -69,16 +83,12 @@ class ShiftReportViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(data)
 
 
-@api_view(['GET'])
-@permission_classes([IsSuperUser])
-def dashboard_statistics(request):
-    """API pour les statistiques du dashboard management."""
-    mode = request.query_params.get('mode', 'last3')
-    date_str = request.query_params.get('date')
+def _get_dashboard_period(params):
+    """Mode et date de référence du dashboard à partir des paramètres de requête."""
+    mode = params.get('mode', 'last3')
+    date_str = params.get('date')
     
     # Déterminer la date selon le mode
-    from datetime import datetime, timedelta
-    
     if mode == 'week':
         # Depuis le début de la semaine
         today = timezone.now().date()
@@ -91,9 +101,134 @@ def dashboard_statistics(request):
         selected_date = timezone.now().date()
         mode = 'custom'
     
-    stats = StatisticsService.get_dashboard_statistics(selected_date, mode)
-    serializer = DashboardStatisticsSerializer(stats)
-    return Response(serializer.data)
+    return mode, selected_date
+
+
+def _get_dashboard_payload(mode, selected_date):
+    """
+    Statistiques sérialisées du dashboard, partagées via le cache versionné.
+    
+    Returns:
+        tuple: (ETag, données)
+    """
+    etag = f'"{DashboardCache.get_etag(mode, selected_date)}"'
+    data = DashboardCache.get_or_compute(etag, lambda: dict(
+        DashboardStatisticsSerializer(
+            StatisticsService.get_dashboard_statistics(selected_date, mode)
+        ).data
+    ))
+    return etag, data
+
+
+def _etag_matches(etag, if_none_match):
+    """
+    L'en-tête If-None-Match désigne-t-il cet ETag ?
+    
+    Comparaison exacte de chaque valeur de la liste (préfixe W/ ignoré,
+    comparaison faible) ; « * » désigne toute représentation.
+    """
+    etags = parse_etags(if_none_match)
+    if etags == ['*']:
+        return True
+    return etag in (tag.removeprefix('W/') for tag in etags)
+
+
+@api_view(['GET'])
+@permission_classes([IsSuperUser])
+def dashboard_statistics(request):
+    """API pour les statistiques du dashboard management."""
+    mode, selected_date = _get_dashboard_period(request.query_params)
+    
+    # Réponse inchangée depuis le dernier rafraîchissement du navigateur
+    etag = f'"{DashboardCache.get_etag(mode, selected_date)}"'
+    if _etag_matches(etag, request.headers.get('If-None-Match', '')):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        etag, data = _get_dashboard_payload(mode, selected_date)
+        response = Response(data)
+    
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+async def dashboard_events(request):
+    """
+    Flux SSE (text/event-stream) des mises à jour du dashboard.
+    
+    Surveille la version des données et n'envoie que les sections modifiées
+    (alerts, current_kpis, daily_trends). Nécessite un serveur ASGI
+    (sgq_ligne_g/asgi.py) : sous WSGI, répond 204 et le navigateur revient
+    au rafraîchissement périodique.
+    """
+    user = await request.auser()
+    if not (user.is_authenticated and user.is_superuser):
+        return JsonResponse({'error': 'Accès réservé'}, status=403)
+    
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    try:
+        mode, selected_date = _get_dashboard_period(request.GET)
+    except ValueError:
+        return JsonResponse({'error': 'Date invalide'}, status=400)
+    
+    response = StreamingHttpResponse(
+        DashboardEventStream(mode, selected_date),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Pas de mise en tampon par Nginx
+    return response
+
+
+class DashboardEventStream:
+    """Générateur asynchrone des événements SSE d'une connexion au dashboard."""
+    
+    SECTIONS = ['alerts', 'current_kpis', 'daily_trends']
+    check_interval = 2  # Secondes entre deux lectures de la version
+    heartbeat_interval = 15
+    duration = 5 * 60  # Le navigateur se reconnecte ensuite (changement de jour)
+    
+    def __init__(self, mode, selected_date):
+        self.mode = mode
+        self.selected_date = selected_date
+        self.sent = {}
+    
+    def _get_changed_sections(self):
+        """Sections dont le contenu a changé depuis le dernier envoi."""
+        _, data = _get_dashboard_payload(self.mode, self.selected_date)
+        changed = {}
+        for section in self.SECTIONS:
+            encoded = json.dumps(data.get(section), cls=JSONEncoder, sort_keys=True)
+            if self.sent.get(section) != encoded:
+                self.sent[section] = encoded
+                changed[section] = encoded
+        return changed
+    
+    async def __aiter__(self):
+        yield 'retry: 5000\n\n'
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.duration
+        last_write = loop.time()
+        version = None
+        
+        while loop.time() < deadline:
+            current_version = await sync_to_async(DashboardCache.get_data_version)()
+            if current_version != version:
+                version = current_version
+                changed = await sync_to_async(self._get_changed_sections)()
+                if changed:
+                    payload = ', '.join(f'"{section}": {value}' for section, value in changed.items())
+                    yield f'event: dashboard\ndata: {{{payload}}}\n\n'
+                    last_write = loop.time()
+            
+            if loop.time() - last_write >= self.heartbeat_interval:
+                yield ': ping\n\n'
+                last_write = loop.time()
+            
+            await asyncio.sleep(self.check_interval)
 
 
 @api_view(['GET'])
@@ -151,8 +286,23 @@ def sign_checklist(request, pk):
 @api_view(['GET'])
 @permission_classes([IsSuperUser])
 def production_trends(request):
-    """API pour les tendances de production."""
-    days = int(request.query_params.get('days', 7))
+    """
+    API pour les tendances de production.
+    
+    Paramètres:
+    - days: Nombre de jours (1 à 365, défaut 7)
+    """
+    try:
+        days = int(request.query_params.get('days', 7))
+    except ValueError:
+        days = 0
+    
+    if not 1 <= days <= 365:
+        return Response(
+            {'error': 'Le paramètre days doit être un entier entre 1 et 365'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
     trends = StatisticsService._get_daily_trends(days=days)
     return Response(trends)
 
@@ -160,9 +310,35 @@ def production_trends(request):
 @api_view(['GET'])
 @permission_classes([IsSuperUser])
 def operator_performance(request):
-    """API pour la performance des opérateurs."""
-    days = int(request.query_params.get('days', 30))
-    performance = StatisticsService._get_operator_performance(days=days)
+    """
+    API pour la performance des opérateurs.
+    
+    Paramètres : days (fenêtre jusqu'à aujourd'hui) ou start/end (AAAA-MM-JJ),
+    vacation, limit (0 pour tous les opérateurs).
+    """
+    params = request.query_params
+    try:
+        days = int(params.get('days', 30))
+        limit = int(params.get('limit', 10))
+        start_date = datetime.strptime(params['start'], '%Y-%m-%d').date() if params.get('start') else None
+        end_date = datetime.strptime(params['end'], '%Y-%m-%d').date() if params.get('end') else None
+    except ValueError:
+        return Response(
+            {'error': 'Paramètres invalides (days et limit entiers, dates au format AAAA-MM-JJ)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    vacation = params.get('vacation')
+    if vacation and vacation not in dict(Shift.VACATION_CHOICES):
+        return Response({'error': f'Vacation inconnue: {vacation}'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    performance = StatisticsService._get_operator_performance(
+        days=days,
+        start_date=start_date,
+        end_date=end_date,
+        vacation=vacation,
+        limit=limit or None
+    )
     return Response(performance)
 
 
@@ -480,56 +656,100 @@ def shift_details(request, pk):
         )
 
 
+def _encode_roll_cursor(roll):
+    """Curseur opaque de pagination désignant la position d'un rouleau."""
+    position = f"{roll.created_at.isoformat()}|{roll.id}"
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def _decode_roll_cursor(cursor):
+    """
+    Position (created_at, id) d'un curseur de pagination.
+    
+    Raises:
+        ValueError: Curseur invalide
+    """
+    try:
+        created_at, roll_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(str(e))
+    return datetime.fromisoformat(created_at), int(roll_id)
+
+
 @api_view(['GET'])
 @permission_classes([IsSuperUser])
 def conforming_rolls_list(request):
-    """API pour récupérer la liste des rouleaux conformes avec filtres."""
+    """
+    API pour récupérer la liste des rouleaux conformes avec filtres.
+    
+    Pagination par curseur sur (created_at, id) décroissants : chaque page
+    coûte une requête indexée quelle que soit sa position. Le curseur de la
+    page suivante est renvoyé dans next_cursor, le nombre total de rouleaux
+    correspondant aux filtres dans total.
+    """
     try:
         # Récupérer les paramètres de filtre
         of_filter = request.GET.get('of', '').strip()
         operator_filter = request.GET.get('operator', '').strip()
         date_filter = request.GET.get('date', '').strip()
         show_assigned = request.GET.get('show_assigned', '').lower() == 'true'
-        limit = int(request.GET.get('limit', 100))
+        cursor = request.GET.get('cursor', '').strip()
+        try:
+            limit = min(max(int(request.GET.get('limit', 100)), 1), 500)
+            cursor_position = _decode_roll_cursor(cursor) if cursor else None
+        except ValueError:
+            return Response(
+                {'error': 'Paramètres limit ou cursor invalides'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         # Query de base : rouleaux conformes (et disponibles par défaut)
         if show_assigned:
             # Afficher tous les rouleaux conformes (assignés et non assignés)
-            queryset = Roll.objects.conforming().select_related(
-                'shift__operator',
-                'fabrication_order'
-            ).prefetch_related(
-                'defects'
-            ).order_by('-created_at')
+            queryset = Roll.objects.conforming()
         else:
             # Afficher seulement les rouleaux disponibles (non assignés à un pré-shipper)
-            queryset = Roll.objects.available_for_preshipper().select_related(
-                'shift__operator',
-                'fabrication_order'
-            ).prefetch_related(
-                'defects'
-            ).order_by('-created_at')
+            queryset = Roll.objects.available_for_preshipper()
         
-        # Appliquer les filtres
+        # Appliquer les filtres (préfixes de mots, via les termes de recherche indexés)
         if of_filter:
-            queryset = queryset.filter(
-                fabrication_order__order_number__icontains=of_filter
-            )
+            queryset = RollSearchTerm.objects.filter_rolls(queryset, ['of'], of_filter)
         
         if operator_filter:
+            queryset = RollSearchTerm.objects.filter_rolls(queryset, ['operator', 'shift'], operator_filter)
+        
+        if date_filter:
             queryset = queryset.filter(
-                Q(shift__operator__first_name__icontains=operator_filter) |
-                Q(shift__operator__last_name__icontains=operator_filter) |
-                Q(shift_id_str__icontains=operator_filter)
+                id__in=RollSearchTerm.objects.created_on(date_filter)
             )
         
-        if date_filter:
+        # Total calculé sur les filtres, avant le curseur
+        total = queryset.count()
+        
+        if cursor_position:
+            cursor_created_at, cursor_id = cursor_position
             queryset = queryset.filter(
-                created_at__date=date_filter
+                Q(created_at__lt=cursor_created_at) |
+                Q(created_at=cursor_created_at, id__lt=cursor_id)
             )
         
-        # Limiter le nombre de résultats
-        rolls = queryset[:limit]
+        # Une ligne de plus pour savoir s'il reste une page
+        rolls = list(
+            queryset.select_related(
+                'shift__operator',
+                'fabrication_order'
+            ).annotate(
+                # Sous-requête corrélée : comptée pour les seules lignes de la page
+                nb_defects=Coalesce(Subquery(
+                    RollDefect.objects.filter(roll=OuterRef('pk')).order_by().values('roll').annotate(
+                        count=Count('id')
+                    ).values('count'),
+                    output_field=IntegerField()
+                ), 0)
+            ).order_by('-created_at', '-id')[:limit + 1]
+        )
+        has_more = len(rolls) > limit
+        rolls = rolls[:limit]
         
         # Construire la réponse
         data = []
@@ -554,7 +774,7 @@ def conforming_rolls_list(request):
                 'grammage_calc': str(roll.grammage_calc) if roll.grammage_calc else None,
                 'created_at': roll.created_at.isoformat(),
                 'operator': operator,
-                'defects_count': roll.defects.count(),
+                'defects_count': roll.nb_defects,
                 'status': roll.status,
                 'destination': roll.destination,
                 
@@ -575,6 +795,8 @@ def conforming_rolls_list(request):
         
         return Response({
             'count': len(data),
+            'total': total,
+            'next_cursor': _encode_roll_cursor(rolls[-1]) if has_more else None,
             'results': data,
             'filters_applied': {
                 'of': of_filter,
@@ -619,118 +841,30 @@ def generate_control_report(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Récupérer les rouleaux sélectionnés (conformes uniquement, assignés ou non)
-        rolls = Roll.objects.filter(
-            id__in=roll_ids,
-            status='CONFORME'
-        ).select_related(
-            'shift__operator',
-            'fabrication_order'
-        ).prefetch_related(
-            'defects__defect_type',
-            'shift__quality_controls'
-        ).order_by('fabrication_order__order_number', 'roll_number')
-        
-        if not rolls.exists():
+        # Rouleaux sélectionnés (conformes uniquement, assignés ou non)
+        if not Roll.objects.filter(id__in=roll_ids, status='CONFORME').exists():
             return Response(
                 {'error': 'Aucun rouleau conforme trouvé'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Préparer les données pour le service PDF
-        report_data = {
-            'title': 'Pick-list',
-            'generated_at': timezone.now().isoformat(),
-            'rolls_count': rolls.count(),
-            'total_length': sum(float(r.length or 0) for r in rolls),
-            'unique_ofs': list(set(r.fabrication_order.order_number for r in rolls if r.fabrication_order)),
-            'rolls': []
-        }
-        
-        for roll in rolls:
-            # Déterminer l'opérateur
-            operator = None
-            if roll.shift and roll.shift.operator:
-                operator = f"{roll.shift.operator.first_name} {roll.shift.operator.last_name.upper()}"
-            elif roll.shift_id_str:
-                parts = roll.shift_id_str.split('_')
-                operator = parts[1] if len(parts) > 1 else None
-            
-            # Récupérer les contrôles qualité du shift
-            quality_controls = None
-            if roll.shift and roll.shift.quality_controls.exists():
-                qc = roll.shift.quality_controls.first()
-                quality_controls = {
-                    'micrometer_left_avg': float(qc.micrometer_left_avg) if qc.micrometer_left_avg else None,
-                    'micrometer_right_avg': float(qc.micrometer_right_avg) if qc.micrometer_right_avg else None,
-                    'surface_mass_left_avg': float(qc.surface_mass_left_avg) if qc.surface_mass_left_avg else None,
-                    'surface_mass_right_avg': float(qc.surface_mass_right_avg) if qc.surface_mass_right_avg else None,
-                    'dry_extract': float(qc.dry_extract) if qc.dry_extract else None,
-                    'loi_given': qc.loi_given
-                }
-            
-            # Défauts
-            defects = []
-            for defect in roll.defects.all():
-                defects.append({
-                    'type': defect.defect_type.name,
-                    'position': defect.meter_position,
-                    'side': defect.get_side_position_display(),
-                    'severity': defect.defect_type.severity
-                })
-            
-            roll_data = {
-                'roll_id': roll.roll_id,
-                'fabrication_order': roll.fabrication_order.order_number if roll.fabrication_order else None,
-                'length': float(roll.length) if roll.length else None,
-                'operator': operator,
-                'production_date': roll.created_at.isoformat(),
-                'avg_thickness_left': float(roll.avg_thickness_left) if roll.avg_thickness_left else None,
-                'avg_thickness_right': float(roll.avg_thickness_right) if roll.avg_thickness_right else None,
-                'grammage_calc': float(roll.grammage_calc) if roll.grammage_calc else None,
-                'tube_mass': float(roll.tube_mass) if roll.tube_mass else None,
-                'total_mass': float(roll.total_mass) if roll.total_mass else None,
-                'net_mass': float(roll.net_mass) if roll.net_mass else None,
-                'defects': defects,
-                'quality_controls': quality_controls,
-                'comment': roll.comment or ''
-            }
-            
-            report_data['rolls'].append(roll_data)
-        
-        # Générer le PDF avec le PickListService
-        from .services.pick_list_service import PickListService
-        
-        pick_list_service = PickListService()
-        success, file_path, message = pick_list_service.generate_pick_list_pdf(
-            rolls_data=report_data,
-            report_name=report_name
-        )
-        
-        if success:
-            # Marquer les rouleaux comme assignés à ce pré-shipper
-            rolls.update(
-                preshipper_assigned=report_name,
-                preshipper_assigned_at=timezone.now()
-            )
-            
-            # Retourner l'URL de téléchargement
-            download_url = pick_list_service.get_export_url(f"{report_name}.pdf")
-            return Response({
-                'success': True,
-                'message': message,
-                'download_url': download_url,
-                'file_path': file_path,
-                'rolls_count': report_data['rolls_count'],
-                'total_length': report_data['total_length'],
-                'unique_ofs': report_data['unique_ofs']
-            })
-        else:
+        if PickListJob.objects.filter(report_name=report_name, status__in=['pending', 'running']).exists():
             return Response(
-                {'error': message},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': f'La pick-list {report_name} est déjà en cours de génération'},
+                status=status.HTTP_409_CONFLICT
             )
         
+        # Génération du PDF par le worker : réponse immédiate avec l'identifiant de la demande
+        job = PickListJobService.enqueue(roll_ids, report_name, request.user)
+        data = PickListJobService.get_status_data(job)
+        data['status_url'] = reverse('management:api-pick-list-job-status', args=[job.id])
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+        
+    except (TypeError, ValueError):
+        return Response(
+            {'error': 'Liste de rouleaux invalide'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
         return Response(
             {'error': f'Erreur lors de la génération du PDF: {str(e)}'},
@@ -738,6 +872,44 @@ def generate_control_report(request):
         )
 
 
+@api_view(['GET'])
+@permission_classes([IsSuperUser])
+def pick_list_job_status(request, pk):
+    """API pour suivre une génération de pick-list."""
+    try:
+        job = PickListJob.objects.get(pk=pk)
+    except PickListJob.DoesNotExist:
+        return Response({'error': 'Génération non trouvée'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response(PickListJobService.get_status_data(job))
+
+
+@api_view(['GET'])
+@permission_classes([IsSuperUser])
+def pick_list_job_download(request, pk):
+    """API pour télécharger le PDF d'une génération terminée."""
+    try:
+        job = PickListJob.objects.get(pk=pk)
+    except PickListJob.DoesNotExist:
+        return Response({'error': 'Génération non trouvée'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if job.status != 'done':
+        return Response(
+            {'error': 'La pick-list n\'est pas encore disponible', 'status': job.status},
+            status=status.HTTP_409_CONFLICT
+        )
+    
+    if not job.file_path or not os.path.exists(job.file_path):
+        return Response({'error': 'Fichier introuvable'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return FileResponse(
+        open(job.file_path, 'rb'),
+        as_attachment=True,
+        filename=f"{job.report_name}.pdf",
+        content_type='application/pdf'
+    )
+
+
 @api_view(['POST'])
 @permission_classes([IsSuperUser])
 def unassign_roll(request):
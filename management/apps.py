@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'management'
+    
+    def ready(self):
+        """Enregistrer les signaux de mise à jour des cumuls de production."""
+        import management.signals
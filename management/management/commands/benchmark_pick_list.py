@@ -0,0 +1,51 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from production.models import Roll
+from management.services.pick_list_report_builder import PickListReportBuilder
+
+
+class Command(BaseCommand):
+    help = 'Mesure les requêtes et le temps de construction des données de pick-list selon le nombre de rouleaux'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='10,100,500',
+            help='Nombres de rouleaux mesurés, séparés par des virgules (défaut: 10,100,500)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted({int(size) for size in options['sizes'].split(',') if size.strip()})
+        except ValueError:
+            raise CommandError('--sizes doit être une liste d\'entiers (ex: 10,100,500)')
+        if not sizes or sizes[0] < 1:
+            raise CommandError('--sizes doit contenir des entiers positifs')
+
+        # Derniers rouleaux conformes, comme une sélection de pick-list
+        roll_ids = list(
+            Roll.objects.filter(status='CONFORME').order_by('-created_at', '-id').values_list('id', flat=True)[:sizes[-1]]
+        )
+        if not roll_ids:
+            raise CommandError('Aucun rouleau conforme en base')
+
+        query_counts = set()
+        for size in sizes:
+            selected_ids = roll_ids[:size]
+            start = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                report_data = PickListReportBuilder(PickListReportBuilder.get_rolls(selected_ids)).build()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            query_counts.add(len(queries.captured_queries))
+            self.stdout.write(
+                f"{report_data['rolls_count']:>6} rouleau(x) : "
+                f"{len(queries.captured_queries)} requête(s), {elapsed_ms:.1f} ms"
+            )
+
+        if len(query_counts) == 1:
+            self.stdout.write(self.style.SUCCESS('✓ Nombre de requêtes constant'))
+        else:
+            self.stdout.write(self.style.ERROR('✗ Le nombre de requêtes dépend du nombre de rouleaux'))
@@ -0,0 +1,55 @@
+import time
+from django.core.management.base import BaseCommand
+from management.services.pick_list_job_service import PickListJobService
+
+
+class Command(BaseCommand):
+    help = 'Génère les pick-lists PDF demandées depuis le relevé de contrôles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Tourner en continu (mode worker)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2,
+            help='Pause en secondes entre deux passages en mode --loop (défaut: 2)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=10,
+            help='Nombre maximum de pick-lists générées par passage (défaut: 10)',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        limit = options['limit']
+
+        if not options['loop']:
+            self.process(limit)
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'Worker pick-lists démarré (intervalle {interval}s)'))
+        try:
+            while True:
+                processed = self.process(limit)
+                # Enchaîner directement tant que des demandes sont en attente
+                if not processed:
+                    time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write('\nWorker pick-lists arrêté')
+
+    def process(self, limit):
+        """Effectue un passage sur les demandes en attente et affiche le résultat."""
+        stats = PickListJobService.process_pending(limit=limit)
+
+        if stats['done']:
+            self.stdout.write(f"{stats['done']} pick-list(s) générée(s)")
+        if stats['failed']:
+            self.stdout.write(self.style.ERROR(f"{stats['failed']} pick-list(s) en erreur"))
+
+        return stats['done'] + stats['failed']
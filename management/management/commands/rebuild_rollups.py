@@ -0,0 +1,35 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from management.services.rollup_service import RollupService
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit les cumuls de production (jour, vacation, opérateur) et les alertes depuis les données brutes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='date_from',
+            type=str,
+            help='Date de début AAAA-MM-JJ (défaut: premier poste)',
+        )
+        parser.add_argument(
+            '--to',
+            dest='date_to',
+            type=str,
+            help='Date de fin AAAA-MM-JJ (défaut: dernier poste)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            date_from = self.parse_date(options['date_from'])
+            date_to = self.parse_date(options['date_to'])
+        except ValueError:
+            raise CommandError('Format de date invalide (attendu: AAAA-MM-JJ)')
+        
+        days_count = RollupService.rebuild(date_from, date_to)
+        self.stdout.write(self.style.SUCCESS(f'✓ Cumuls reconstruits pour {days_count} jour(s) de production'))
+    
+    def parse_date(self, value):
+        """Convertir une date AAAA-MM-JJ (None si absente)."""
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
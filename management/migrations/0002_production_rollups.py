@@ -0,0 +1,100 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0001_initial'),
+        ('planification', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyProductionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('shifts_count', models.PositiveIntegerField(default=0, verbose_name='Nb postes')),
+                ('trs_count', models.PositiveIntegerField(default=0, verbose_name='Nb postes avec TRS')),
+                ('trs_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Somme TRS')),
+                ('availability_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Somme disponibilité')),
+                ('performance_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Somme performance')),
+                ('quality_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Somme qualité')),
+                ('total_production', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Production totale (m)')),
+                ('ok_production', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Production OK (m)')),
+                ('nok_production', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Production NOK (m)')),
+                ('rolls_count', models.PositiveIntegerField(default=0, verbose_name='Nb rouleaux')),
+                ('defects_count', models.PositiveIntegerField(default=0, verbose_name='Nb défauts')),
+                ('blocking_defects_count', models.PositiveIntegerField(default=0, verbose_name='Nb défauts bloquants')),
+                ('lost_time', models.PositiveIntegerField(default=0, verbose_name='Temps perdu (min)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Cumul journalier',
+                'verbose_name_plural': 'Cumuls journaliers',
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('date',), name='unique_daily_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VacationProductionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('shifts_count', models.PositiveIntegerField(default=0, verbose_name='Nb postes')),
+                ('trs_count', models.PositiveIntegerField(default=0, verbose_name='Nb postes avec TRS')),
+                ('trs_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Somme TRS')),
+                ('availability_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Somme disponibilité')),
+                ('performance_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Somme performance')),
+                ('quality_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Somme qualité')),
+                ('total_production', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Production totale (m)')),
+                ('ok_production', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Production OK (m)')),
+                ('nok_production', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Production NOK (m)')),
+                ('rolls_count', models.PositiveIntegerField(default=0, verbose_name='Nb rouleaux')),
+                ('defects_count', models.PositiveIntegerField(default=0, verbose_name='Nb défauts')),
+                ('blocking_defects_count', models.PositiveIntegerField(default=0, verbose_name='Nb défauts bloquants')),
+                ('lost_time', models.PositiveIntegerField(default=0, verbose_name='Temps perdu (min)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vacation', models.CharField(max_length=20, verbose_name='Vacation')),
+            ],
+            options={
+                'verbose_name': 'Cumul par vacation',
+                'verbose_name_plural': 'Cumuls par vacation',
+                'ordering': ['date', 'vacation'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'vacation'), name='unique_vacation_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='OperatorProductionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('shifts_count', models.PositiveIntegerField(default=0, verbose_name='Nb postes')),
+                ('trs_count', models.PositiveIntegerField(default=0, verbose_name='Nb postes avec TRS')),
+                ('trs_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Somme TRS')),
+                ('availability_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Somme disponibilité')),
+                ('performance_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Somme performance')),
+                ('quality_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Somme qualité')),
+                ('total_production', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Production totale (m)')),
+                ('ok_production', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Production OK (m)')),
+                ('nok_production', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Production NOK (m)')),
+                ('rolls_count', models.PositiveIntegerField(default=0, verbose_name='Nb rouleaux')),
+                ('defects_count', models.PositiveIntegerField(default=0, verbose_name='Nb défauts')),
+                ('blocking_defects_count', models.PositiveIntegerField(default=0, verbose_name='Nb défauts bloquants')),
+                ('lost_time', models.PositiveIntegerField(default=0, verbose_name='Temps perdu (min)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vacation', models.CharField(max_length=20, verbose_name='Vacation')),
+                ('operator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='production_rollups', to='planification.operator', verbose_name='Opérateur')),
+            ],
+            options={
+                'verbose_name': 'Cumul par opérateur',
+                'verbose_name_plural': 'Cumuls par opérateur',
+                'ordering': ['date', 'vacation', 'operator'],
+                'indexes': [models.Index(fields=['operator', 'date'], name='management__operato_60a260_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'vacation', 'operator'), name='unique_operator_rollup')],
+            },
+        ),
+    ]
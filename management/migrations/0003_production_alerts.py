@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_production_alert_rules'),
+        ('management', '0002_production_rollups'),
+        ('production', '0007_rollnumber'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductionAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('severity', models.CharField(max_length=10, verbose_name='Sévérité')),
+                ('value', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Valeur')),
+                ('message', models.CharField(max_length=255, verbose_name='Message')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='catalog.productionalertrule', verbose_name='Règle')),
+                ('shift', models.ForeignKey(blank=True, help_text='Vide pour une alerte sur la journée', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='production_alerts', to='production.shift', verbose_name='Poste')),
+            ],
+            options={
+                'verbose_name': 'Alerte de production',
+                'verbose_name_plural': 'Alertes de production',
+                'ordering': ['date', 'id'],
+                'indexes': [models.Index(fields=['date'], name='management__date_7a4a99_idx')],
+            },
+        ),
+    ]
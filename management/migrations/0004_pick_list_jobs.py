@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0003_production_alerts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PickListJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_name', models.CharField(max_length=20, verbose_name='Nom du rapport')),
+                ('roll_ids', models.JSONField(default=list, verbose_name='Rouleaux sélectionnés')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('done', 'Terminée'), ('failed', 'En erreur')], default='pending', max_length=10, verbose_name='Statut')),
+                ('message', models.TextField(blank=True, verbose_name='Message')),
+                ('file_path', models.CharField(blank=True, max_length=500, verbose_name='Fichier généré')),
+                ('rolls_count', models.PositiveIntegerField(default=0, verbose_name='Nombre de rouleaux')),
+                ('total_length', models.FloatField(default=0, verbose_name='Longueur totale (m)')),
+                ('unique_ofs', models.JSONField(default=list, verbose_name='OF')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentatives')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Début du traitement')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fin du traitement')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pick_list_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Demandé par')),
+            ],
+            options={
+                'verbose_name': 'Génération de pick-list',
+                'verbose_name_plural': 'Générations de pick-lists',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='management__status_2511e4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0004_pick_list_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyproductionrollup',
+            name='fallback_length',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Production des postes sans TRS (m)'),
+        ),
+        migrations.AddField(
+            model_name='dailyproductionrollup',
+            name='fallback_trs_sum',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Somme TRS calculé × production'),
+        ),
+        migrations.AddField(
+            model_name='operatorproductionrollup',
+            name='fallback_length',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Production des postes sans TRS (m)'),
+        ),
+        migrations.AddField(
+            model_name='operatorproductionrollup',
+            name='fallback_trs_sum',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Somme TRS calculé × production'),
+        ),
+        migrations.AddField(
+            model_name='vacationproductionrollup',
+            name='fallback_length',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Production des postes sans TRS (m)'),
+        ),
+        migrations.AddField(
+            model_name='vacationproductionrollup',
+            name='fallback_trs_sum',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Somme TRS calculé × production'),
+        ),
+    ]
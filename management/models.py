@@ -24,3 +24,211 @@ class UserProfile(models.Model):
     
     def __str__(self):
         return f"Profil de {self.user.username}"
+
+
+class ProductionRollup(models.Model):
+    """
+    Agrégats de production pré-calculés (base commune des tables de cumul).
+    
+    Les TRS sont stockés en sommes avec le nombre de postes concernés :
+    la moyenne d'une période est la somme des sommes divisée par la somme
+    des compteurs. Sans aucun TRS enregistré sur la période, la moyenne
+    retombe sur le TRS calculé des postes (ReportService._calculate_kpis),
+    pondéré par leur production. Tenus à jour par RollupService (signaux).
+    """
+    
+    date = models.DateField(verbose_name="Date")
+    
+    shifts_count = models.PositiveIntegerField(default=0, verbose_name="Nb postes")
+    trs_count = models.PositiveIntegerField(default=0, verbose_name="Nb postes avec TRS")
+    trs_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Somme TRS")
+    availability_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Somme disponibilité")
+    performance_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Somme performance")
+    quality_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Somme qualité")
+    
+    total_production = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Production totale (m)")
+    ok_production = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Production OK (m)")
+    nok_production = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Production NOK (m)")
+    
+    rolls_count = models.PositiveIntegerField(default=0, verbose_name="Nb rouleaux")
+    defects_count = models.PositiveIntegerField(default=0, verbose_name="Nb défauts")
+    blocking_defects_count = models.PositiveIntegerField(default=0, verbose_name="Nb défauts bloquants")
+    lost_time = models.PositiveIntegerField(default=0, verbose_name="Temps perdu (min)")
+    
+    # Postes sans TRS enregistré : TRS calculé pondéré par la production
+    fallback_length = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Production des postes sans TRS (m)")
+    fallback_trs_sum = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name="Somme TRS calculé × production")
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        abstract = True
+    
+    @staticmethod
+    def compute_avg_trs(trs_sum, trs_count, fallback_trs_sum=0, fallback_length=0):
+        """
+        TRS moyen à partir des sommes cumulées.
+        
+        Moyenne simple des TRS enregistrés (TRS à 0 inclus) ; sans TRS
+        enregistré, moyenne du TRS calculé pondérée par la production.
+        """
+        if trs_count:
+            return float(trs_sum) / trs_count
+        if fallback_length:
+            return float(fallback_trs_sum) / float(fallback_length)
+        return 0
+    
+    @property
+    def avg_trs(self):
+        """TRS moyen des postes de la ligne (0 sans production)."""
+        return self.compute_avg_trs(self.trs_sum, self.trs_count, self.fallback_trs_sum, self.fallback_length)
+
+
+class DailyProductionRollup(ProductionRollup):
+    """Cumul de production par jour."""
+    
+    class Meta:
+        verbose_name = "Cumul journalier"
+        verbose_name_plural = "Cumuls journaliers"
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['date'], name='unique_daily_rollup')
+        ]
+    
+    def __str__(self):
+        return f"Cumul du {self.date}"
+
+
+class VacationProductionRollup(ProductionRollup):
+    """Cumul de production par jour et par vacation."""
+    
+    vacation = models.CharField(max_length=20, verbose_name="Vacation")
+    
+    class Meta:
+        verbose_name = "Cumul par vacation"
+        verbose_name_plural = "Cumuls par vacation"
+        ordering = ['date', 'vacation']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'vacation'], name='unique_vacation_rollup')
+        ]
+    
+    def __str__(self):
+        return f"Cumul du {self.date} - {self.vacation}"
+
+
+class OperatorProductionRollup(ProductionRollup):
+    """Cumul de production par jour, vacation et opérateur."""
+    
+    vacation = models.CharField(max_length=20, verbose_name="Vacation")
+    operator = models.ForeignKey(
+        'planification.Operator',
+        on_delete=models.CASCADE,
+        related_name='production_rollups',
+        verbose_name="Opérateur"
+    )
+    
+    class Meta:
+        verbose_name = "Cumul par opérateur"
+        verbose_name_plural = "Cumuls par opérateur"
+        ordering = ['date', 'vacation', 'operator']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'vacation', 'operator'], name='unique_operator_rollup')
+        ]
+        indexes = [
+            models.Index(fields=['operator', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"Cumul du {self.date} - {self.vacation} - {self.operator}"
+
+
+class ProductionAlert(models.Model):
+    """
+    Alerte de production déclenchée par une règle du catalogue.
+    
+    Recalculée avec les cumuls des dates concernées (à la sauvegarde des
+    données de production) : le dashboard lit les alertes sans les évaluer.
+    """
+    
+    rule = models.ForeignKey(
+        'catalog.ProductionAlertRule',
+        on_delete=models.CASCADE,
+        related_name='alerts',
+        verbose_name="Règle"
+    )
+    shift = models.ForeignKey(
+        'production.Shift',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='production_alerts',
+        verbose_name="Poste",
+        help_text="Vide pour une alerte sur la journée"
+    )
+    date = models.DateField(verbose_name="Date")
+    severity = models.CharField(max_length=10, verbose_name="Sévérité")
+    value = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Valeur")
+    message = models.CharField(max_length=255, verbose_name="Message")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Alerte de production"
+        verbose_name_plural = "Alertes de production"
+        ordering = ['date', 'id']
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+    
+    def __str__(self):
+        return self.message
+
+
+class PickListJob(models.Model):
+    """Génération d'une pick-list PDF, traitée en arrière-plan par le worker."""
+    
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('done', 'Terminée'),
+        ('failed', 'En erreur'),
+    ]
+    
+    report_name = models.CharField(max_length=20, verbose_name="Nom du rapport")
+    roll_ids = models.JSONField(default=list, verbose_name="Rouleaux sélectionnés")
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='pending',
+        verbose_name="Statut"
+    )
+    message = models.TextField(blank=True, verbose_name="Message")
+    file_path = models.CharField(max_length=500, blank=True, verbose_name="Fichier généré")
+    
+    # Résumé du rapport généré
+    rolls_count = models.PositiveIntegerField(default=0, verbose_name="Nombre de rouleaux")
+    total_length = models.FloatField(default=0, verbose_name="Longueur totale (m)")
+    unique_ofs = models.JSONField(default=list, verbose_name="OF")
+    
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Tentatives")
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='pick_list_jobs',
+        verbose_name="Demandé par"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Début du traitement")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Fin du traitement")
+    
+    class Meta:
+        verbose_name = "Génération de pick-list"
+        verbose_name_plural = "Générations de pick-lists"
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.report_name} ({self.get_status_display()})"
@@ -0,0 +1,181 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from catalog.models import ProductionAlertRule, ProfileTemplate
+from production.models import Shift, Roll
+from quality.models import RollDefect
+from wcm.models import LostTimeEntry
+from ..models import DailyProductionRollup, ProductionAlert
+from .report_service import ReportService
+
+logger = logging.getLogger(__name__)
+
+
+class AlertService:
+    """
+    Moteur d'alertes de production basé sur les règles du catalogue.
+    
+    Les règles actives sont évaluées pour les dates recalculées par les
+    cumuls (à la sauvegarde des données) : indicateurs par poste en trois
+    requêtes groupées, indicateurs par jour depuis les cumuls journaliers.
+    Le nombre de requêtes ne dépend ni du nombre de postes ni du nombre
+    de règles.
+    """
+    
+    # Dates réévaluées lorsqu'une règle ou un objectif TRS change
+    recent_days = 31
+    
+    @classmethod
+    def refresh_dates(cls, dates):
+        """
+        Réévaluer toutes les règles actives pour une liste de dates.
+        
+        Returns:
+            int: Nombre d'alertes déclenchées
+        """
+        dates = sorted(set(dates))
+        rules = list(ProductionAlertRule.objects.filter(is_active=True).order_by('order', 'id'))
+        shift_rules = [rule for rule in rules if rule.scope == 'shift']
+        day_rules = [rule for rule in rules if rule.scope == 'day']
+        
+        # Objectifs TRS par profil (seuil des règles TRS sans seuil fixe)
+        oee_targets, default_target = {}, None
+        if any(rule.threshold is None for rule in rules):
+            for name, target, is_default in ProfileTemplate.objects.values_list('name', 'oee_target', 'is_default'):
+                oee_targets[name] = target
+                if is_default:
+                    default_target = target
+        
+        alerts = []
+        
+        if shift_rules:
+            for shift, metrics in cls._get_shift_metrics(dates):
+                target = oee_targets.get(metrics.pop('profile_name'), default_target)
+                for rule in shift_rules:
+                    alert = cls._safe_evaluate(rule, metrics, target, shift.date, shift=shift)
+                    if alert:
+                        alerts.append(alert)
+        
+        if day_rules:
+            for rollup in DailyProductionRollup.objects.filter(date__in=dates).order_by('date'):
+                metrics = {
+                    'trs': rollup.avg_trs if rollup.trs_count or rollup.fallback_length else None,
+                    'blocking_defects': rollup.blocking_defects_count,
+                    'blocking_defects_rate': cls._rate(rollup.blocking_defects_count, rollup.rolls_count),
+                    'lost_time': rollup.lost_time,
+                }
+                for rule in day_rules:
+                    alert = cls._safe_evaluate(rule, metrics, default_target, rollup.date)
+                    if alert:
+                        alerts.append(alert)
+        
+        with transaction.atomic():
+            ProductionAlert.objects.filter(date__in=dates).delete()
+            ProductionAlert.objects.bulk_create(alerts)
+        
+        return len(alerts)
+    
+    @classmethod
+    def refresh_recent(cls):
+        """Réévaluer les derniers jours (règle ou objectif TRS modifié)."""
+        today = timezone.now().date()
+        return cls.refresh_dates([today - timedelta(days=i) for i in range(cls.recent_days)])
+    
+    @staticmethod
+    def _rate(count, total):
+        return round(count / total * 100, 1) if total else None
+    
+    @classmethod
+    def _get_shift_metrics(cls, dates):
+        """
+        Indicateurs des postes des dates données.
+        
+        Returns:
+            list: [(shift, {indicateur: valeur})]
+        """
+        shifts = list(
+            Shift.objects.filter(date__in=dates).select_related('trs').order_by('date', 'id')
+        )
+        shift_ids = [shift.id for shift in shifts]
+        
+        rolls_counts = dict(
+            Roll.objects.filter(shift_id__in=shift_ids).values('shift').annotate(
+                count=Count('id')
+            ).order_by().values_list('shift', 'count')
+        )
+        blocking_counts = dict(
+            RollDefect.objects.filter(
+                roll__shift_id__in=shift_ids, defect_type__severity='blocking'
+            ).values('roll__shift').annotate(
+                count=Count('id')
+            ).order_by().values_list('roll__shift', 'count')
+        )
+        lost_times = dict(
+            LostTimeEntry.objects.filter(shift_id__in=shift_ids).values('shift').annotate(
+                total=Sum('duration')
+            ).order_by().values_list('shift', 'total')
+        )
+        
+        results = []
+        for shift in shifts:
+            lost_time = lost_times.get(shift.id) or 0
+            blocking_defects = blocking_counts.get(shift.id, 0)
+            
+            if hasattr(shift, 'trs'):
+                trs_value = float(shift.trs.trs_percentage)
+                profile_name = shift.trs.profile_name
+            else:
+                # Anciens postes sans TRS enregistré
+                trs_value = ReportService._calculate_kpis(shift, lost_time_total=lost_time)['trs']
+                profile_name = None
+            
+            results.append((shift, {
+                'trs': trs_value,
+                'blocking_defects': blocking_defects,
+                'blocking_defects_rate': cls._rate(blocking_defects, rolls_counts.get(shift.id, 0)),
+                'lost_time': lost_time,
+                'profile_name': profile_name,
+            }))
+        
+        return results
+    
+    @classmethod
+    def _safe_evaluate(cls, rule, metrics, oee_target, date, shift=None):
+        """Évaluer une règle sans qu'une règle en erreur n'empêche les autres."""
+        try:
+            return cls._evaluate(rule, metrics, oee_target, date, shift=shift)
+        except Exception as e:
+            logger.error(f"Erreur évaluation règle d'alerte {rule.code}: {str(e)}", exc_info=True)
+            return None
+    
+    @staticmethod
+    def _evaluate(rule, metrics, oee_target, date, shift=None):
+        """Alerte (non enregistrée) si la règle est déclenchée, sinon None."""
+        value = metrics.get(rule.metric)
+        threshold = rule.threshold
+        if threshold is None and rule.metric == 'trs':
+            threshold = oee_target
+        if value is None or threshold is None:
+            return None
+        
+        if not rule.is_triggered(value, float(threshold)):
+            return None
+        
+        return ProductionAlert(
+            rule=rule,
+            shift=shift,
+            date=date,
+            severity=rule.get_severity(value),
+            value=value,
+            # Tronqué à la taille de la colonne (règles enregistrées avant validation)
+            message=rule.format_message(
+                value=value,
+                threshold=float(threshold),
+                shift_id=shift.shift_id if shift else '',
+                date=date.strftime('%d/%m/%Y')
+            )[:rule.get_message_max_length()]
+        )
@@ -1,8 +1,10 @@
+from collections import Counter
 from django.db import transaction
 from django.utils import timezone
-from django.db.models import Q, Count
+from django.db.models import Q, Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 
-from wcm.models import ChecklistResponse
+from wcm.models import ChecklistResponse, ChecklistAnswer
 from production.models import Shift
 from catalog.models import WcmChecklistItem
 
@@ -98,67 +100,26 @@ class ChecklistService:
             'operator'
         ).get(pk=checklist_id)
         
-        # Récupérer uniquement les items qui ont des réponses dans cette checklist
-        # La nouvelle structure a les réponses dans les clés numériques
-        # et les métadonnées dans _items, _items_order, _comments
-        item_ids_with_responses = []
-        for item_id in checklist.responses.keys():
-            if item_id.startswith('_'):
-                continue  # Ignorer les clés metadata
-            try:
-                item_ids_with_responses.append(int(item_id))
-            except ValueError:
-                continue
-        
-        # Récupérer les items correspondants
-        items_with_responses = WcmChecklistItem.objects.filter(
-            id__in=item_ids_with_responses
-        ).order_by('category', 'text')
-        
-        # Créer un dictionnaire pour accès rapide
-        items_dict = {item.id: item for item in items_with_responses}
+        # Réponses normalisées, dans l'ordre de saisie
+        answers = list(checklist.answers.order_by('id').values_list('item_id', 'value', 'comment'))
+        items_dict = WcmChecklistItem.objects.in_bulk([item_id for item_id, _, _ in answers])
+        
+        # Texte des items supprimés du catalogue : conservé dans _items
+        items_data = checklist.responses.get('_items', {})
         
         # Organiser les réponses par catégorie
         items_by_category = {}
         
-        # Récupérer les commentaires s'ils existent
-        comments = checklist.responses.get('_comments', {})
-        
-        # Parcourir les réponses de la checklist
-        for item_id_str, response in checklist.responses.items():
-            # Ignorer les clés metadata
-            if item_id_str.startswith('_'):
-                continue
-                
-            try:
-                item_id = int(item_id_str)
-            except ValueError:
-                continue
-            
-            # Récupérer l'item correspondant
+        for item_id, response, comment in answers:
             item = items_dict.get(item_id)
-            if not item:
-                # Si l'item n'existe plus dans la base, utiliser le texte stocké dans _items
-                items_data = checklist.responses.get('_items', {})
-                item_text = items_data.get(item_id_str, f"Item #{item_id}")
-                # Créer un objet factice pour cet item
-                class FakeItem:
-                    def __init__(self, id, text):
-                        self.id = id
-                        self.text = text
-                        self.category = "Autres"  # Catégorie par défaut
-                item = FakeItem(item_id, item_text)
-            
-            # Ajouter la catégorie si elle n'existe pas
-            if item.category not in items_by_category:
-                items_by_category[item.category] = []
+            if item:
+                category, label = item.category, item.text
+            else:
+                category, label = "Autres", items_data.get(str(item_id), f"Item #{item_id}")
             
-            # Récupérer le commentaire s'il existe
-            comment = comments.get(item_id_str, '')
-            
-            items_by_category[item.category].append({
-                'id': item.id,
-                'label': item.text,
+            items_by_category.setdefault(category, []).append({
+                'id': item_id,
+                'label': label,
                 'is_mandatory': False,  # Ce champ n'existe plus dans le modèle
                 'response': response,
                 'comment': comment,
@@ -171,11 +132,12 @@ class ChecklistService:
         for category in items_by_category:
             items_by_category[category].sort(key=lambda x: x['label'])
         
-        # Calculer les statistiques basées sur les réponses réelles
-        total_items = len(checklist.responses)
-        ok_count = sum(1 for r in checklist.responses.values() if r == 'ok')
-        nok_count = sum(1 for r in checklist.responses.values() if r == 'nok')
-        na_count = sum(1 for r in checklist.responses.values() if r == 'na')
+        # Statistiques sur les réponses (sans les métadonnées du JSON)
+        counts = Counter(response for _, response, _ in answers)
+        total_items = len(answers)
+        ok_count = counts['ok']
+        nok_count = counts['nok']
+        na_count = counts['na']
         
         return {
             'checklist': checklist,
@@ -249,48 +211,64 @@ class ChecklistService:
         """
         Analyse les non-conformités dans les checklists.
         
+        Requêtes groupées sur les réponses normalisées (ChecklistAnswer),
+        indépendantes du nombre de checklists.
+        
         Args:
             checklists: QuerySet de checklists
             
         Returns:
             dict: Analyse des non-conformités
         """
-        # Récupérer tous les items
-        all_items = {
-            str(item.id): item 
-            for item in WcmChecklistItem.objects.filter(is_active=True)
-        }
+        answers = ChecklistAnswer.objects.filter(checklist__in=checklists)
+        nok_answers = answers.filter(value='nok')
         
-        # Compter les NOK par item
-        nok_counts = {}
-        total_nok = 0
-        
-        for checklist in checklists:
-            for item_id, response in checklist.responses.items():
-                if response == 'nok':
-                    total_nok += 1
-                    if item_id not in nok_counts:
-                        nok_counts[item_id] = {
-                            'count': 0,
-                            'label': all_items.get(item_id).text if item_id in all_items else 'Item inconnu',
-                            'category': all_items.get(item_id).category if item_id in all_items else 'Inconnu'
-                        }
-                    nok_counts[item_id]['count'] += 1
-        
-        # Trier par nombre de NOK décroissant
-        top_nok_items = sorted(
-            nok_counts.values(),
-            key=lambda x: x['count'],
-            reverse=True
-        )[:10]
+        totals = nok_answers.aggregate(
+            total=Count('id'),
+            checklists=Count('checklist', distinct=True)
+        )
+        
+        # 10 items les plus souvent NOK
+        top_rows = list(
+            nok_answers.values('item_id').annotate(count=Count('id')).order_by('-count', 'item_id')[:10]
+        )
+        items = WcmChecklistItem.objects.filter(is_active=True).in_bulk(
+            [row['item_id'] for row in top_rows]
+        )
+        top_nok_items = [
+            {
+                'count': row['count'],
+                'label': items[row['item_id']].text if row['item_id'] in items else 'Item inconnu',
+                'category': items[row['item_id']].category if row['item_id'] in items else 'Inconnu'
+            }
+            for row in top_rows
+        ]
+        
+        # Taux de NOK par catégorie d'item. Sous-requête et non item__category :
+        # la jointure sur item serait un INNER JOIN (clé non nulle) et écarterait
+        # les réponses des items supprimés du catalogue (regroupées avec les
+        # items sans catégorie)
+        item_category = WcmChecklistItem.objects.filter(pk=OuterRef('item_id')).values('category')[:1]
+        categories = [
+            {
+                'category': row['item_category'] or 'Sans catégorie',
+                'answers_count': row['answers_count'],
+                'nok_count': row['nok_count'],
+                'nok_rate': round(row['nok_count'] / row['answers_count'] * 100, 1)
+            }
+            for row in answers.annotate(
+                item_category=Coalesce(Subquery(item_category), Value(''))
+            ).values('item_category').annotate(
+                answers_count=Count('id'),
+                nok_count=Count('id', filter=Q(value='nok'))
+            ).order_by('item_category')
+        ]
         
         return {
-            'total_nok': total_nok,
-            'checklists_with_nok': sum(
-                1 for c in checklists 
-                if any(r == 'nok' for r in c.responses.values())
-            ),
-            'top_nok_items': top_nok_items
+            'total_nok': totals['total'],
+            'checklists_with_nok': totals['checklists'],
+            'top_nok_items': top_nok_items,
+            'categories': categories
         }
     
     @staticmethod
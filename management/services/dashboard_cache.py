@@ -0,0 +1,49 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.utils import timezone
+
+
+class DashboardCache:
+    """
+    Cache des statistiques du dashboard, invalidé par version de données.
+    
+    Toute modification d'un poste, rouleau, défaut, temps perdu, TRS ou
+    compteur d'humeur change la version (signaux, au commit). Les réponses
+    sont stockées sous (mode, date sélectionnée, jour courant, version) :
+    tant que rien ne change, un rafraîchissement coûte une lecture de cache.
+    """
+    
+    VERSION_KEY = 'management:data_version'
+    timeout = 60 * 60  # Les anciennes versions expirent d'elles-mêmes
+    
+    @classmethod
+    def get_data_version(cls):
+        """Version courante des données (créée si absente du cache)."""
+        version = cache.get(cls.VERSION_KEY)
+        if version is None:
+            cache.add(cls.VERSION_KEY, str(time.time_ns()), None)
+            version = cache.get(cls.VERSION_KEY)
+        return version
+    
+    @classmethod
+    def bump_data_version(cls):
+        """Invalider toutes les réponses en cache (nouvelle version)."""
+        cache.set(cls.VERSION_KEY, str(time.time_ns()), None)
+    
+    @classmethod
+    def get_etag(cls, mode, selected_date):
+        """ETag d'une réponse : change avec la version et le jour courant."""
+        key = f"{mode}:{selected_date}:{timezone.now().date()}:{cls.get_data_version()}"
+        return hashlib.md5(key.encode()).hexdigest()
+    
+    @classmethod
+    def get_or_compute(cls, etag, compute):
+        """Retourner la réponse en cache pour cet ETag, ou la calculer et la stocker."""
+        key = f'management:dashboard:{etag}'
+        data = cache.get(key)
+        if data is None:
+            data = compute()
+            cache.set(key, data, cls.timeout)
+        return data
@@ -0,0 +1,246 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+
+from exporting.services import ExportQueueService
+from production.models import Roll
+from ..models import PickListJob
+from .dashboard_cache import DashboardCache
+from .pick_list_report_builder import PickListReportBuilder
+from .pick_list_service import PickListService
+from .rollup_service import RollupService
+
+logger = logging.getLogger(__name__)
+
+
+class PickListJobService:
+    """
+    Génération des pick-lists PDF en arrière-plan.
+    
+    L'API enregistre une demande (PickListJob) et répond immédiatement ;
+    le worker process_pick_list_jobs construit les données, génère le PDF
+    et assigne les rouleaux au pré-shipper. Le navigateur suit l'avancement
+    par l'endpoint de statut puis télécharge le fichier.
+    """
+    
+    # Au-delà, un traitement « en cours » est considéré abandonné (worker arrêté)
+    stale_after = timedelta(minutes=15)
+    max_attempts = 3
+    
+    @classmethod
+    def enqueue(cls, roll_ids, report_name, user=None):
+        """
+        Enregistrer une demande de génération (traitée par le worker).
+        
+        Réimpression à l'identique : si le PDF de cette sélection existe déjà
+        en cache, la demande est terminée tout de suite (empreinte calculée
+        sur deux requêtes légères, sans construire le rapport). Sinon la
+        génération reste à la charge du worker.
+        """
+        job = PickListJob.objects.create(
+            report_name=report_name,
+            roll_ids=[int(roll_id) for roll_id in roll_ids],
+            created_by=user if user and user.is_authenticated else None
+        )
+        
+        summaries = PickListReportBuilder.get_roll_summaries(job.roll_ids)
+        if summaries:
+            cache_key = PickListService.get_cache_key(
+                report_name,
+                [(roll_id, version) for roll_id, version, _, _ in summaries]
+            )
+            file_path = PickListService.get_cached_pdf(report_name, cache_key)
+            if file_path and cls._claim(job):
+                cls._complete(
+                    job,
+                    file_path,
+                    f"Pick-list {report_name}.pdf générée avec succès (déjà en cache)",
+                    roll_ids=[roll_id for roll_id, _, _, _ in summaries],
+                    total_length=sum(float(length or 0) for _, _, length, _ in summaries),
+                    unique_ofs=list(set(of_number for _, _, _, of_number in summaries if of_number))
+                )
+        
+        return job
+    
+    @staticmethod
+    def _claim(job):
+        """Passer une demande en attente à « en cours » (UPDATE conditionnel sur le statut)."""
+        claimed = PickListJob.objects.filter(pk=job.pk, status='pending').update(
+            status='running',
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1
+        )
+        if claimed:
+            job.refresh_from_db()
+        return bool(claimed)
+    
+    @classmethod
+    def claim_next(cls):
+        """
+        Réserver la plus ancienne demande en attente pour ce worker.
+        
+        La réservation est un UPDATE conditionnel sur le statut : deux
+        workers ne traitent jamais la même demande.
+        
+        Returns:
+            PickListJob | None
+        """
+        for job in PickListJob.objects.filter(status='pending').order_by('created_at', 'id')[:10]:
+            if cls._claim(job):
+                return job
+        return None
+    
+    @classmethod
+    def run(cls, job):
+        """Générer le PDF d'une demande et assigner ses rouleaux au pré-shipper."""
+        try:
+            # Versions lues avant le rapport : une modification entre les deux
+            # donne une empreinte périmée, jamais un PDF périmé sous une empreinte neuve
+            summaries = PickListReportBuilder.get_roll_summaries(job.roll_ids)
+            rolls = list(PickListReportBuilder.get_rolls(job.roll_ids))
+            if not rolls:
+                success, file_path, message = False, '', 'Aucun rouleau conforme trouvé'
+            else:
+                report_data = PickListReportBuilder(rolls).build()
+                # PDF resservi depuis le cache si ni la sélection ni les rouleaux n'ont changé
+                success, file_path, message = PickListService().generate_pick_list_pdf(
+                    rolls_data=report_data,
+                    report_name=job.report_name,
+                    cache_key=PickListService.get_cache_key(
+                        job.report_name,
+                        [(roll_id, version) for roll_id, version, _, _ in summaries]
+                    )
+                )
+        except Exception as e:
+            logger.error(f"Erreur génération pick-list {job.report_name}: {str(e)}", exc_info=True)
+            success, file_path, message = False, '', f"Erreur lors de la génération du PDF: {str(e)}"
+        
+        if not success:
+            job.status = 'failed'
+            job.message = message
+            job.finished_at = timezone.now()
+            job.save()
+            return job
+        
+        return cls._complete(
+            job,
+            file_path,
+            message,
+            roll_ids=[roll.id for roll in rolls],
+            total_length=report_data['total_length'],
+            unique_ofs=report_data['unique_ofs']
+        )
+    
+    @staticmethod
+    def _complete(job, file_path, message, roll_ids, total_length, unique_ofs):
+        """
+        Terminer une demande et assigner ses rouleaux au pré-shipper.
+        
+        Les demandes du même nom sont verrouillées (dans l'ordre des IDs) :
+        si une autre s'est terminée pendant le traitement de celle-ci, elle
+        échoue sans réassigner les rouleaux. L'assignation passe par update()
+        (pas de post_save) : exports, cumuls, version du dashboard et cache
+        des pick-lists précédentes des rouleaux sont mis à jour ici.
+        """
+        with transaction.atomic():
+            same_name = list(
+                PickListJob.objects.select_for_update().filter(report_name=job.report_name).order_by('id')
+            )
+            if any(
+                other.pk != job.pk and other.status == 'done' and other.finished_at >= job.created_at
+                for other in same_name
+            ):
+                job.status = 'failed'
+                job.message = f"La pick-list {job.report_name} a déjà été générée par une autre demande"
+                job.finished_at = timezone.now()
+                job.save()
+                return job
+            
+            rolls = Roll.objects.filter(id__in=roll_ids)
+            previous_reports = set(
+                rolls.exclude(preshipper_assigned__isnull=True).exclude(
+                    preshipper_assigned__in=['', job.report_name]
+                ).values_list('preshipper_assigned', flat=True).distinct()
+            )
+            # update : ne modifie pas updated_at, l'empreinte du cache reste valable
+            rolls.update(
+                preshipper_assigned=job.report_name,
+                preshipper_assigned_at=timezone.now()
+            )
+            ExportQueueService.enqueue_many('roll', roll_ids)
+            RollupService.schedule(roll_ids=roll_ids)
+            transaction.on_commit(DashboardCache.bump_data_version)
+            
+            job.status = 'done'
+            job.message = message
+            job.finished_at = timezone.now()
+            job.file_path = file_path
+            job.rolls_count = len(roll_ids)
+            job.total_length = total_length
+            job.unique_ofs = unique_ofs
+            job.save()
+        
+        # Pick-lists d'où viennent les rouleaux réassignés, anciennes versions de celle-ci
+        for report_name in previous_reports:
+            PickListService.evict(report_name)
+        PickListService.evict(job.report_name, keep=file_path)
+        return job
+    
+    @classmethod
+    def requeue_stale(cls):
+        """Remettre en attente les traitements interrompus (abandonnés au-delà de max_attempts)."""
+        stale = PickListJob.objects.filter(
+            status='running',
+            started_at__lt=timezone.now() - cls.stale_after
+        )
+        stale.filter(attempts__gte=cls.max_attempts).update(
+            status='failed',
+            message='Génération interrompue',
+            finished_at=timezone.now()
+        )
+        return stale.update(status='pending')
+    
+    @classmethod
+    def process_pending(cls, limit=10):
+        """
+        Traiter les demandes en attente.
+        
+        Returns:
+            dict: Nombre de demandes terminées et en erreur
+        """
+        stats = {'done': 0, 'failed': 0}
+        cls.requeue_stale()
+        
+        for _ in range(limit):
+            job = cls.claim_next()
+            if job is None:
+                break
+            cls.run(job)
+            stats[job.status] += 1
+        
+        return stats
+    
+    @staticmethod
+    def get_status_data(job):
+        """Représentation JSON d'une demande pour l'endpoint de statut."""
+        data = {
+            'job_id': job.id,
+            'report_name': job.report_name,
+            'status': job.status,
+            'message': job.message,
+            'created_at': job.created_at.isoformat(),
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        }
+        if job.status == 'done':
+            data.update({
+                'success': True,
+                'download_url': reverse('management:api-pick-list-job-download', args=[job.id]),
+                'rolls_count': job.rolls_count,
+                'total_length': job.total_length,
+                'unique_ofs': job.unique_ofs,
+            })
+        return data
@@ -0,0 +1,155 @@
+from django.db.models import Count, Max, Prefetch
+from django.utils import timezone
+
+from production.models import Roll
+from quality.models import Controls, RollDefect
+
+
+class PickListReportBuilder:
+    """
+    Construction des données d'une pick-list (rapport PDF).
+    
+    Les rouleaux sont lus une seule fois avec leurs relations : trois
+    requêtes quel que soit le nombre de rouleaux (rouleaux avec poste,
+    opérateur et OF ; défauts avec leur type ; contrôles qualité des
+    postes). Le résumé des contrôles qualité est calculé une fois par
+    poste, les rouleaux d'un même poste le partagent.
+    """
+    
+    def __init__(self, rolls):
+        self.rolls = list(rolls)
+        self._quality_controls = {}
+    
+    @staticmethod
+    def get_rolls(roll_ids):
+        """Rouleaux conformes sélectionnés (assignés ou non), dans l'ordre du rapport."""
+        return Roll.objects.filter(
+            id__in=roll_ids,
+            status='CONFORME'
+        ).select_related(
+            'shift__operator',
+            'fabrication_order'
+        ).prefetch_related(
+            Prefetch('defects', queryset=RollDefect.objects.select_related('defect_type')),
+            Prefetch('shift__quality_controls', queryset=Controls.objects.order_by('-created_at'))
+        ).order_by('fabrication_order__order_number', 'roll_number')
+    
+    # Champs du dernier contrôle qualité repris dans le rapport (voir _get_quality_controls)
+    QUALITY_CONTROL_FIELDS = [
+        'micrometer_left_avg', 'micrometer_right_avg',
+        'surface_mass_left_avg', 'surface_mass_right_avg',
+        'dry_extract', 'loi_given'
+    ]
+    
+    @classmethod
+    def get_roll_summaries(cls, roll_ids):
+        """
+        Résumé des rouleaux conformes sélectionnés, sans leurs relations.
+        
+        Deux requêtes : rouleaux avec l'état de leurs défauts (nombre, plus
+        grand ID, dernière modification), puis derniers contrôles qualité
+        de leurs postes. Suffit pour l'empreinte du cache PDF et les totaux
+        de la pick-list : l'ajout, la modification ou la suppression d'un
+        défaut ou d'un contrôle change la version du rouleau, même si
+        Roll.updated_at ne bouge pas (bulk_create, suppression, etc.).
+        
+        Returns:
+            list: Tuples (id, version, length, numéro d'OF)
+        """
+        rows = list(Roll.objects.filter(
+            id__in=roll_ids,
+            status='CONFORME'
+        ).annotate(
+            defects_count=Count('defects'),
+            defects_max_id=Max('defects__id'),
+            defects_max_updated_at=Max('defects__updated_at')
+        ).values_list(
+            'id', 'updated_at', 'length', 'fabrication_order__order_number', 'shift_id',
+            'defects_count', 'defects_max_id', 'defects_max_updated_at'
+        ))
+        
+        # Dernier contrôle par poste (même ordre que le préchargement de get_rolls)
+        quality_controls = {}
+        for control in Controls.objects.filter(
+            shift_id__in={row[4] for row in rows if row[4]}
+        ).order_by('shift_id', '-created_at').values_list('shift_id', 'id', *cls.QUALITY_CONTROL_FIELDS):
+            quality_controls.setdefault(control[0], control[1:])
+        
+        return [
+            (
+                roll_id,
+                '/'.join(str(part) for part in (
+                    updated_at.isoformat(), defects_count, defects_max_id,
+                    defects_max_updated_at.isoformat() if defects_max_updated_at else None,
+                    quality_controls.get(shift_id)
+                )),
+                length,
+                of_number
+            )
+            for (roll_id, updated_at, length, of_number, shift_id,
+                 defects_count, defects_max_id, defects_max_updated_at) in rows
+        ]
+    
+    def build(self):
+        """Données du rapport PDF (structure attendue par PickListService)."""
+        rolls_data = [self._get_roll_data(roll) for roll in self.rolls]
+        
+        return {
+            'title': 'Pick-list',
+            'generated_at': timezone.now().isoformat(),
+            'rolls_count': len(self.rolls),
+            'total_length': sum(float(roll.length or 0) for roll in self.rolls),
+            'unique_ofs': list(set(data['fabrication_order'] for data in rolls_data if data['fabrication_order'])),
+            'rolls': rolls_data
+        }
+    
+    def _get_operator(self, roll):
+        if roll.shift and roll.shift.operator:
+            return f"{roll.shift.operator.first_name} {roll.shift.operator.last_name.upper()}"
+        if roll.shift_id_str:
+            parts = roll.shift_id_str.split('_')
+            return parts[1] if len(parts) > 1 else None
+        return None
+    
+    def _get_quality_controls(self, shift):
+        """Résumé du dernier contrôle qualité d'un poste (calculé une fois par poste)."""
+        if shift.id not in self._quality_controls:
+            controls = shift.quality_controls.all()
+            qc = controls[0] if controls else None
+            self._quality_controls[shift.id] = {
+                'micrometer_left_avg': float(qc.micrometer_left_avg) if qc.micrometer_left_avg else None,
+                'micrometer_right_avg': float(qc.micrometer_right_avg) if qc.micrometer_right_avg else None,
+                'surface_mass_left_avg': float(qc.surface_mass_left_avg) if qc.surface_mass_left_avg else None,
+                'surface_mass_right_avg': float(qc.surface_mass_right_avg) if qc.surface_mass_right_avg else None,
+                'dry_extract': float(qc.dry_extract) if qc.dry_extract else None,
+                'loi_given': qc.loi_given
+            } if qc else None
+        return self._quality_controls[shift.id]
+    
+    def _get_roll_data(self, roll):
+        defects = [
+            {
+                'type': defect.defect_type.name,
+                'position': defect.meter_position,
+                'side': defect.get_side_position_display(),
+                'severity': defect.defect_type.severity
+            }
+            for defect in roll.defects.all()
+        ]
+        
+        return {
+            'roll_id': roll.roll_id,
+            'fabrication_order': roll.fabrication_order.order_number if roll.fabrication_order else None,
+            'length': float(roll.length) if roll.length else None,
+            'operator': self._get_operator(roll),
+            'production_date': roll.created_at.isoformat(),
+            'avg_thickness_left': float(roll.avg_thickness_left) if roll.avg_thickness_left else None,
+            'avg_thickness_right': float(roll.avg_thickness_right) if roll.avg_thickness_right else None,
+            'grammage_calc': float(roll.grammage_calc) if roll.grammage_calc else None,
+            'tube_mass': float(roll.tube_mass) if roll.tube_mass else None,
+            'total_mass': float(roll.total_mass) if roll.total_mass else None,
+            'net_mass': float(roll.net_mass) if roll.net_mass else None,
+            'defects': defects,
+            'quality_controls': self._get_quality_controls(roll.shift) if roll.shift else None,
+            'comment': roll.comment or ''
+        }
@@ -2,8 +2,15 @@
 Service de génération de pick-list PDF pour les rouleaux sélectionnés.
 """
 
+import copy
+import glob
+import hashlib
+import io
 import os
+import threading
 from datetime import datetime
+from itertools import groupby
+from types import MappingProxyType
 from django.conf import settings
 from django.http import HttpResponse
 from reportlab.lib import colors
@@ -15,96 +22,274 @@ from reportlab.graphics.shapes import Drawing, Rect
 from reportlab.graphics import renderPDF
 from reportlab.platypus.tableofcontents import TableOfContents
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.pdfgen import canvas
+
+
+class NumberedCanvas(canvas.Canvas):
+    """Canvas ajoutant « Page x / y » en bas de chaque page (total connu à l'enregistrement)."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._saved_page_states = []
+    
+    def showPage(self):
+        self._saved_page_states.append(dict(self.__dict__))
+        self._startPage()
+    
+    def save(self):
+        total = len(self._saved_page_states)
+        for state in self._saved_page_states:
+            self.__dict__.update(state)
+            self.setFont('Helvetica', 8)
+            self.setFillColor(colors.HexColor('#6c757d'))
+            self.drawRightString(A4[0] - 2*cm, 1*cm, f"Page {self._pageNumber} / {total}")
+            super().showPage()
+        super().save()
+
+
+def _build_styles():
+    """Feuille de styles des pick-lists (styles ReportLab de base + personnalisés)."""
+    styles = getSampleStyleSheet()
+    
+    # Style titre principal
+    styles.add(ParagraphStyle(
+        name='CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=22,
+        spaceAfter=25,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#0E4E95'),
+        fontName='Helvetica-Bold'
+    ))
+    
+    # Style sous-titre
+    styles.add(ParagraphStyle(
+        name='CustomSubtitle',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=15,
+        spaceBefore=10,
+        alignment=TA_LEFT,
+        textColor=colors.HexColor('#EC1846'),
+        fontName='Helvetica-Bold'
+    ))
+    
+    # Style info
+    styles.add(ParagraphStyle(
+        name='InfoStyle',
+        parent=styles['Normal'],
+        fontSize=10,
+        spaceAfter=8,
+        alignment=TA_LEFT,
+        fontName='Helvetica'
+    ))
+    
+    # Style adresse élégant
+    styles.add(ParagraphStyle(
+        name='AddressStyle',
+        parent=styles['Normal'],
+        fontSize=11,
+        alignment=TA_CENTER,
+        spaceAfter=20,
+        spaceBefore=10,
+        textColor=colors.HexColor('#2c3e50'),
+        fontName='Helvetica'
+    ))
+    
+    # Style référence
+    styles.add(ParagraphStyle(
+        name='RefStyle',
+        parent=styles['Normal'],
+        fontSize=16,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#EC1846'),
+        spaceBefore=10,
+        spaceAfter=25,
+        fontName='Helvetica-Bold'
+    ))
+    
+    # Titre de remplacement du logo
+    styles.add(ParagraphStyle(
+        name='SGQTitle',
+        parent=styles['Normal'],
+        alignment=TA_CENTER,
+        spaceBefore=15,
+        spaceAfter=15
+    ))
+    
+    # Titre des moyennes des contrôles qualité
+    styles.add(ParagraphStyle(
+        name='QCAvgTitle',
+        parent=styles['Normal'],
+        fontSize=12,
+        textColor=colors.HexColor('#0096D5'),
+        spaceBefore=10,
+        spaceAfter=10,
+        alignment=TA_LEFT
+    ))
+    
+    # Note de bas de page
+    styles.add(ParagraphStyle(
+        name='FooterNote',
+        parent=styles['Normal'],
+        fontSize=9,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#6c757d'),
+        spaceBefore=10
+    ))
+    
+    return styles
+
+
+def _build_gradient_bar():
+    """Créer une barre élégante avec les couleurs du gradient Saint-Gobain."""
+    # Couleurs du gradient Saint-Gobain
+    colors_sg = [
+        colors.HexColor('#43B0B1'),  # Turquoise
+        colors.HexColor('#0096D5'),  # Bleu clair
+        colors.HexColor('#0E4E95'),  # Bleu foncé
+        colors.HexColor('#EC1846'),  # Rouge
+        colors.HexColor('#F26F21'),  # Orange
+    ]
+    
+    # Créer un drawing pour la barre fine sur toute la largeur
+    drawing = Drawing(18*cm, 0.3*cm)
+    
+    # Largeur de chaque segment
+    segment_width = 18*cm / len(colors_sg)
+    
+    # Dessiner chaque segment sans bordures
+    for i, color in enumerate(colors_sg):
+        x_pos = i * segment_width
+        rect = Rect(x_pos, 0, segment_width, 0.3*cm)
+        rect.fillColor = color
+        rect.strokeColor = None  # Pas de bordure
+        drawing.add(rect)
+    
+    return drawing
+
+
+def _read_logo():
+    """Contenu du logo (BASE_DIR/logoForPDF.png), None s'il est absent."""
+    logo_path = os.path.join(settings.BASE_DIR, 'logoForPDF.png')
+    try:
+        with open(logo_path, 'rb') as logo_file:
+            return logo_file.read()
+    except OSError:
+        return None
+
+
+class PickListAssets:
+    """
+    Ressources partagées des pick-lists : styles, logo et barre de couleurs.
+    
+    Construites une seule fois par process, au premier PDF, puis utilisées en
+    lecture seule par toutes les générations (requêtes, threads du worker).
+    Les polices sont les polices standard PDF (Helvetica) : aucun
+    enregistrement n'est nécessaire.
+    """
+    
+    _instance = None
+    _lock = threading.Lock()
+    
+    def __init__(self):
+        self.styles = MappingProxyType({**_build_styles().byName})
+        self.logo = _read_logo()
+        self.gradient_bar = _build_gradient_bar()
+    
+    @classmethod
+    def get(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
 
 
 class PickListService:
     """Service pour générer les pick-lists PDF."""
     
     def __init__(self):
-        self.export_dir = os.path.join(settings.MEDIA_ROOT, 'pick-lists')
+        self.export_dir = self.get_export_dir()
         os.makedirs(self.export_dir, exist_ok=True)
         
-        # Styles
-        self.styles = getSampleStyleSheet()
-        self.setup_custom_styles()
-    
-    def setup_custom_styles(self):
-        """Créer les styles personnalisés."""
-        # Style titre principal
-        self.styles.add(ParagraphStyle(
-            name='CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=22,
-            spaceAfter=25,
-            alignment=TA_CENTER,
-            textColor=colors.HexColor('#0E4E95'),
-            fontName='Helvetica-Bold'
-        ))
-        
-        # Style sous-titre
-        self.styles.add(ParagraphStyle(
-            name='CustomSubtitle',
-            parent=self.styles['Heading2'],
-            fontSize=14,
-            spaceAfter=15,
-            spaceBefore=10,
-            alignment=TA_LEFT,
-            textColor=colors.HexColor('#EC1846'),
-            fontName='Helvetica-Bold'
-        ))
-        
-        # Style info
-        self.styles.add(ParagraphStyle(
-            name='InfoStyle',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            spaceAfter=8,
-            alignment=TA_LEFT,
-            fontName='Helvetica'
-        ))
-        
-        # Style adresse élégant
-        self.styles.add(ParagraphStyle(
-            name='AddressStyle',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            alignment=TA_CENTER,
-            spaceAfter=20,
-            spaceBefore=10,
-            textColor=colors.HexColor('#2c3e50'),
-            fontName='Helvetica'
-        ))
-        
-        # Style référence
-        self.styles.add(ParagraphStyle(
-            name='RefStyle',
-            parent=self.styles['Normal'],
-            fontSize=16,
-            alignment=TA_CENTER,
-            textColor=colors.HexColor('#EC1846'),
-            spaceBefore=10,
-            spaceAfter=25,
-            fontName='Helvetica-Bold'
-        ))
-    
-    def generate_pick_list_pdf(self, rolls_data, report_name):
+        # Styles et images partagés (construits au premier PDF du process)
+        self.assets = PickListAssets.get()
+        self.styles = self.assets.styles
+    
+    @staticmethod
+    def get_export_dir():
+        """Répertoire des pick-lists générées."""
+        return os.path.join(settings.MEDIA_ROOT, 'pick-lists')
+    
+    @staticmethod
+    def get_cache_key(report_name, roll_versions):
+        """
+        Empreinte d'une pick-list : nom du rapport, identifiants des rouleaux
+        et version de chacun (rouleau, défauts et contrôle qualité).
+        
+        Args:
+            roll_versions: Couples (id, version) des rouleaux, voir
+                PickListReportBuilder.get_roll_summaries
+        """
+        digest = hashlib.sha256(report_name.encode())
+        for roll_id, version in sorted(roll_versions):
+            digest.update(f"|{roll_id}:{version}".encode())
+        return digest.hexdigest()
+    
+    @classmethod
+    def get_cache_path(cls, report_name, cache_key):
+        return os.path.join(cls.get_export_dir(), f"{report_name}-{cache_key}.pdf")
+    
+    @classmethod
+    def get_cached_pdf(cls, report_name, cache_key):
+        """Chemin du PDF déjà généré pour cette empreinte, sinon None."""
+        filepath = cls.get_cache_path(report_name, cache_key)
+        return filepath if os.path.exists(filepath) else None
+    
+    @classmethod
+    def evict(cls, report_name, keep=None):
+        """Supprimer les PDF en cache d'une pick-list (sauf le chemin keep)."""
+        pattern = os.path.join(cls.get_export_dir(), f"{glob.escape(report_name)}-*.pdf")
+        for filepath in glob.glob(pattern):
+            if filepath != keep:
+                try:
+                    os.remove(filepath)
+                except FileNotFoundError:
+                    pass
+    
+    def generate_pick_list_pdf(self, rolls_data, report_name, cache_key=None):
         """
         Génère un PDF de pick-list avec les données des rouleaux.
         
+        Avec cache_key (voir get_cache_key), le PDF est enregistré sous son
+        empreinte : une sélection identique est resservie sans nouveau rendu.
+        
         Args:
             rolls_data: Dictionnaire contenant les données des rouleaux
             report_name: Nom du fichier (format S2212001)
-            
+            cache_key: Empreinte des rouleaux du rapport (optionnelle)
+        
         Returns:
             tuple: (success: bool, file_path: str, message: str)
         """
+        tmp_path = None
         try:
             filename = f"{report_name}.pdf"
-            filepath = os.path.join(self.export_dir, filename)
+            
+            if cache_key:
+                filepath = self.get_cache_path(report_name, cache_key)
+                if os.path.exists(filepath):
+                    return True, filepath, f"Pick-list {filename} générée avec succès (déjà en cache)"
+            else:
+                filepath = os.path.join(self.export_dir, filename)
+            
+            # Rendu dans un fichier temporaire : un PDF incomplet n'est jamais servi
+            tmp_path = f"{filepath}.{os.getpid()}.tmp"
             
             # Créer le document PDF
             doc = SimpleDocTemplate(
-                filepath,
+                tmp_path,
                 pagesize=A4,
                 rightMargin=2*cm,
                 leftMargin=2*cm,
@@ -134,43 +319,43 @@ class PickListService:
             story.extend(self._build_footer())
             
             # Générer le PDF
-            doc.build(story)
+            doc.build(story, canvasmaker=NumberedCanvas)
+            os.replace(tmp_path, filepath)
             
-            return True, filepath, f"Pick-list {filename} générée avec succès"
+            if cache_key:
+                # Une seule version en cache par pick-list
+                self.evict(report_name, keep=filepath)
             
+            return True, filepath, f"Pick-list {filename} générée avec succès"
+        
         except Exception as e:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
             return False, "", f"Erreur lors de la génération: {str(e)}"
     
     def _build_header(self, report_name):
         """Construire l'en-tête du document avec logo SGQ et gradient."""
         elements = []
         
-        # Ajouter le logo logoForPDF.png à la racine
-        logo_path = os.path.join(settings.BASE_DIR, 'logoForPDF.png')
+        # Logo logoForPDF.png à la racine (lu une fois par process)
         logo_loaded = False
         
-        if os.path.exists(logo_path):
+        if self.assets.logo:
             try:
-                logo = Image(logo_path, width=3*cm, height=1.3*cm)
+                logo = Image(io.BytesIO(self.assets.logo), width=3*cm, height=1.3*cm)
                 logo.hAlign = 'CENTER'
                 elements.append(logo)
                 elements.append(Spacer(1, 15))
                 logo_loaded = True
             except Exception as e:
-                print(f"Erreur chargement logo {logo_path}: {e}")
+                print(f"Erreur chargement logo logoForPDF.png: {e}")
         
         if not logo_loaded:
             # Si le logo ne peut pas être chargé, ajouter juste le titre SGQ
             title_sgq = Paragraph(
                 "<b><font size=18 color='#0E4E95'>SGQ Ligne G</font></b><br/>"
                 "<font size=12 color='#2c3e50'>Saint-Gobain Quartz</font>",
-                ParagraphStyle(
-                    name='SGQTitle',
-                    parent=self.styles['Normal'],
-                    alignment=TA_CENTER,
-                    spaceBefore=15,
-                    spaceAfter=15
-                )
+                self.styles['SGQTitle']
             )
             elements.append(title_sgq)
         
@@ -232,6 +417,11 @@ class PickListService:
         
         return elements
     
+    @staticmethod
+    def _group_by_order(rolls):
+        """Rouleaux regroupés par OF consécutifs (le rapport est trié par OF)."""
+        return [list(group) for _, group in groupby(rolls, key=lambda roll: roll.get('fabrication_order'))]
+    
     def _build_rolls_table(self, rolls):
         """Construire le tableau principal des rouleaux."""
         elements = []
@@ -246,37 +436,41 @@ class PickListService:
             'Date Prod.'
         ]
         
-        # Données du tableau
-        table_data = [headers]
+        # Une table par OF : la mise en page ReportLab d'une table découpée
+        # sur plusieurs pages croît plus vite que son nombre de lignes
+        tables_data = []
         
-        for roll in rolls:
-            # Épaisseur moyenne
-            ep_left = roll.get('avg_thickness_left')
-            ep_right = roll.get('avg_thickness_right')
+        for order_rolls in self._group_by_order(rolls):
+            table_data = [headers]
+            tables_data.append(table_data)
             
-            if ep_left and ep_right:
-                ep_moy = f"G:{ep_left:.3f}\nD:{ep_right:.3f}"
-            elif ep_left:
-                ep_moy = f"G:{ep_left:.3f}"
-            elif ep_right:
-                ep_moy = f"D:{ep_right:.3f}"
-            else:
-                ep_moy = "-"
-            
-            row = [
-                roll.get('roll_id', ''),
-                roll.get('fabrication_order', ''),
-                f"{roll.get('length', 0):.2f}" if roll.get('length') else '-',
-                ep_moy,
-                f"{roll.get('grammage_calc', 0):.1f}" if roll.get('grammage_calc') else '-',
-                datetime.fromisoformat(roll['production_date']).strftime('%d/%m/%Y') if roll.get('production_date') else ''
-            ]
-            
-            table_data.append(row)
+            for roll in order_rolls:
+                # Épaisseur moyenne
+                ep_left = roll.get('avg_thickness_left')
+                ep_right = roll.get('avg_thickness_right')
+                
+                if ep_left and ep_right:
+                    ep_moy = f"G:{ep_left:.3f}\nD:{ep_right:.3f}"
+                elif ep_left:
+                    ep_moy = f"G:{ep_left:.3f}"
+                elif ep_right:
+                    ep_moy = f"D:{ep_right:.3f}"
+                else:
+                    ep_moy = "-"
+                
+                row = [
+                    roll.get('roll_id', ''),
+                    roll.get('fabrication_order', ''),
+                    f"{roll.get('length', 0):.2f}" if roll.get('length') else '-',
+                    ep_moy,
+                    f"{roll.get('grammage_calc', 0):.1f}" if roll.get('grammage_calc') else '-',
+                    datetime.fromisoformat(roll['production_date']).strftime('%d/%m/%Y') if roll.get('production_date') else ''
+                ]
+                
+                table_data.append(row)
         
         # Créer le tableau (sans colonne Défauts)
         col_widths = [3*cm, 2*cm, 2.5*cm, 3*cm, 2.5*cm, 2.5*cm]
-        rolls_table = Table(table_data, colWidths=col_widths)
         
         # Style du tableau sans bordures
         table_style = [
@@ -300,8 +494,11 @@ class PickListService:
             ('RIGHTPADDING', (0, 0), (-1, -1), 4),
         ]
         
-        rolls_table.setStyle(TableStyle(table_style))
-        elements.append(rolls_table)
+        table_style = TableStyle(table_style)
+        for table_data in tables_data:
+            rolls_table = Table(table_data, colWidths=col_widths, repeatRows=1)
+            rolls_table.setStyle(table_style)
+            elements.append(rolls_table)
         elements.append(Spacer(1, 20))
         
         return elements
@@ -426,7 +623,8 @@ class PickListService:
             'Extrait Sec\n(%)', 'LOI'
         ]
         
-        qc_data = [qc_headers]
+        # Une table par OF, comme la liste des rouleaux
+        qc_tables_data = []
         
         # Collecte des données pour les moyennes
         micrometer_left_values = []
@@ -434,38 +632,41 @@ class PickListService:
         dry_extract_values = []
         loi_count = 0
         
-        for roll in rolls_with_qc:
-            qc = roll.get('quality_controls')
-            if qc:
-                mic_left = qc.get('micrometer_left_avg')
-                mic_right = qc.get('micrometer_right_avg')
-                dry_ext = qc.get('dry_extract')
-                
-                # Collecter pour moyennes
-                if mic_left:
-                    micrometer_left_values.append(float(mic_left))
-                if mic_right:
-                    micrometer_right_values.append(float(mic_right))
-                if dry_ext:
-                    dry_extract_values.append(float(dry_ext))
-                if qc.get('loi_given'):
-                    loi_count += 1
-                
-                row = [
-                    roll.get('roll_id', ''),
-                    f"{mic_left:.3f}" if mic_left else '-',
-                    f"{mic_right:.3f}" if mic_right else '-',
-                    f"{dry_ext:.2f}" if dry_ext else '-',
-                    'Oui' if qc.get('loi_given') else 'Non'
-                ]
-                qc_data.append(row)
+        for order_rolls in self._group_by_order(rolls_with_qc):
+            qc_data = [qc_headers]
+            qc_tables_data.append(qc_data)
+            
+            for roll in order_rolls:
+                qc = roll.get('quality_controls')
+                if qc:
+                    mic_left = qc.get('micrometer_left_avg')
+                    mic_right = qc.get('micrometer_right_avg')
+                    dry_ext = qc.get('dry_extract')
+                    
+                    # Collecter pour moyennes
+                    if mic_left:
+                        micrometer_left_values.append(float(mic_left))
+                    if mic_right:
+                        micrometer_right_values.append(float(mic_right))
+                    if dry_ext:
+                        dry_extract_values.append(float(dry_ext))
+                    if qc.get('loi_given'):
+                        loi_count += 1
+                    
+                    row = [
+                        roll.get('roll_id', ''),
+                        f"{mic_left:.3f}" if mic_left else '-',
+                        f"{mic_right:.3f}" if mic_right else '-',
+                        f"{dry_ext:.2f}" if dry_ext else '-',
+                        'Oui' if qc.get('loi_given') else 'Non'
+                    ]
+                    qc_data.append(row)
         
         # Tableau détaillé
-        if len(qc_data) > 1:
+        if qc_tables_data:
             qc_col_widths = [3*cm, 2.5*cm, 2.5*cm, 2.5*cm, 2*cm]
-            qc_table = Table(qc_data, colWidths=qc_col_widths)
             
-            qc_table.setStyle(TableStyle([
+            qc_table_style = TableStyle([
                 # En-têtes élégants
                 ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0096D5')),
                 ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
@@ -484,22 +685,16 @@ class PickListService:
                 ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
                 ('LEFTPADDING', (0, 0), (-1, -1), 4),
                 ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-            ]))
+            ])
             
-            elements.append(qc_table)
+            for qc_data in qc_tables_data:
+                qc_table = Table(qc_data, colWidths=qc_col_widths, repeatRows=1)
+                qc_table.setStyle(qc_table_style)
+                elements.append(qc_table)
             elements.append(Spacer(1, 15))
             
             # Moyennes des contrôles qualité
-            avg_subtitle = Paragraph("MOYENNES DES CONTRÔLES QUALITÉ", 
-                                   ParagraphStyle(
-                                       name='QCAvgTitle',
-                                       parent=self.styles['Normal'],
-                                       fontSize=12,
-                                       textColor=colors.HexColor('#0096D5'),
-                                       spaceBefore=10,
-                                       spaceAfter=10,
-                                       alignment=TA_LEFT
-                                   ))
+            avg_subtitle = Paragraph("MOYENNES DES CONTRÔLES QUALITÉ", self.styles['QCAvgTitle'])
             elements.append(avg_subtitle)
             
             # Calculer les moyennes, MIN et MAX
@@ -615,45 +810,15 @@ class PickListService:
         footer_note = Paragraph(
             f"<i><font color='#43B0B1'>Document généré automatiquement le {date_generation}</font></i><br/>"
             "<font size=8><b>SGQ Ligne G - Saint-Gobain Quartz</b> - Système de Gestion de la Qualité</font>",
-            ParagraphStyle(
-                name='FooterNote',
-                parent=self.styles['Normal'],
-                fontSize=9,
-                alignment=TA_CENTER,
-                textColor=colors.HexColor('#6c757d'),
-                spaceBefore=10
-            )
+            self.styles['FooterNote']
         )
         elements.append(footer_note)
         
         return elements
     
     def _create_gradient_bar(self):
-        """Créer une barre élégante avec les couleurs du gradient Saint-Gobain."""
-        # Couleurs du gradient Saint-Gobain
-        colors_sg = [
-            colors.HexColor('#43B0B1'),  # Turquoise
-            colors.HexColor('#0096D5'),  # Bleu clair
-            colors.HexColor('#0E4E95'),  # Bleu foncé
-            colors.HexColor('#EC1846'),  # Rouge
-            colors.HexColor('#F26F21'),  # Orange
-        ]
-        
-        # Créer un drawing pour la barre fine sur toute la largeur
-        drawing = Drawing(18*cm, 0.3*cm)
-        
-        # Largeur de chaque segment
-        segment_width = 18*cm / len(colors_sg)
-        
-        # Dessiner chaque segment sans bordures
-        for i, color in enumerate(colors_sg):
-            x_pos = i * segment_width
-            rect = Rect(x_pos, 0, segment_width, 0.3*cm)
-            rect.fillColor = color
-            rect.strokeColor = None  # Pas de bordure
-            drawing.add(rect)
-        
-        return drawing
+        """Barre aux couleurs du gradient Saint-Gobain (copie du dessin partagé)."""
+        return copy.copy(self.assets.gradient_bar)
     
     def get_export_url(self, filename):
         """Retourner l'URL de téléchargement du fichier généré."""
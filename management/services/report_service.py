@@ -45,10 +45,14 @@ class ReportService:
         }
     
     @staticmethod
-    def _calculate_kpis(shift):
+    def _calculate_kpis(shift, lost_time_total=None):
         """
         Calcule les KPIs principaux du shift.
         
+        Args:
+            shift: Shift à analyser
+            lost_time_total: Temps perdu du shift en minutes, s'il est déjà connu
+        
         Returns:
             dict: TRS, disponibilité, performance, qualité
         """
@@ -78,9 +82,10 @@ class ReportService:
             opening_time = 480  # 8h par défaut
         
         # Temps disponible
-        lost_time_total = shift.lost_time_entries.aggregate(
-            total=Sum('duration')
-        )['total'] or 0
+        if lost_time_total is None:
+            lost_time_total = shift.lost_time_entries.aggregate(
+                total=Sum('duration')
+            )['total'] or 0
         available_time = opening_time - lost_time_total
         
         # Disponibilité
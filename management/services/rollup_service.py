@@ -0,0 +1,231 @@
+import logging
+import threading
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+
+from production.models import Shift, Roll
+from quality.models import RollDefect
+from wcm.models import LostTimeEntry
+from ..models import DailyProductionRollup, VacationProductionRollup, OperatorProductionRollup
+from .alert_service import AlertService
+from .report_service import ReportService
+
+logger = logging.getLogger(__name__)
+
+# Champs cumulés, identiques dans les trois tables
+ROLLUP_FIELDS = [
+    'shifts_count', 'trs_count', 'trs_sum', 'availability_sum', 'performance_sum',
+    'quality_sum', 'total_production', 'ok_production', 'nok_production',
+    'rolls_count', 'defects_count', 'blocking_defects_count', 'lost_time',
+    'fallback_length', 'fallback_trs_sum',
+]
+
+
+class RollupService:
+    """
+    Maintenance des tables de cumul de production (jour, vacation, opérateur).
+    
+    Une modification de poste, TRS, rouleau, défaut ou temps perdu marque
+    les dates concernées ; à la validation de la transaction, seules ces
+    dates sont recalculées (quelques requêtes groupées, quel que soit
+    l'historique), ainsi que leurs alertes de production.
+    """
+    
+    _pending = threading.local()
+    
+    @classmethod
+    def _get_pending(cls):
+        """Dates, shifts et rouleaux à recalculer dans la transaction en cours."""
+        if not hasattr(cls._pending, 'dates'):
+            cls._pending.dates = set()
+            cls._pending.shift_ids = set()
+            cls._pending.roll_ids = set()
+        return cls._pending
+    
+    @classmethod
+    def schedule(cls, dates=(), shift_ids=(), roll_ids=()):
+        """Marquer des cumuls à recalculer après la validation de la transaction."""
+        pending = cls._get_pending()
+        pending.dates.update(d for d in dates if d)
+        pending.shift_ids.update(i for i in shift_ids if i)
+        pending.roll_ids.update(i for i in roll_ids if i)
+        
+        # Les appels suivants au commit trouvent des ensembles vides (sans requête) ;
+        # après un rollback, les marques restantes partent avec le commit suivant
+        transaction.on_commit(cls.flush)
+    
+    @classmethod
+    def flush(cls):
+        """Recalculer les cumuls marqués (appelé au commit)."""
+        pending = cls._get_pending()
+        dates = set(pending.dates)
+        shift_ids = set(pending.shift_ids)
+        roll_ids = set(pending.roll_ids)
+        pending.dates.clear()
+        pending.shift_ids.clear()
+        pending.roll_ids.clear()
+        
+        try:
+            if shift_ids:
+                dates.update(Shift.objects.filter(id__in=shift_ids).values_list('date', flat=True))
+            if roll_ids:
+                dates.update(
+                    Roll.objects.filter(id__in=roll_ids, shift__isnull=False).values_list('shift__date', flat=True)
+                )
+            if dates:
+                cls.refresh_dates(dates)
+        except Exception as e:
+            # Un cumul en retard ne doit pas faire échouer la sauvegarde (rebuild_rollups le corrige)
+            logger.error(f"Erreur mise à jour des cumuls de production: {str(e)}", exc_info=True)
+    
+    @staticmethod
+    def _empty_row():
+        return {field: 0 for field in ROLLUP_FIELDS}
+    
+    @classmethod
+    def _compute(cls, dates):
+        """
+        Agrégats par (date, vacation, opérateur) pour les dates données.
+        
+        Returns:
+            dict: {(date, vacation, operator_id): {champ: valeur}}
+        """
+        rows = {}
+        
+        def merge(queryset, date_key, vacation_key, operator_key):
+            for values in queryset:
+                key = (values.pop(date_key), values.pop(vacation_key), values.pop(operator_key))
+                row = rows.setdefault(key, cls._empty_row())
+                for field, value in values.items():
+                    row[field] += value or 0
+        
+        merge(
+            Shift.objects.filter(date__in=dates).values('date', 'vacation', 'operator').annotate(
+                shifts_count=Count('id'),
+                trs_count=Count('trs'),
+                trs_sum=Sum('trs__trs_percentage'),
+                availability_sum=Sum('trs__availability_percentage'),
+                performance_sum=Sum('trs__performance_percentage'),
+                quality_sum=Sum('trs__quality_percentage'),
+                total_production=Sum('trs__total_length'),
+                ok_production=Sum('trs__ok_length'),
+                nok_production=Sum('trs__nok_length')
+            ).order_by(),
+            'date', 'vacation', 'operator'
+        )
+        merge(
+            Roll.objects.filter(shift__date__in=dates).values(
+                'shift__date', 'shift__vacation', 'shift__operator'
+            ).annotate(rolls_count=Count('id')).order_by(),
+            'shift__date', 'shift__vacation', 'shift__operator'
+        )
+        merge(
+            RollDefect.objects.filter(roll__shift__date__in=dates).values(
+                'roll__shift__date', 'roll__shift__vacation', 'roll__shift__operator'
+            ).annotate(
+                defects_count=Count('id'),
+                blocking_defects_count=Count('id', filter=Q(defect_type__severity='blocking'))
+            ).order_by(),
+            'roll__shift__date', 'roll__shift__vacation', 'roll__shift__operator'
+        )
+        merge(
+            LostTimeEntry.objects.filter(shift__date__in=dates).values(
+                'shift__date', 'shift__vacation', 'shift__operator'
+            ).annotate(lost_time=Sum('duration')).order_by(),
+            'shift__date', 'shift__vacation', 'shift__operator'
+        )
+        merge(cls._compute_fallback(dates), 'date', 'vacation', 'operator')
+        
+        return rows
+    
+    @staticmethod
+    def _compute_fallback(dates):
+        """
+        TRS calculé des postes sans TRS enregistré, pondéré par leur production.
+        
+        Même repli que l'ancien calcul des statistiques (ReportService._calculate_kpis
+        sur les postes ayant produit), pour que les moyennes ne changent pas.
+        """
+        for shift in Shift.objects.filter(date__in=dates, trs__isnull=True):
+            length = float(shift.total_length or 0)
+            if length > 0:
+                yield {
+                    'date': shift.date,
+                    'vacation': shift.vacation,
+                    'operator': shift.operator_id,
+                    'fallback_length': Decimal(str(round(length, 2))),
+                    'fallback_trs_sum': Decimal(str(round(ReportService._calculate_kpis(shift)['trs'] * length, 2))),
+                }
+    
+    @classmethod
+    def refresh_dates(cls, dates):
+        """Recalculer les trois niveaux de cumul pour une liste de dates."""
+        dates = sorted(set(dates))
+        rows = cls._compute(dates)
+        
+        daily, by_vacation, by_operator = {}, {}, []
+        for (day, vacation, operator_id), values in rows.items():
+            for bucket in (
+                daily.setdefault(day, cls._empty_row()),
+                by_vacation.setdefault((day, vacation), cls._empty_row()),
+            ):
+                for field in ROLLUP_FIELDS:
+                    bucket[field] += values[field]
+            
+            if operator_id:
+                by_operator.append(OperatorProductionRollup(
+                    date=day, vacation=vacation, operator_id=operator_id, **values
+                ))
+        
+        with transaction.atomic():
+            DailyProductionRollup.objects.filter(date__in=dates).delete()
+            VacationProductionRollup.objects.filter(date__in=dates).delete()
+            OperatorProductionRollup.objects.filter(date__in=dates).delete()
+            
+            DailyProductionRollup.objects.bulk_create([
+                DailyProductionRollup(date=day, **values) for day, values in daily.items()
+            ])
+            VacationProductionRollup.objects.bulk_create([
+                VacationProductionRollup(date=day, vacation=vacation, **values)
+                for (day, vacation), values in by_vacation.items()
+            ])
+            OperatorProductionRollup.objects.bulk_create(by_operator)
+        
+        # Les alertes des mêmes dates s'appuient sur les cumuls à jour
+        AlertService.refresh_dates(dates)
+        
+        return len(daily)
+    
+    @classmethod
+    def rebuild(cls, start_date=None, end_date=None, chunk_days=31):
+        """
+        Reconstruire les cumuls sur une période (tout l'historique par défaut).
+        
+        Returns:
+            int: Nombre de jours avec production
+        """
+        if start_date is None or end_date is None:
+            bounds = Shift.objects.aggregate(first=Min('date'), last=Max('date'))
+            start_date = start_date or bounds['first']
+            end_date = end_date or bounds['last']
+        
+        if start_date is None or end_date is None:
+            return 0
+        
+        # Cumuls hors de la plage de postes (postes supprimés)
+        for model in (DailyProductionRollup, VacationProductionRollup, OperatorProductionRollup):
+            model.objects.filter(date__range=[start_date, end_date]).delete()
+        
+        days_count = 0
+        chunk_start = start_date
+        while chunk_start <= end_date:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+            dates = [chunk_start + timedelta(days=i) for i in range((chunk_end - chunk_start).days + 1)]
+            days_count += cls.refresh_dates(dates)
+            chunk_start = chunk_end + timedelta(days=1)
+        
+        return days_count
+
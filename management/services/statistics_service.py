@@ -7,6 +7,8 @@ from production.models import Shift, Roll
 from quality.models import RollDefect
 from wcm.models import LostTimeEntry
 from planification.models import Operator, FabricationOrder
+from ..models import DailyProductionRollup, VacationProductionRollup, OperatorProductionRollup, ProductionAlert
+from .dashboard_cache import DashboardCache
 
 
 class StatisticsService:
@@ -124,55 +126,62 @@ class StatisticsService:
             'avg_quality': round(avg_quality, 1)
         }
     
+    @staticmethod
+    def _sum_rollups(rollups):
+        """Cumuler des lignes de DailyProductionRollup (ou variantes) en une requête."""
+        totals = rollups.aggregate(
+            shifts_count=Sum('shifts_count'),
+            trs_count=Sum('trs_count'),
+            trs_sum=Sum('trs_sum'),
+            total_production=Sum('total_production'),
+            ok_production=Sum('ok_production'),
+            nok_production=Sum('nok_production'),
+            rolls_count=Sum('rolls_count'),
+            defects_count=Sum('defects_count'),
+            blocking_defects_count=Sum('blocking_defects_count'),
+            lost_time=Sum('lost_time'),
+            fallback_length=Sum('fallback_length'),
+            fallback_trs_sum=Sum('fallback_trs_sum')
+        )
+        return {
+            key: float(value) if isinstance(value, Decimal) else (value or 0)
+            for key, value in totals.items()
+        }
+    
     @staticmethod
     def _get_daily_trends(days=7):
-        """Tendances journalières sur N jours."""
+        """
+        Tendances journalières sur N jours.
+        
+        Lues dans les cumuls journaliers (DailyProductionRollup) : une seule
+        requête quelle que soit la période demandée.
+        """
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=days-1)
         
+        rollups = {
+            rollup.date: rollup
+            for rollup in DailyProductionRollup.objects.filter(date__range=[start_date, end_date])
+        }
+        
         trends = []
         current_date = start_date
         
         while current_date <= end_date:
-            shifts = Shift.objects.filter(date=current_date)
+            rollup = rollups.get(current_date) or DailyProductionRollup(date=current_date)
             
-            daily_stats = {
+            trends.append({
                 'date': current_date,
-                'shifts_count': shifts.count(),
-                'total_production': float(shifts.aggregate(Sum('trs__total_length'))['trs__total_length__sum'] or 0),
-                'ok_production': float(shifts.aggregate(Sum('trs__ok_length'))['trs__ok_length__sum'] or 0),
-                'nok_production': float(shifts.aggregate(Sum('trs__nok_length'))['trs__nok_length__sum'] or 0),
-                'rolls_count': Roll.objects.filter(shift__date=current_date).count(),
-                'defects_count': RollDefect.objects.filter(roll__shift__date=current_date).count(),
-                'lost_time': LostTimeEntry.objects.filter(shift__date=current_date).aggregate(Sum('duration'))['duration__sum'] or 0
-            }
-            
-            # Calcul du TRS moyen
-            shifts_with_trs = shifts.select_related('trs')
-            trs_list = [s for s in shifts_with_trs if hasattr(s, 'trs')]
-            
-            if trs_list:
-                # Moyenne simple incluant les TRS à 0
-                daily_stats['avg_trs'] = round(sum(float(s.trs.trs_percentage) for s in trs_list) / len(trs_list), 1)
-            elif daily_stats['total_production'] > 0:
-                # Fallback sur l'ancien calcul
-                from .report_service import ReportService
-                total_length = 0
-                weighted_trs = 0
-                
-                for shift in shifts:
-                    # Utiliser la propriété qui va chercher dans TRS
-                    length = float(shift.total_length)
-                    if length > 0:
-                        kpis = ReportService._calculate_kpis(shift)
-                        total_length += length
-                        weighted_trs += kpis['trs'] * length
-                
-                daily_stats['avg_trs'] = round(weighted_trs / total_length, 1) if total_length > 0 else 0
-            else:
-                daily_stats['avg_trs'] = 0
-            
-            trends.append(daily_stats)
+                'shifts_count': rollup.shifts_count,
+                'total_production': float(rollup.total_production),
+                'ok_production': float(rollup.ok_production),
+                'nok_production': float(rollup.nok_production),
+                'rolls_count': rollup.rolls_count,
+                'defects_count': rollup.defects_count,
+                'lost_time': rollup.lost_time,
+                # Moyenne simple incluant les TRS à 0 (repli sans TRS)
+                'avg_trs': round(rollup.avg_trs, 1)
+            })
             current_date += timedelta(days=1)
         
         return trends
@@ -215,45 +224,26 @@ class StatisticsService:
     
     @staticmethod
     def _get_period_stats(start_date, end_date):
-        """Statistiques pour une période donnée."""
-        shifts = Shift.objects.filter(date__range=[start_date, end_date])
-        
-        total_production = float(shifts.aggregate(Sum('trs__total_length'))['trs__total_length__sum'] or 0)
-        ok_production = float(shifts.aggregate(Sum('trs__ok_length'))['trs__ok_length__sum'] or 0)
+        """Statistiques pour une période donnée (depuis les cumuls journaliers)."""
+        totals = StatisticsService._sum_rollups(
+            DailyProductionRollup.objects.filter(date__range=[start_date, end_date])
+        )
+        total_production = totals['total_production']
+        ok_production = totals['ok_production']
         
         stats = {
-            'shifts_count': shifts.count(),
+            'shifts_count': totals['shifts_count'],
             'total_production': total_production,
             'ok_production': ok_production,
             'quality_rate': round((ok_production / total_production * 100) if total_production > 0 else 0, 1),
-            'rolls_count': Roll.objects.filter(shift__date__range=[start_date, end_date]).count(),
-            'defects_count': RollDefect.objects.filter(roll__shift__date__range=[start_date, end_date]).count()
+            'rolls_count': totals['rolls_count'],
+            'defects_count': totals['defects_count']
         }
         
-        # Calcul du TRS moyen
-        shifts_with_trs = shifts.select_related('trs')
-        trs_list = [s for s in shifts_with_trs if hasattr(s, 'trs')]
-        
-        if trs_list:
-            # Moyenne simple incluant les TRS à 0
-            stats['avg_trs'] = round(sum(float(s.trs.trs_percentage) for s in trs_list) / len(trs_list), 1)
-        elif total_production > 0:
-            # Fallback sur l'ancien calcul
-            from .report_service import ReportService
-            total_length = 0
-            weighted_trs = 0
-            
-            for shift in shifts:
-                # Utiliser la propriété qui va chercher dans TRS
-                length = float(shift.total_length)
-                if length > 0:
-                    kpis = ReportService._calculate_kpis(shift)
-                    total_length += length
-                    weighted_trs += kpis['trs'] * length
-            
-            stats['avg_trs'] = round(weighted_trs / total_length, 1) if total_length > 0 else 0
-        else:
-            stats['avg_trs'] = 0
+        # Calcul du TRS moyen - moyenne simple incluant les TRS à 0 (repli sans TRS)
+        stats['avg_trs'] = round(DailyProductionRollup.compute_avg_trs(
+            totals['trs_sum'], totals['trs_count'], totals['fallback_trs_sum'], totals['fallback_length']
+        ), 1)
         
         # Taux de défauts
         stats['defects_rate'] = round(stats['defects_count'] / stats['rolls_count'] * 100, 1) if stats['rolls_count'] > 0 else 0
@@ -262,20 +252,30 @@ class StatisticsService:
     
     @staticmethod
     def _get_monthly_statistics(start_date, end_date):
-        """Statistiques mensuelles détaillées."""
-        shifts = Shift.objects.filter(
-            date__range=[start_date, end_date]
-        ).select_related('operator')
+        """Statistiques mensuelles détaillées (depuis les cumuls)."""
+        totals = StatisticsService._sum_rollups(
+            DailyProductionRollup.objects.filter(date__range=[start_date, end_date])
+        )
         
         # Statistiques par vacation
+        vacation_rows = {
+            row['vacation']: row
+            for row in VacationProductionRollup.objects.filter(
+                date__range=[start_date, end_date]
+            ).values('vacation').annotate(
+                count=Sum('shifts_count'),
+                total_production=Sum('total_production')
+            ).order_by()
+        }
+        
         vacation_stats = {}
         for vacation_choice in Shift.VACATION_CHOICES:
             vacation = vacation_choice[0]
-            vacation_shifts = shifts.filter(vacation=vacation)
+            row = vacation_rows.get(vacation, {})
             
             vacation_stats[vacation] = {
-                'count': vacation_shifts.count(),
-                'total_production': float(vacation_shifts.aggregate(Sum('trs__total_length'))['trs__total_length__sum'] or 0),
+                'count': row.get('count') or 0,
+                'total_production': float(row.get('total_production') or 0),
                 'avg_production': 0
             }
             
@@ -285,82 +285,90 @@ class StatisticsService:
                 )
         
         # Top 5 opérateurs
-        operator_production = shifts.values(
+        operator_production = OperatorProductionRollup.objects.filter(
+            date__range=[start_date, end_date]
+        ).values(
             'operator__first_name',
             'operator__last_name'
         ).annotate(
-            total_production=Sum('trs__total_length'),
-            shifts_count=Count('id')
+            total_production=Sum('total_production'),
+            shifts_count=Sum('shifts_count')
         ).order_by('-total_production')[:5]
         
         return {
             'period': f"{start_date} au {end_date}",
-            'total_shifts': shifts.count(),
+            'total_shifts': totals['shifts_count'],
             'vacation_statistics': vacation_stats,
             'top_operators': list(operator_production),
-            'total_production': float(shifts.aggregate(Sum('trs__total_length'))['trs__total_length__sum'] or 0),
-            'total_lost_time': LostTimeEntry.objects.filter(
-                shift__date__range=[start_date, end_date]
-            ).aggregate(Sum('duration'))['duration__sum'] or 0
+            'total_production': totals['total_production'],
+            'total_lost_time': totals['lost_time']
         }
     
     @staticmethod
-    def _get_operator_performance(days=30):
-        """Performance des opérateurs sur N jours."""
-        since_date = timezone.now().date() - timedelta(days=days)
+    def _get_operator_performance(days=30, start_date=None, end_date=None, vacation=None, limit=10):
+        """
+        Classement des opérateurs par TRS moyen (une requête groupée sur les cumuls).
         
-        operators = Operator.objects.filter(
-            shifts__date__gte=since_date
-        ).distinct()
+        Args:
+            days: Fenêtre en jours jusqu'à aujourd'hui (si start_date n'est pas fourni)
+            start_date: Début de la période (incluse)
+            end_date: Fin de la période (incluse, aujourd'hui par défaut)
+            vacation: Limiter à une vacation (Matin, ApresMidi, Nuit, Journee)
+            limit: Nombre d'opérateurs retournés (None pour tous)
+        """
+        end_date = end_date or timezone.now().date()
+        start_date = start_date or end_date - timedelta(days=days)
+        
+        rollups = OperatorProductionRollup.objects.filter(date__range=[start_date, end_date])
+        if vacation:
+            rollups = rollups.filter(vacation=vacation)
+        
+        rows = rollups.values(
+            'operator',
+            'operator__first_name',
+            'operator__last_name'
+        ).annotate(
+            shifts_count=Sum('shifts_count'),
+            trs_count=Sum('trs_count'),
+            trs_sum=Sum('trs_sum'),
+            total_production=Sum('total_production'),
+            ok_production=Sum('ok_production'),
+            rolls_count=Sum('rolls_count'),
+            defects_count=Sum('defects_count'),
+            blocking_defects_count=Sum('blocking_defects_count'),
+            lost_time=Sum('lost_time'),
+            fallback_length=Sum('fallback_length'),
+            fallback_trs_sum=Sum('fallback_trs_sum')
+        ).order_by('operator__last_name', 'operator__first_name')
         
         performance_data = []
         
-        for operator in operators:
-            operator_shifts = Shift.objects.filter(
-                operator=operator,
-                date__gte=since_date
-            )
+        for row in rows:
+            total_production = float(row['total_production'] or 0)
+            ok_production = float(row['ok_production'] or 0)
             
-            if operator_shifts.exists():
-                total_production = float(operator_shifts.aggregate(Sum('trs__total_length'))['trs__total_length__sum'] or 0)
-                ok_production = float(operator_shifts.aggregate(Sum('trs__ok_length'))['trs__ok_length__sum'] or 0)
-                
-                # Calcul du TRS moyen
-                shifts_with_trs = operator_shifts.select_related('trs')
-                trs_list = [s for s in shifts_with_trs if hasattr(s, 'trs')]
-                
-                if trs_list:
-                    # Moyenne simple incluant les TRS à 0
-                    avg_trs = round(sum(float(s.trs.trs_percentage) for s in trs_list) / len(trs_list), 1)
-                else:
-                    # Fallback sur l'ancien calcul
-                    from .report_service import ReportService
-                    total_length = 0
-                    weighted_trs = 0
-                    
-                    for shift in operator_shifts:
-                        # Utiliser la propriété qui va chercher dans TRS
-                        length = float(shift.total_length)
-                        if length > 0:
-                            kpis = ReportService._calculate_kpis(shift)
-                            total_length += length
-                            weighted_trs += kpis['trs'] * length
-                    
-                    avg_trs = round(weighted_trs / total_length, 1) if total_length > 0 else 0
-                
-                performance_data.append({
-                    'operator': f"{operator.first_name} {operator.last_name}",
-                    'shifts_count': operator_shifts.count(),
-                    'total_production': total_production,
-                    'avg_production_per_shift': round(total_production / operator_shifts.count(), 1),
-                    'quality_rate': round((ok_production / total_production * 100) if total_production > 0 else 0, 1),
-                    'avg_trs': avg_trs
-                })
+            performance_data.append({
+                'operator': f"{row['operator__first_name']} {row['operator__last_name']}",
+                'operator_id': row['operator'],
+                'shifts_count': row['shifts_count'],
+                'total_production': total_production,
+                'ok_production': ok_production,
+                'avg_production_per_shift': round(total_production / row['shifts_count'], 1),
+                'quality_rate': round((ok_production / total_production * 100) if total_production > 0 else 0, 1),
+                # Moyenne simple incluant les TRS à 0 (repli sans TRS)
+                'avg_trs': round(OperatorProductionRollup.compute_avg_trs(
+                    row['trs_sum'], row['trs_count'], row['fallback_trs_sum'], row['fallback_length']
+                ), 1),
+                'rolls_count': row['rolls_count'],
+                'defects_count': row['defects_count'],
+                'blocking_defects_count': row['blocking_defects_count'],
+                'lost_time': row['lost_time']
+            })
         
         # Trier par TRS moyen décroissant
         performance_data.sort(key=lambda x: x['avg_trs'], reverse=True)
         
-        return performance_data[:10]  # Top 10
+        return performance_data[:limit] if limit else performance_data
     
     @staticmethod
     def _get_defects_analysis(days=30):
@@ -384,17 +392,19 @@ class StatisticsService:
             defect['percentage'] = round((defect['count'] / total_defects * 100) if total_defects > 0 else 0, 1)
             defects_with_percentage.append(defect)
         
-        # Tendance des défauts bloquants
+        # Tendance des défauts bloquants (cumuls journaliers)
+        today = timezone.now().date()
+        blocking_by_date = dict(
+            DailyProductionRollup.objects.filter(
+                date__gte=today - timedelta(days=6)
+            ).values_list('date', 'blocking_defects_count')
+        )
         blocking_trend = []
         for i in range(7):
-            date = timezone.now().date() - timedelta(days=i)
-            blocking_count = RollDefect.objects.filter(
-                roll__shift__date=date,
-                defect_type__severity='blocking'
-            ).count()
+            date = today - timedelta(days=i)
             blocking_trend.append({
                 'date': date,
-                'count': blocking_count
+                'count': blocking_by_date.get(date, 0)
             })
         blocking_trend.reverse()
         
@@ -406,58 +416,35 @@ class StatisticsService:
     
     @staticmethod
     def _get_production_alerts():
-        """Génère des alertes basées sur les seuils de production."""
-        alerts = []
+        """
+        Alertes de production : postes de la veille et du jour, journée en cours.
+        
+        Les alertes sont évaluées à la sauvegarde des données (AlertService,
+        règles du catalogue) ; leur lecture est mise en cache jusqu'au
+        prochain changement de version des données.
+        """
         today = timezone.now().date()
         yesterday = today - timedelta(days=1)
         
-        # Alerte TRS faible
-        recent_shifts = Shift.objects.filter(date__gte=yesterday).select_related('trs')
-        for shift in recent_shifts:
-            if hasattr(shift, 'trs'):
-                trs_value = float(shift.trs.trs_percentage)
-            else:
-                from .report_service import ReportService
-                kpis = ReportService._calculate_kpis(shift)
-                trs_value = kpis['trs']
+        def load_alerts():
+            alerts = ProductionAlert.objects.filter(
+                Q(shift__isnull=False, date__gte=yesterday) | Q(shift__isnull=True, date=today)
+            ).select_related('rule').order_by('-rule__scope', '-date', '-shift__created_at', 'rule__order')
             
-            if trs_value < 60:  # Seuil TRS à 60%
-                alerts.append({
-                    'type': 'trs_low',
-                    'severity': 'warning' if trs_value >= 50 else 'danger',
-                    'message': f"TRS faible pour {shift.shift_id}: {trs_value}%",
-                    'shift_id': shift.id,
-                    'date': shift.date
-                })
-        
-        # Alerte défauts bloquants élevés
-        blocking_defects_today = RollDefect.objects.filter(
-            roll__shift__date=today,
-            defect_type__severity='blocking'
-        ).count()
-        
-        if blocking_defects_today > 10:  # Seuil à 10 défauts bloquants
-            alerts.append({
-                'type': 'blocking_defects_high',
-                'severity': 'danger',
-                'message': f"{blocking_defects_today} défauts bloquants aujourd'hui",
-                'date': today
-            })
-        
-        # Alerte temps perdu élevé
-        lost_time_today = LostTimeEntry.objects.filter(
-            shift__date=today
-        ).aggregate(Sum('duration'))['duration__sum'] or 0
-        
-        if lost_time_today > 120:  # Seuil à 2 heures
-            alerts.append({
-                'type': 'lost_time_high',
-                'severity': 'warning',
-                'message': f"{lost_time_today} minutes de temps perdu aujourd'hui",
-                'date': today
-            })
-        
-        return alerts
+            results = []
+            for alert in alerts:
+                data = {
+                    'type': alert.rule.code,
+                    'severity': alert.severity,
+                    'message': alert.message,
+                }
+                if alert.shift_id:
+                    data['shift_id'] = alert.shift_id
+                data['date'] = alert.date
+                results.append(data)
+            return results
+        
+        return DashboardCache.get_or_compute(DashboardCache.get_etag('alerts', today), load_alerts)
     
     @staticmethod
     def _get_mood_data():
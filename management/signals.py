@@ -0,0 +1,110 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from production.models import Shift, Roll
+from catalog.models import ProductionAlertRule, ProfileTemplate
+from quality.models import RollDefect
+from wcm.models import LostTimeEntry, TRS, MoodCounter, mood_counters_reset
+from .services.rollup_service import RollupService
+from .services.alert_service import AlertService
+from .services.dashboard_cache import DashboardCache
+from .services.pick_list_service import PickListService
+
+
+# Valeurs d'origine, pour recalculer aussi l'ancien jour en cas de déplacement
+@receiver(post_init, sender=Shift)
+def remember_shift_date(sender, instance, **kwargs):
+    instance._rollup_date = instance.__dict__.get('date')
+
+
+@receiver(post_init, sender=Roll)
+@receiver(post_init, sender=LostTimeEntry)
+def remember_shift_link(sender, instance, **kwargs):
+    instance._rollup_shift_id = instance.__dict__.get('shift_id')
+
+
+@receiver(post_init, sender=Roll)
+def remember_preshipper(sender, instance, **kwargs):
+    instance._pick_list_report = instance.__dict__.get('preshipper_assigned')
+
+
+@receiver(post_save, sender=Roll)
+@receiver(post_delete, sender=Roll)
+def evict_pick_list_cache_on_roll_change(sender, instance, **kwargs):
+    """Supprimer les PDF en cache des pick-lists d'un rouleau modifié (et de son ancienne pick-list)."""
+    for report_name in {instance.preshipper_assigned, getattr(instance, '_pick_list_report', None)} - {None, ''}:
+        PickListService.evict(report_name)
+    instance._pick_list_report = instance.preshipper_assigned
+
+
+@receiver(post_save, sender=RollDefect)
+@receiver(post_delete, sender=RollDefect)
+def evict_pick_list_cache_on_defect_change(sender, instance, **kwargs):
+    """Supprimer les PDF en cache de la pick-list du rouleau d'un défaut."""
+    report_name = Roll.objects.filter(id=instance.roll_id).values_list('preshipper_assigned', flat=True).first()
+    if report_name:
+        PickListService.evict(report_name)
+
+
+@receiver(post_save, sender=Shift)
+@receiver(post_delete, sender=Shift)
+def update_rollups_on_shift_change(sender, instance, **kwargs):
+    """Recalculer les cumuls du jour du poste (et de son ancien jour)."""
+    RollupService.schedule(dates=[instance.date, getattr(instance, '_rollup_date', None)])
+    instance._rollup_date = instance.date
+
+
+@receiver(post_save, sender=Roll)
+@receiver(post_delete, sender=Roll)
+@receiver(post_save, sender=LostTimeEntry)
+@receiver(post_delete, sender=LostTimeEntry)
+def update_rollups_on_shift_item_change(sender, instance, **kwargs):
+    """Recalculer les cumuls du poste d'un rouleau ou d'un temps perdu."""
+    RollupService.schedule(shift_ids=[instance.shift_id, getattr(instance, '_rollup_shift_id', None)])
+    instance._rollup_shift_id = instance.shift_id
+
+
+@receiver(post_save, sender=TRS)
+@receiver(post_delete, sender=TRS)
+def update_rollups_on_trs_change(sender, instance, **kwargs):
+    """Recalculer les cumuls du poste d'un TRS."""
+    RollupService.schedule(shift_ids=[instance.shift_id])
+
+
+@receiver(post_save, sender=RollDefect)
+@receiver(post_delete, sender=RollDefect)
+def update_rollups_on_defect_change(sender, instance, **kwargs):
+    """Recalculer les cumuls du poste du rouleau d'un défaut."""
+    RollupService.schedule(roll_ids=[instance.roll_id])
+
+
+@receiver(post_save, sender=ProductionAlertRule)
+@receiver(post_delete, sender=ProductionAlertRule)
+@receiver(post_save, sender=ProfileTemplate)
+@receiver(post_delete, sender=ProfileTemplate)
+def update_alerts_on_rule_change(sender, **kwargs):
+    """Réévaluer les alertes récentes (règle ou objectif TRS modifié)."""
+    transaction.on_commit(AlertService.refresh_recent)
+
+
+# Connectés après les cumuls : la nouvelle version est publiée une fois les cumuls à jour
+@receiver(post_save, sender=Shift)
+@receiver(post_delete, sender=Shift)
+@receiver(post_save, sender=Roll)
+@receiver(post_delete, sender=Roll)
+@receiver(post_save, sender=RollDefect)
+@receiver(post_delete, sender=RollDefect)
+@receiver(post_save, sender=LostTimeEntry)
+@receiver(post_delete, sender=LostTimeEntry)
+@receiver(post_save, sender=TRS)
+@receiver(post_delete, sender=TRS)
+@receiver(post_save, sender=MoodCounter)
+@receiver(post_delete, sender=MoodCounter)
+@receiver(post_save, sender=ProductionAlertRule)
+@receiver(post_delete, sender=ProductionAlertRule)
+@receiver(post_save, sender=ProfileTemplate)
+@receiver(post_delete, sender=ProfileTemplate)
+@receiver(mood_counters_reset)
+def bump_dashboard_data_version(sender, **kwargs):
+    """Invalider le cache du dashboard au commit de la modification."""
+    transaction.on_commit(DashboardCache.bump_data_version)
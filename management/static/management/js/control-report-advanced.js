@@ -6,10 +6,13 @@ function advancedRCApp() {
     return {
         // État principal
         loading: false,
+        loadingMore: false,
         darkMode: false,
         
         // Données
         availableRolls: [],
+        totalAvailableRolls: 0,
+        nextCursor: null,  // Curseur de la page suivante côté serveur
         filteredRolls: [],
         selectedRolls: [],
         operators: [],
@@ -90,35 +93,64 @@ function advancedRCApp() {
             this.reportName = `S${year}${month}${day}${hour}${minute}`;
         },
         
+        /**
+         * Charge une page de rouleaux conformes (la suivante si append)
+         */
+        async loadRolls(append = false) {
+            // Construire les paramètres de l'API
+            const params = new URLSearchParams({ limit: '500' });
+            if (this.showAssigned) {
+                params.append('show_assigned', 'true');
+            }
+            if (append && this.nextCursor) {
+                params.append('cursor', this.nextCursor);
+            }
+            
+            const rollsResponse = await fetch(`/management/api/conforming-rolls/?${params}`, {
+                method: 'GET',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': this.getCsrfToken()
+                }
+            });
+            if (rollsResponse.ok) {
+                const data = await rollsResponse.json();
+                const rolls = data.results || [];
+                this.availableRolls = append ? this.availableRolls.concat(rolls) : rolls;
+                this.totalAvailableRolls = data.total || this.availableRolls.length;
+                this.nextCursor = data.next_cursor || null;
+                this.filterRolls();
+            } else {
+                console.error('Erreur lors du chargement des rouleaux:', rollsResponse.status);
+                this.showError('Erreur lors du chargement des rouleaux');
+            }
+        },
+        
+        /**
+         * Charge les rouleaux suivants (sans réinitialiser les filtres)
+         */
+        async loadMoreRolls() {
+            if (!this.nextCursor || this.loadingMore) return;
+            this.loadingMore = true;
+            try {
+                const page = this.currentPage;
+                await this.loadRolls(true);
+                this.currentPage = page;
+            } catch (error) {
+                console.error('Erreur lors du chargement des rouleaux:', error);
+                this.showError('Erreur lors du chargement des rouleaux');
+            }
+            this.loadingMore = false;
+        },
+        
         /**
          * Charge les données depuis l'API
          */
         async loadData() {
             this.loading = true;
             try {
-                // Construire les paramètres de l'API
-                const params = new URLSearchParams();
-                if (this.showAssigned) {
-                    params.append('show_assigned', 'true');
-                }
-                
-                // Charger les rouleaux conformes disponibles
-                const rollsResponse = await fetch(`/management/api/conforming-rolls/?${params}`, {
-                    method: 'GET',
-                    headers: {
-                        'Content-Type': 'application/json',
-                        'X-CSRFToken': this.getCsrfToken()
-                    }
-                });
-                if (rollsResponse.ok) {
-                    const data = await rollsResponse.json();
-                    // L'API retourne probablement { results: [...] } comme la page normale
-                    this.availableRolls = data.results || data || [];
-                    this.filterRolls();
-                } else {
-                    console.error('Erreur lors du chargement des rouleaux:', rollsResponse.status);
-                    this.showError('Erreur lors du chargement des rouleaux');
-                }
+                // Charger les rouleaux conformes disponibles (première page)
+                await this.loadRolls();
                 
                 // Charger les opérateurs (optionnel - ne pas bloquer si ça échoue)
                 try {
@@ -451,18 +483,16 @@ function advancedRCApp() {
                 });
                 
                 if (response.ok) {
-                    // Télécharger le PDF
-                    const blob = await response.blob();
-                    const url = window.URL.createObjectURL(blob);
+                    // Génération en arrière-plan : attendre le PDF puis le télécharger
+                    const job = await this.waitForPickListJob((await response.json()).status_url);
                     const a = document.createElement('a');
-                    a.href = url;
-                    a.download = `${this.reportName.trim()}.pdf`;
+                    a.href = job.download_url;
+                    a.download = `${job.report_name}.pdf`;
                     document.body.appendChild(a);
                     a.click();
-                    window.URL.revokeObjectURL(url);
                     document.body.removeChild(a);
                     
-                    this.showSuccess(`Rapport ${this.reportName.trim()}.pdf généré avec succès`);
+                    this.showSuccess(`Rapport ${job.report_name}.pdf généré avec succès`);
                     
                     // Actualiser les données pour refléter les assignations
                     await this.loadData();
@@ -474,11 +504,36 @@ function advancedRCApp() {
                 }
             } catch (error) {
                 console.error('Erreur:', error);
-                this.showError('Erreur de connexion lors de la génération du rapport');
+                this.showError(error.message || 'Erreur de connexion lors de la génération du rapport');
             }
             this.loading = false;
         },
         
+        /**
+         * Suit une génération de pick-list (traitée par le worker) jusqu'au PDF
+         */
+        async waitForPickListJob(statusUrl) {
+            const deadline = Date.now() + 5 * 60 * 1000;
+            
+            while (Date.now() < deadline) {
+                const response = await fetch(statusUrl);
+                const job = await response.json();
+                if (!response.ok) {
+                    throw new Error(job.error || 'Erreur lors du suivi de la génération');
+                }
+                if (job.status === 'done') {
+                    return job;
+                }
+                if (job.status === 'failed') {
+                    throw new Error(job.message || 'Erreur lors de la génération du rapport');
+                }
+                
+                await new Promise(resolve => setTimeout(resolve, 1000));
+            }
+            
+            throw new Error('La génération prend plus de temps que prévu, réessayez plus tard');
+        },
+        
         /**
          * Récupère le token CSRF
          */
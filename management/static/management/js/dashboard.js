@@ -43,6 +43,8 @@ function managementDashboard() {
         alerts: [],
         dailyTrends: [],
         trendChart: null,
+        eventSource: null,  // Flux SSE des mises à jour
+        pollingTimer: null,
         loading: true,
         // Données d'humeur
         moodCounters: {},
@@ -88,8 +90,55 @@ function managementDashboard() {
             
             this.loadUserDefaultVisa();  // Charger le visa par défaut
             this.loadDashboardData();
-            // Rafraîchissement automatique toutes les 30 secondes
-            setInterval(() => this.loadDashboardData(), 30000);
+            // Mises à jour poussées par le serveur (SSE), rechargement complet de sécurité
+            this.connectEvents();
+            setInterval(() => this.loadDashboardData(), 300000);
+        },
+        
+        // Connexion au flux des mises à jour (SSE)
+        connectEvents() {
+            if (this.eventSource) this.eventSource.close();
+            if (!window.EventSource) {
+                this.startPolling();
+                return;
+            }
+            
+            this.eventSource = new EventSource(
+                `/management/api/dashboard-events/?mode=custom&date=${this.selectedDate}`
+            );
+            this.eventSource.addEventListener('dashboard', (event) => {
+                this.applyDashboardEvent(JSON.parse(event.data));
+            });
+            this.eventSource.onerror = () => {
+                // Flux refusé ou indisponible (serveur WSGI) : revenir au rafraîchissement périodique
+                if (this.eventSource.readyState === EventSource.CLOSED) {
+                    this.eventSource = null;
+                    this.startPolling();
+                }
+            };
+        },
+        
+        // Rafraîchissement toutes les 30 secondes (sans flux SSE)
+        startPolling() {
+            if (!this.pollingTimer) {
+                this.pollingTimer = setInterval(() => this.loadDashboardData(), 30000);
+            }
+        },
+        
+        // Appliquer les sections modifiées reçues du serveur
+        async applyDashboardEvent(data) {
+            if ('current_kpis' in data) this.kpis = data.current_kpis || {};
+            if ('alerts' in data) this.alerts = data.alerts || [];
+            if ('daily_trends' in data) {
+                this.dailyTrends = data.daily_trends || [];
+                this.updateTrendChart();
+            }
+            
+            // Les listes dépendent des mêmes données (nouveau poste, rouleau, checklist)
+            await this.loadPendingChecklists();
+            await this.loadAllChecklists();
+            await this.loadRecentShifts();
+            await this.loadRecentRolls();
         },
         
         // Chargement des données du dashboard
@@ -582,6 +631,7 @@ function managementDashboard() {
             currentDate.setDate(currentDate.getDate() + days);
             this.selectedDate = currentDate.toISOString().split('T')[0];
             this.loadDashboardData();
+            if (this.eventSource) this.connectEvents();
         },
         
         // Vérifier si on peut aller en avant
@@ -729,6 +779,7 @@ function managementDashboard() {
             this.editMode = false;
             this.dateInput = '';
             this.loadDashboardData();
+            if (this.eventSource) this.connectEvents();
         },
         
         // Afficher les détails d'un rouleau
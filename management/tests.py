@@ -1,3 +1,455 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import date, time as dt_time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from catalog.models import ProductionAlertRule, QualityDefectType, WcmChecklistItem
+from exporting.models import ExportQueueItem
+from planification.models import FabricationOrder, Operator
+from production.models import Roll, Shift
+from quality.models import Controls, RollDefect
+from wcm.models import ChecklistAnswer, ChecklistResponse, LostTimeEntry
+from wcm.services import calculate_and_create_trs
+from .models import (
+    DailyProductionRollup, OperatorProductionRollup, PickListJob, ProductionAlert,
+    ProductionRollup, VacationProductionRollup,
+)
+from .services.alert_service import AlertService
+from .services.checklist_service import ChecklistService
+from .services.dashboard_cache import DashboardCache
+from .services.pick_list_job_service import PickListJobService
+from .services.pick_list_report_builder import PickListReportBuilder
+from .services.pick_list_service import PickListService
+from .services.rollup_service import RollupService
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ManagementTestCase(TestCase):
+    """Données de production minimales, répertoire média temporaire."""
+
+    day = date(2025, 1, 6)
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.operator = Operator.objects.create(first_name='Jean', last_name='Test')
+        self.other_operator = Operator.objects.create(first_name='Marie', last_name='Durand')
+        self.fabrication_order = FabricationOrder.objects.create(order_number='1234')
+        self.blocking = QualityDefectType.objects.create(name='Trou', severity='blocking')
+        self.minor = QualityDefectType.objects.create(name='Pli', severity='non_blocking')
+        self.roll_count = 0
+
+    def create_shift(self, day=None, vacation='Matin', operator=None):
+        return Shift.objects.create(
+            date=day or self.day, operator=operator or self.operator, vacation=vacation,
+            start_time=dt_time(6), end_time=dt_time(14)
+        )
+
+    def create_roll(self, shift, **kwargs):
+        self.roll_count += 1
+        values = {
+            'fabrication_order': self.fabrication_order,
+            'roll_number': self.roll_count,
+            'shift': shift,
+            'status': 'CONFORME',
+            'length': Decimal('100'),
+            'tube_mass': Decimal('1'),
+            'total_mass': Decimal('81'),
+        }
+        values.update(kwargs)
+        return Roll.objects.create(**values)
+
+
+class RollupServiceTests(ManagementTestCase):
+    """Cumuls de production comparés au calcul poste par poste."""
+
+    def create_production(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            shifts = [
+                self.create_shift(vacation='Matin'),
+                self.create_shift(vacation='ApresMidi', operator=self.other_operator),
+                self.create_shift(vacation='Nuit'),
+            ]
+            for index, shift in enumerate(shifts):
+                for number in range(index + 2):
+                    roll = self.create_roll(shift, length=Decimal('120'))
+                    if number == 0:
+                        RollDefect.objects.create(
+                            roll=roll, defect_type=self.blocking if index else self.minor,
+                            meter_position=3, side_position='GG'
+                        )
+                LostTimeEntry.objects.create(shift=shift, motif='Casse', duration=15 * (index + 1))
+                # Dernier poste sans TRS enregistré
+                if index < 2:
+                    calculate_and_create_trs(shift)
+        return shifts
+
+    def expected_rollup(self, shifts):
+        """Ancien calcul : parcours des postes, de leurs rouleaux, défauts et arrêts."""
+        with_trs = [shift for shift in shifts if hasattr(shift, 'trs')]
+        return {
+            'shifts_count': len(shifts),
+            'trs_count': len(with_trs),
+            'avg_trs': sum(float(shift.trs.trs_percentage) for shift in with_trs) / len(with_trs) if with_trs else 0,
+            'total_production': sum(shift.trs.total_length for shift in with_trs),
+            'rolls_count': sum(shift.rolls.count() for shift in shifts),
+            'defects_count': RollDefect.objects.filter(roll__shift__in=shifts).count(),
+            'blocking_defects_count': RollDefect.objects.filter(
+                roll__shift__in=shifts, defect_type__severity='blocking'
+            ).count(),
+            'lost_time': sum(entry.duration for entry in LostTimeEntry.objects.filter(shift__in=shifts)),
+        }
+
+    def actual_rollup(self, rollup):
+        return {
+            'shifts_count': rollup.shifts_count,
+            'trs_count': rollup.trs_count,
+            'avg_trs': rollup.avg_trs,
+            'total_production': rollup.total_production,
+            'rolls_count': rollup.rolls_count,
+            'defects_count': rollup.defects_count,
+            'blocking_defects_count': rollup.blocking_defects_count,
+            'lost_time': rollup.lost_time,
+        }
+
+    def test_rollups_match_per_shift_computation(self):
+        shifts = [Shift.objects.get(pk=shift.pk) for shift in self.create_production()]
+
+        actual = self.actual_rollup(DailyProductionRollup.objects.get(date=self.day))
+        expected = self.expected_rollup(shifts)
+        self.assertAlmostEqual(actual.pop('avg_trs'), expected.pop('avg_trs'), places=2)
+        self.assertEqual(actual, expected)
+
+        for vacation_rollup in VacationProductionRollup.objects.filter(date=self.day):
+            vacation_shifts = [shift for shift in shifts if shift.vacation == vacation_rollup.vacation]
+            self.assertEqual(vacation_rollup.rolls_count, self.expected_rollup(vacation_shifts)['rolls_count'])
+
+        operator_rollups = {
+            (rollup.vacation, rollup.operator_id): rollup.rolls_count
+            for rollup in OperatorProductionRollup.objects.filter(date=self.day)
+        }
+        self.assertEqual(operator_rollups, {
+            ('Matin', self.operator.id): 2,
+            ('ApresMidi', self.other_operator.id): 3,
+            ('Nuit', self.operator.id): 4,
+        })
+
+    def test_rebuild_gives_same_rollups(self):
+        self.create_production()
+        before = self.actual_rollup(DailyProductionRollup.objects.get(date=self.day))
+
+        DailyProductionRollup.objects.all().delete()
+        RollupService.rebuild()
+
+        self.assertEqual(self.actual_rollup(DailyProductionRollup.objects.get(date=self.day)), before)
+
+    def test_moving_roll_updates_both_days(self):
+        shift = self.create_production()[0]
+        next_day = self.day + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            other_shift = self.create_shift(day=next_day)
+        roll = shift.rolls.first()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            roll.shift = other_shift
+            roll.save()
+
+        self.assertEqual(DailyProductionRollup.objects.get(date=self.day).rolls_count, 8)
+        self.assertEqual(DailyProductionRollup.objects.get(date=next_day).rolls_count, 1)
+
+    def test_fallback_trs_is_weighted_by_production(self):
+        self.assertEqual(ProductionRollup.compute_avg_trs(Decimal('150'), 2), 75)
+        self.assertEqual(
+            ProductionRollup.compute_avg_trs(0, 0, fallback_trs_sum=Decimal('7000'), fallback_length=Decimal('100')),
+            70
+        )
+        self.assertEqual(ProductionRollup.compute_avg_trs(0, 0), 0)
+
+
+class AlertServiceTests(ManagementTestCase):
+    """Évaluation des règles d'alerte de production."""
+
+    def setUp(self):
+        super().setUp()
+        ProductionAlertRule.objects.update(is_active=False)
+
+    def create_rule(self, **kwargs):
+        values = {
+            'code': 'lost_time_shift',
+            'name': 'Temps perdu élevé',
+            'scope': 'shift',
+            'metric': 'lost_time',
+            'comparison': 'above',
+            'threshold': Decimal('30'),
+            'danger_threshold': Decimal('60'),
+            'message': 'Poste {shift_id} : {value} min perdues (seuil {threshold})',
+        }
+        values.update(kwargs)
+        return ProductionAlertRule.objects.create(**values)
+
+    def test_shift_rule_severity_and_message(self):
+        rule = self.create_rule()
+        shifts = {duration: self.create_shift(vacation=vacation) for duration, vacation in
+                  ((20, 'Matin'), (45, 'ApresMidi'), (90, 'Nuit'))}
+        for duration, shift in shifts.items():
+            LostTimeEntry.objects.create(shift=shift, motif='Casse', duration=duration)
+
+        self.assertEqual(AlertService.refresh_dates([self.day]), 2)
+
+        alerts = {alert.shift_id: alert for alert in ProductionAlert.objects.filter(rule=rule)}
+        self.assertNotIn(shifts[20].id, alerts)
+        self.assertEqual(alerts[shifts[45].id].severity, 'warning')
+        self.assertEqual(alerts[shifts[90].id].severity, 'danger')
+        self.assertEqual(
+            alerts[shifts[45].id].message,
+            f'Poste {shifts[45].shift_id} : 45 min perdues (seuil 30.0)'
+        )
+
+    def test_day_rule_reads_daily_rollup(self):
+        self.create_rule(code='blocking_day', scope='day', metric='blocking_defects',
+                         threshold=Decimal('1'), danger_threshold=None, message='{date} : {value} défauts')
+        with self.captureOnCommitCallbacks(execute=True):
+            shift = self.create_shift()
+            for position in (1, 2):
+                RollDefect.objects.create(
+                    roll=self.create_roll(shift), defect_type=self.blocking,
+                    meter_position=position, side_position='GG'
+                )
+
+        alert = ProductionAlert.objects.get(rule__code='blocking_day')
+        self.assertEqual((alert.shift, alert.date, alert.message), (None, self.day, '06/01/2025 : 2 défauts'))
+
+    def test_refresh_replaces_previous_alerts(self):
+        rule = self.create_rule()
+        shift = self.create_shift()
+        entry = LostTimeEntry.objects.create(shift=shift, motif='Casse', duration=45)
+        AlertService.refresh_dates([self.day])
+
+        entry.duration = 10
+        entry.save(update_fields=['duration'])
+        AlertService.refresh_dates([self.day])
+
+        self.assertFalse(ProductionAlert.objects.filter(rule=rule).exists())
+
+    def test_long_message_is_truncated(self):
+        # Règle enregistrée sans validation (clean() refuse ce message)
+        self.create_rule(message='{value:>300}')
+        shift = self.create_shift()
+        LostTimeEntry.objects.create(shift=shift, motif='Casse', duration=45)
+
+        AlertService.refresh_dates([self.day])
+
+        self.assertEqual(
+            len(ProductionAlert.objects.get().message),
+            ProductionAlert._meta.get_field('message').max_length
+        )
+
+
+class PickListTestCase(ManagementTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.shift = self.create_shift()
+        self.rolls = [self.create_roll(self.shift) for _ in range(2)]
+        self.roll_ids = [roll.id for roll in self.rolls]
+
+    def get_cache_key(self, report_name='S2501001'):
+        return PickListService.get_cache_key(report_name, [
+            (roll_id, version) for roll_id, version, _, _ in PickListReportBuilder.get_roll_summaries(self.roll_ids)
+        ])
+
+
+class PickListCacheKeyTests(PickListTestCase):
+    """Empreinte des pick-lists en cache."""
+
+    def test_key_is_stable_without_changes(self):
+        self.assertEqual(self.get_cache_key(), self.get_cache_key())
+        self.assertNotEqual(self.get_cache_key(), self.get_cache_key('S2501002'))
+
+    def test_roll_change_invalidates_key(self):
+        key = self.get_cache_key()
+
+        self.rolls[0].comment = 'Corrigé'
+        self.rolls[0].save()
+
+        self.assertNotEqual(self.get_cache_key(), key)
+
+    def test_defect_changes_invalidate_key(self):
+        key = self.get_cache_key()
+
+        # bulk_create : pas de post_save, Roll.updated_at inchangé
+        RollDefect.objects.bulk_create([
+            RollDefect(roll=self.rolls[0], defect_type=self.minor, meter_position=5, side_position='GG')
+        ])
+        with_defect = self.get_cache_key()
+        self.assertNotEqual(with_defect, key)
+
+        defect = RollDefect.objects.get()
+        defect.side_position = 'DD'
+        defect.save()
+        self.assertNotEqual(self.get_cache_key(), with_defect)
+
+        RollDefect.objects.all().delete()
+        self.assertEqual(self.get_cache_key(), key)
+
+    def test_quality_control_changes_invalidate_key(self):
+        key = self.get_cache_key()
+
+        control = Controls.objects.create(shift=self.shift, session_key='tablette', dry_extract=Decimal('1.5'))
+        with_control = self.get_cache_key()
+        self.assertNotEqual(with_control, key)
+
+        Controls.objects.filter(pk=control.pk).update(dry_extract=Decimal('2.5'))
+        self.assertNotEqual(self.get_cache_key(), with_control)
+
+
+class PickListJobServiceTests(PickListTestCase):
+    """Demandes de pick-list : réservation par un worker, fin de traitement."""
+
+    def test_claim_is_exclusive(self):
+        job = PickListJob.objects.create(report_name='S2501001', roll_ids=self.roll_ids)
+
+        self.assertTrue(PickListJobService._claim(job))
+        self.assertEqual((job.status, job.attempts), ('running', 1))
+        self.assertFalse(PickListJobService._claim(PickListJob.objects.get(pk=job.pk)))
+
+    def test_claim_next_takes_oldest_pending(self):
+        first = PickListJob.objects.create(report_name='S2501001', roll_ids=self.roll_ids)
+        second = PickListJob.objects.create(report_name='S2501002', roll_ids=self.roll_ids)
+
+        self.assertEqual(PickListJobService.claim_next(), first)
+        self.assertEqual(PickListJobService.claim_next(), second)
+        self.assertIsNone(PickListJobService.claim_next())
+
+    def test_stale_job_is_requeued_then_failed(self):
+        job = PickListJob.objects.create(
+            report_name='S2501001', roll_ids=self.roll_ids, status='running',
+            started_at=timezone.now() - PickListJobService.stale_after - timedelta(minutes=1)
+        )
+
+        PickListJobService.requeue_stale()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+
+        PickListJob.objects.filter(pk=job.pk).update(
+            status='running', attempts=PickListJobService.max_attempts,
+            started_at=timezone.now() - PickListJobService.stale_after - timedelta(minutes=1)
+        )
+        PickListJobService.requeue_stale()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+    def test_complete_assigns_rolls_with_side_effects(self):
+        job = PickListJob.objects.create(report_name='S2501001', roll_ids=self.roll_ids)
+        ExportQueueItem.objects.all().delete()
+        version = DashboardCache.get_data_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PickListJobService._complete(job, '/tmp/S2501001.pdf', 'OK', self.roll_ids, 200.0, ['1234'])
+
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(
+            set(Roll.objects.filter(id__in=self.roll_ids).values_list('preshipper_assigned', flat=True)),
+            {'S2501001'}
+        )
+        self.assertEqual(
+            set(ExportQueueItem.objects.filter(kind='roll').values_list('object_id', flat=True)),
+            set(self.roll_ids)
+        )
+        self.assertNotEqual(DashboardCache.get_data_version(), version)
+
+    def test_complete_refuses_name_taken_meanwhile(self):
+        first = PickListJob.objects.create(report_name='S2501001', roll_ids=self.roll_ids[:1])
+        second = PickListJob.objects.create(report_name='S2501001', roll_ids=self.roll_ids[1:])
+        PickListJobService._complete(first, '/tmp/a.pdf', 'OK', self.roll_ids[:1], 100.0, ['1234'])
+
+        PickListJobService._complete(second, '/tmp/b.pdf', 'OK', self.roll_ids[1:], 100.0, ['1234'])
+
+        self.assertEqual(second.status, 'failed')
+        self.assertIsNone(Roll.objects.get(pk=self.roll_ids[1]).preshipper_assigned)
+
+    def test_run_generates_pdf_and_reprint_uses_cache(self):
+        job = PickListJobService.enqueue(self.roll_ids, 'S2501001')
+        self.assertEqual(job.status, 'pending')
+
+        self.assertEqual(PickListJobService.process_pending(), {'done': 1, 'failed': 0})
+        job.refresh_from_db()
+        self.assertTrue(os.path.exists(job.file_path))
+        self.assertEqual((job.rolls_count, job.total_length, job.unique_ofs), (2, 200.0, ['1234']))
+
+        # Réimpression à l'identique : terminée sans passer par le worker
+        reprint = PickListJobService.enqueue(self.roll_ids, 'S2501001')
+        self.assertEqual((reprint.status, reprint.file_path), ('done', job.file_path))
+
+        # Nouveau défaut : le PDF en cache n'est plus valable
+        RollDefect.objects.bulk_create([
+            RollDefect(roll=self.rolls[0], defect_type=self.minor, meter_position=5, side_position='GG')
+        ])
+        self.assertEqual(PickListJobService.enqueue(self.roll_ids, 'S2501001').status, 'pending')
+
+
+class ChecklistServiceTests(ManagementTestCase):
+    """Statistiques des check-lists, calculées sur les réponses normalisées."""
+
+    def setUp(self):
+        super().setUp()
+        self.safety = WcmChecklistItem.objects.create(text='EPI portés', category='Sécurité')
+        self.uncategorized = WcmChecklistItem.objects.create(text='Poste rangé', category='')
+        self.removed = WcmChecklistItem.objects.create(text='Ancien contrôle', category='Qualité')
+
+    def create_checklist(self, responses):
+        # Une check-list par poste
+        shift = self.create_shift(day=self.day + timedelta(days=ChecklistResponse.objects.count()))
+        return ChecklistResponse.objects.create(shift=shift, operator=self.operator, responses=responses)
+
+    def test_answers_follow_checklist_saves(self):
+        checklist = self.create_checklist({
+            str(self.safety.id): 'ok', str(self.removed.id): 'nok', '_comments': {str(self.removed.id): 'Cassé'}
+        })
+        self.assertEqual(
+            set(checklist.answers.values_list('item_id', 'value', 'comment')),
+            {(self.safety.id, 'ok', ''), (self.removed.id, 'nok', 'Cassé')}
+        )
+
+        checklist.responses[str(self.safety.id)] = 'na'
+        checklist.save()
+        self.assertEqual(checklist.answers.get(item_id=self.safety.id).value, 'na')
+
+        ChecklistService.add_management_visa(checklist.id, 'jd')
+        self.assertEqual(ChecklistAnswer.objects.filter(checklist=checklist).count(), 2)
+
+    def test_details_statistics(self):
+        checklist = self.create_checklist({
+            str(self.safety.id): 'ok', str(self.uncategorized.id): 'nok', str(self.removed.id): 'na'
+        })
+
+        statistics = ChecklistService.get_checklist_details(checklist.id)['statistics']
+
+        self.assertEqual(
+            (statistics['total_items'], statistics['ok_count'], statistics['nok_count'], statistics['na_count']),
+            (3, 1, 1, 1)
+        )
+
+    def test_non_conformities_by_category(self):
+        self.create_checklist({str(self.safety.id): 'nok', str(self.uncategorized.id): 'ok', str(self.removed.id): 'nok'})
+        self.create_checklist({str(self.safety.id): 'ok', str(self.removed.id): 'nok'})
+        self.removed.delete()
+
+        analysis = ChecklistService._analyze_non_conformities(ChecklistResponse.objects.all())
+
+        self.assertEqual((analysis['total_nok'], analysis['checklists_with_nok']), (3, 2))
+        self.assertEqual(analysis['categories'], [
+            # Item supprimé du catalogue regroupé avec les items sans catégorie
+            {'category': 'Sans catégorie', 'answers_count': 3, 'nok_count': 2, 'nok_rate': 66.7},
+            {'category': 'Sécurité', 'answers_count': 2, 'nok_count': 1, 'nok_rate': 50.0},
+        ])
+        self.assertEqual(analysis['top_nok_items'][0], {'count': 2, 'label': 'Item inconnu', 'category': 'Inconnu'})
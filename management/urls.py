@@ -25,6 +25,7 @@ urlpatterns = [
     # API endpoints
     path('api/', include(router.urls)),
     path('api/dashboard-stats/', api_views.dashboard_statistics, name='api-dashboard-stats'),
+    path('api/dashboard-events/', api_views.dashboard_events, name='api-dashboard-events'),
     path('api/checklists/', api_views.all_checklists, name='api-all-checklists'),
     path('api/checklists/pending/', api_views.pending_checklists, name='api-pending-checklists'),
     path('api/checklists/statistics/', api_views.checklist_statistics, name='api-checklist-statistics'),
@@ -40,6 +41,8 @@ urlpatterns = [
     path('api/shifts/<int:pk>/', api_views.shift_details, name='api-shift-details'),
     path('api/conforming-rolls/', api_views.conforming_rolls_list, name='api-conforming-rolls'),
     path('api/generate-control-report/', api_views.generate_control_report, name='api-generate-control-report'),
+    path('api/pick-list-jobs/<int:pk>/', api_views.pick_list_job_status, name='api-pick-list-job-status'),
+    path('api/pick-list-jobs/<int:pk>/download/', api_views.pick_list_job_download, name='api-pick-list-job-download'),
     path('api/unassign-roll/', api_views.unassign_roll, name='api-unassign-roll'),
     path('api/formations-recap/', api_views.formations_recap, name='api-formations-recap'),
 ]
\ No newline at end of file
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Shift, Roll, CurrentProfile
+from .models import Shift, Roll, CurrentProfile, RollNumber
 from quality.models import RollThickness, RollDefect
 
 
@@ -251,4 +251,14 @@ class CurrentProfileAdmin(admin.ModelAdmin):
     
     def has_delete_permission(self, request, obj=None):
         """Empêche la suppression."""
-        return False
\ No newline at end of file
+        return False
+
+@admin.register(RollNumber)
+class RollNumberAdmin(admin.ModelAdmin):
+    """Administration des numéros de rouleaux attribués par OF."""
+    
+    list_display = ['of_number', 'number', 'roll', 'session_key', 'reserved_at']
+    list_filter = ['of_number']
+    search_fields = ['of_number']
+    readonly_fields = ['reserved_at']
+    raw_id_fields = ['roll']
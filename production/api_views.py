@@ -3,9 +3,9 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.decorators import action, api_view
 from rest_framework.views import APIView
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.conf import settings
-from .models import Roll, Shift, CurrentProfile
+from .models import Roll, Shift, CurrentProfile, RollNumber
 from .serializers import RollSerializer, ShiftSerializer
 from .services import roll_service, shift_service
 
@@ -90,14 +90,18 @@ class RollViewSet(viewsets.ModelViewSet):
         
         return queryset.order_by('-created_at')
     
-    @action(detail=False, methods=['GET'], url_path='next-number')
+    @action(detail=False, methods=['GET', 'POST'], url_path='next-number')
     def next_number(self, request):
         """
         Récupère le prochain numéro de rouleau disponible pour un OF donné.
         
         Trouve le premier numéro manquant dans la séquence.
+        - GET : aperçu en lecture seule, rien n'est réservé (un rechargement
+          de page ou un préchargement ne consomme pas de numéro)
+        - POST : réserve le numéro pour la session, pour qu'une autre
+          tablette ne reçoive pas le même
         """
-        of_number = request.query_params.get('of')
+        of_number = request.data.get('of') or request.query_params.get('of')
         
         if not of_number:
             return Response(
@@ -105,31 +109,20 @@ class RollViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Récupérer tous les numéros de rouleaux existants pour cet OF
-        existing_rolls = Roll.objects.filter(
-            roll_id__startswith=f"{of_number}_"
-        ).values_list('roll_id', flat=True)
-        
-        # Extraire les numéros existants
-        existing_numbers = []
-        for roll_id in existing_rolls:
+        if request.method == 'GET':
+            next_number = RollNumber.objects.first_free_number(of_number)
+        else:
+            # Réserver le premier numéro libre pour cette tablette
+            if not request.session.session_key:
+                request.session.save()
+            
             try:
-                # Format: OF_NNN
-                parts = roll_id.split('_')
-                if len(parts) == 2:
-                    existing_numbers.append(int(parts[1]))
-            except (ValueError, IndexError):
-                continue
-        
-        existing_numbers.sort()
-        
-        # Trouver le premier numéro manquant
-        next_number = 1
-        for num in existing_numbers:
-            if num == next_number:
-                next_number += 1
-            elif num > next_number:
-                break
+                next_number = RollNumber.objects.reserve(of_number, request.session.session_key)
+            except IntegrityError:
+                return Response(
+                    {'detail': 'Numéro de rouleau indisponible, veuillez réessayer'},
+                    status=status.HTTP_409_CONFLICT
+                )
         
         # Formater avec 3 chiffres
         formatted_number = str(next_number).zfill(3)
@@ -6,7 +6,5 @@ class ProductionConfig(AppConfig):
     name = 'production'
     
     def ready(self):
-        """Charge les signaux au démarrage de l'application."""
-        # Temporairement désactivé pour debug de l'erreur 400
-        # import production.signals
-        pass
+        """Charge les signaux au démarrage de l'application (termes de recherche des rouleaux)."""
+        import production.signals
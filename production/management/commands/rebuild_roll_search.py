@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from production.models import Roll, RollSearchTerm
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les termes de recherche des rouleaux (sélection des pick-lists)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Nombre de rouleaux traités par lot (défaut: 2000)',
+        )
+    
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        roll_ids = list(Roll.objects.order_by('id').values_list('id', flat=True))
+        
+        for start in range(0, len(roll_ids), batch_size):
+            RollSearchTerm.objects.index_rolls(
+                Roll.objects.filter(id__in=roll_ids[start:start + batch_size])
+            )
+        
+        self.stdout.write(self.style.SUCCESS(f'✓ {len(roll_ids)} rouleau(x) réindexé(s)'))
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:59
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def register_existing_roll_numbers(apps, schema_editor):
+    """Enregistre les numéros déjà utilisés par les rouleaux existants (OF_NNN)."""
+    Roll = apps.get_model('production', 'Roll')
+    RollNumber = apps.get_model('production', 'RollNumber')
+    pattern = re.compile(r'^([^_]+)_(\d+)$')
+    
+    allocations = []
+    rolls = Roll.objects.values_list('roll_id', 'id', 'fabrication_order__order_number', 'roll_number')
+    for roll_id, roll_pk, of_number, number in rolls.iterator():
+        if not (of_number and number):
+            # Anciens rouleaux sans numéro renseigné : lu dans le roll_id
+            match = pattern.match(roll_id or '')
+            if not match:
+                continue
+            of_number, number = match.group(1), int(match.group(2))
+        allocations.append(RollNumber(of_number=of_number, number=number, roll_id=roll_pk))
+    
+    RollNumber.objects.bulk_create(allocations, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('production', '0006_remove_shift_is_bi_autonomie_training_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollNumber',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('of_number', models.CharField(max_length=50, verbose_name='N° OF')),
+                ('number', models.PositiveIntegerField(verbose_name='N° Rouleau')),
+                ('session_key', models.CharField(blank=True, help_text='Session ayant réservé le numéro', max_length=255, null=True)),
+                ('reserved_at', models.DateTimeField(auto_now=True, verbose_name='Réservé le')),
+                ('roll', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='number_allocation', to='production.roll', verbose_name='Rouleau')),
+            ],
+            options={
+                'verbose_name': 'Numéro de rouleau',
+                'verbose_name_plural': 'Numéros de rouleaux',
+                'ordering': ['of_number', 'number'],
+                'unique_together': {('of_number', 'number')},
+            },
+        ),
+        migrations.RunPython(register_existing_roll_numbers, migrations.RunPython.noop),
+    ]
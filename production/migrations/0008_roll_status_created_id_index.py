@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planification', '0001_initial'),
+        ('production', '0007_rollnumber'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='roll',
+            name='production__status_26e845_idx',
+        ),
+        migrations.AddIndex(
+            model_name='roll',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='production__status_18741a_idx'),
+        ),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:13
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Copie figée des fonctions de production.models.roll_search à la date de
+# la migration : leurs évolutions ne doivent pas modifier ce remplissage.
+SEARCH_SOURCE_FIELDS = [
+    'fabrication_order__order_number',
+    'shift__operator__first_name',
+    'shift__operator__last_name',
+    'shift__shift_id',
+    'shift_id_str',
+    'created_at',
+]
+
+
+def normalize_search_text(value):
+    value = unicodedata.normalize('NFKD', str(value or ''))
+    return ''.join(c for c in value if not unicodedata.combining(c)).lower().strip()
+
+
+def split_search_text(value):
+    return [word for word in re.split(r'[^0-9a-z]+', normalize_search_text(value)) if word]
+
+
+def build_search_terms(of_number=None, first_name=None, last_name=None, shift_id=None,
+                       shift_id_str=None, created_at=None):
+    if first_name is None and last_name is None and shift_id_str:
+        parts = shift_id_str.split('_')
+        last_name = parts[1] if len(parts) > 1 else None
+    shift_id = shift_id or shift_id_str
+    
+    terms = set()
+    
+    if of_number:
+        terms.add(('of', normalize_search_text(of_number)))
+        terms.update(('of', word) for word in split_search_text(of_number))
+    
+    if first_name or last_name:
+        terms.update(('operator', word) for word in split_search_text(f"{first_name or ''} {last_name or ''}"))
+        terms.add(('operator', ''.join(split_search_text(f"{first_name or ''}{last_name or ''}"))))
+    
+    if shift_id:
+        terms.add(('shift', normalize_search_text(shift_id)))
+        terms.update(('shift', word) for word in split_search_text(shift_id))
+    
+    if created_at:
+        terms.add(('date', timezone.localtime(created_at).date().isoformat()))
+    
+    return {(kind, term[:100]) for kind, term in terms if term}
+
+
+def index_existing_rolls(apps, schema_editor):
+    """Calcule les termes de recherche des rouleaux existants."""
+    Roll = apps.get_model('production', 'Roll')
+    RollSearchTerm = apps.get_model('production', 'RollSearchTerm')
+    
+    entries = []
+    for roll_id, *values in Roll.objects.values_list('id', *SEARCH_SOURCE_FIELDS).iterator():
+        entries.extend(
+            RollSearchTerm(roll_id=roll_id, kind=kind, term=term)
+            for kind, term in build_search_terms(*values)
+        )
+        if len(entries) >= 5000:
+            RollSearchTerm.objects.bulk_create(entries)
+            entries = []
+    
+    RollSearchTerm.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('production', '0008_roll_status_created_id_index'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='RollSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('of', 'N° OF'), ('operator', 'Opérateur'), ('shift', 'Poste'), ('date', 'Date de création')], max_length=10, verbose_name='Type')),
+                ('term', models.CharField(max_length=100, verbose_name='Terme')),
+                ('roll', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='production.roll', verbose_name='Rouleau')),
+            ],
+            options={
+                'verbose_name': 'Terme de recherche rouleau',
+                'verbose_name_plural': 'Termes de recherche rouleaux',
+                'indexes': [models.Index(fields=['kind', 'term'], name='roll_search_kind_term_idx', opclasses=['varchar_pattern_ops', 'varchar_pattern_ops'])],
+            },
+        ),
+        migrations.RunPython(index_existing_rolls, migrations.RunPython.noop),
+    ]
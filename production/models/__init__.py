@@ -2,5 +2,7 @@
 from .shift import Shift
 from .roll import Roll
 from .current import CurrentProfile
+from .roll_number import RollNumber
+from .roll_search import RollSearchTerm
 
-__all__ = ['Shift', 'Roll', 'CurrentProfile']
\ No newline at end of file
+__all__ = ['Shift', 'Roll', 'CurrentProfile', 'RollNumber', 'RollSearchTerm']
\ No newline at end of file
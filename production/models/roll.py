@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from .shift import Shift
 
 
@@ -221,7 +221,7 @@ class Roll(models.Model):
         ordering = ['-created_at', '-id']
         unique_together = [['shift', 'roll_number']]
         indexes = [
-            models.Index(fields=['status', '-created_at']),
+            models.Index(fields=['status', '-created_at', '-id']),
             models.Index(fields=['fabrication_order', 'roll_number']),
             models.Index(fields=['session_key', '-created_at']),
         ]
@@ -229,6 +229,25 @@ class Roll(models.Model):
     def __str__(self):
         return f"{self.roll_id} - {self.length}m" if self.length else self.roll_id
     
+    # Champs dont la valeur chargée est conservée (maintenance à la sauvegarde)
+    TRACKED_FIELDS = ['roll_id', 'fabrication_order_id', 'shift_id', 'shift_id_str']
+    
+    # Sources des termes de recherche modifiables sur un rouleau existant
+    SEARCH_TRACKED_FIELDS = ['fabrication_order_id', 'shift_id', 'shift_id_str']
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.TRACKED_FIELDS
+        }
+        return instance
+    
+    def _has_changed(self, field_name):
+        """Valeur modifiée depuis le chargement (toujours vrai pour un nouveau rouleau)."""
+        loaded = getattr(self, '_loaded_values', {})
+        return field_name not in loaded or loaded[field_name] != getattr(self, field_name)
+    
     def save(self, *args, **kwargs):
         """Génère ou met à jour automatiquement le roll_id."""
         # Toujours recalculer si on a OF et numéro
@@ -243,4 +262,22 @@ class Roll(models.Model):
             now = datetime.now()
             self.roll_id = f"ROLL_{now.strftime('%Y%m%d_%H%M%S')}"
         
-        super().save(*args, **kwargs)
\ No newline at end of file
+        created = self._state.adding
+        roll_id_changed = created or self._has_changed('roll_id')
+        search_changed = created or any(self._has_changed(name) for name in self.SEARCH_TRACKED_FIELDS)
+        
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            
+            # Tenir à jour les numéros attribués de l'OF (seulement si le roll_id change)
+            if roll_id_changed:
+                from .roll_number import RollNumber
+                RollNumber.objects.register_roll(self, created=created)
+        
+        self._loaded_values = {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+        
+        # Tenir à jour la surface de recherche (sélection des pick-lists) :
+        # seulement si l'OF ou le poste change (ou nouveau rouleau)
+        if search_changed:
+            from .roll_search import RollSearchTerm
+            RollSearchTerm.objects.index_rolls([self])
\ No newline at end of file
@@ -0,0 +1,179 @@
+from datetime import timedelta
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import Lead
+from django.utils import timezone
+
+
+class RollNumberManager(models.Manager):
+    """Manager pour l'attribution des numéros de rouleaux."""
+
+    # Durée de vie d'une réservation non utilisée (un poste au plus)
+    reservation_ttl = timedelta(hours=12)
+    max_attempts = 10
+
+    def first_free_number(self, of_number):
+        """
+        Premier numéro libre d'un OF, calculé en SQL sur l'index (OF, numéro).
+
+        Un numéro est libre s'il n'est ni utilisé par un rouleau ni réservé.
+        Les numéros pris sont parcourus une fois dans l'ordre de l'index :
+        LEAD donne le numéro pris suivant, le premier trou est après le
+        premier numéro dont le suivant n'est pas numéro + 1.
+        """
+        taken = self.filter(of_number=of_number)
+        if not taken.filter(number=1).exists():
+            return 1
+
+        gap_start = taken.annotate(
+            next_taken=Window(Lead('number'), order_by=F('number').asc())
+        ).filter(
+            Q(next_taken__isnull=True) | ~Q(next_taken=F('number') + 1)
+        ).order_by('number').values_list('number', flat=True).first()
+        return gap_start + 1
+
+    def reserve(self, of_number, session_key=None):
+        """
+        Réserver le prochain numéro libre d'un OF pour une session.
+
+        La contrainte unique (OF, numéro) garantit que deux tablettes ne
+        reçoivent jamais le même numéro : en cas de conflit, le numéro
+        suivant est recalculé. Une session qui a déjà une réservation en
+        cours sur l'OF la récupère ; celles qu'elle avait sur un autre OF
+        (changement d'OF sans enregistrer de rouleau) sont libérées.
+
+        Returns:
+            int: Numéro réservé
+        """
+        self.filter(
+            of_number=of_number,
+            roll__isnull=True,
+            reserved_at__lt=timezone.now() - self.reservation_ttl
+        ).delete()
+
+        if session_key:
+            self.filter(
+                session_key=session_key,
+                roll__isnull=True
+            ).exclude(of_number=of_number).delete()
+
+            pending = self.filter(
+                of_number=of_number,
+                session_key=session_key,
+                roll__isnull=True
+            ).order_by('number').first()
+            if pending:
+                pending.save(update_fields=['reserved_at'])
+                return pending.number
+
+        for _ in range(self.max_attempts):
+            number = self.first_free_number(of_number)
+            try:
+                with transaction.atomic():
+                    self.create(of_number=of_number, number=number, session_key=session_key)
+                return number
+            except IntegrityError:
+                # Numéro pris entre-temps par une autre tablette
+                continue
+
+        raise IntegrityError(f"Impossible de réserver un numéro de rouleau pour l'OF {of_number}")
+
+    @staticmethod
+    def get_roll_key(roll):
+        """
+        (N° OF, numéro) d'un rouleau numéroté, sinon None.
+
+        Lu sur l'OF et le numéro du rouleau plutôt que dans le roll_id : un
+        numéro d'OF peut contenir « _ ». Les non conformes (OF_NNN_HHMM)
+        n'ont pas de numéro et n'en consomment pas.
+        """
+        if roll.fabrication_order_id and roll.roll_number:
+            return roll.fabrication_order.order_number, roll.roll_number
+        return None
+
+    def register_roll(self, roll, created=False):
+        """Associer à un rouleau enregistré le numéro de son roll_id."""
+        key = self.get_roll_key(roll)
+
+        if not created:
+            # roll_id modifié : libérer l'ancien numéro
+            stale = self.filter(roll=roll)
+            if key:
+                stale = stale.exclude(of_number=key[0], number=key[1])
+            stale.delete()
+
+        if not key:
+            return
+
+        of_number, number = key
+        updated = self.filter(of_number=of_number, number=number).update(
+            roll=roll, session_key=None
+        )
+        if not updated:
+            try:
+                with transaction.atomic():
+                    self.create(of_number=of_number, number=number, roll=roll)
+            except IntegrityError:
+                # Réservé en parallèle : reprendre la réservation
+                self.filter(of_number=of_number, number=number).update(
+                    roll=roll, session_key=None
+                )
+
+
+class RollNumber(models.Model):
+    """
+    Numéros de rouleaux attribués par OF (utilisés ou réservés).
+
+    Une ligne par numéro : liée au rouleau une fois celui-ci enregistré,
+    ou réservée par la session d'une tablette en attendant. Supprimer le
+    rouleau libère son numéro.
+
+    L'OF est le numéro saisi (texte) et non une clé étrangère vers
+    FabricationOrder : la tablette réserve un numéro avant que l'OF existe
+    (il est créé au premier rouleau enregistré), et le roll_id garde le
+    numéro d'OF avec lequel il a été créé. Supprimer un OF supprime ses
+    rouleaux et donc leurs numéros ; les réservations restantes expirent
+    (reservation_ttl). Renommer un OF déplace le numéro de chaque rouleau
+    à sa prochaine sauvegarde (roll_id recalculé).
+    """
+
+    of_number = models.CharField(
+        max_length=50,
+        verbose_name="N° OF"
+    )
+
+    number = models.PositiveIntegerField(
+        verbose_name="N° Rouleau"
+    )
+
+    roll = models.OneToOneField(
+        'production.Roll',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='number_allocation',
+        verbose_name="Rouleau"
+    )
+
+    session_key = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        help_text="Session ayant réservé le numéro"
+    )
+
+    reserved_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Réservé le"
+    )
+
+    objects = RollNumberManager()
+
+    class Meta:
+        verbose_name = "Numéro de rouleau"
+        verbose_name_plural = "Numéros de rouleaux"
+        ordering = ['of_number', 'number']
+        unique_together = [['of_number', 'number']]
+
+    def __str__(self):
+        return f"{self.of_number}_{self.number:03d}"
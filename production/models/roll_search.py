@@ -0,0 +1,176 @@
+import re
+import unicodedata
+from django.db import connections, models, transaction
+from django.utils import timezone
+from .roll import Roll
+
+
+# Champs sources des termes, dans l'ordre des paramètres de build_search_terms
+SEARCH_SOURCE_FIELDS = [
+    'fabrication_order__order_number',
+    'shift__operator__first_name',
+    'shift__operator__last_name',
+    'shift__shift_id',
+    'shift_id_str',
+    'created_at',
+]
+
+
+def normalize_search_text(value):
+    """Texte de recherche normalisé : minuscules, sans accents."""
+    value = unicodedata.normalize('NFKD', str(value or ''))
+    return ''.join(c for c in value if not unicodedata.combining(c)).lower().strip()
+
+
+def split_search_text(value):
+    """Mots normalisés d'un texte (séparateurs : tout caractère non alphanumérique)."""
+    return [word for word in re.split(r'[^0-9a-z]+', normalize_search_text(value)) if word]
+
+
+def build_search_terms(of_number=None, first_name=None, last_name=None, shift_id=None,
+                       shift_id_str=None, created_at=None):
+    """
+    Termes indexés d'un rouleau, par type.
+    
+    Fonction sans accès base. La migration 0009 en garde une copie figée :
+    reporter une évolution ici n'y touche pas.
+    
+    Returns:
+        set: {(type, terme)}
+    """
+    if first_name is None and last_name is None and shift_id_str:
+        # Rouleau pas encore rattaché à son poste : opérateur lu dans l'identifiant du poste
+        parts = shift_id_str.split('_')
+        last_name = parts[1] if len(parts) > 1 else None
+    shift_id = shift_id or shift_id_str
+    
+    terms = set()
+    
+    if of_number:
+        terms.add(('of', normalize_search_text(of_number)))
+        terms.update(('of', word) for word in split_search_text(of_number))
+    
+    if first_name or last_name:
+        terms.update(('operator', word) for word in split_search_text(f"{first_name or ''} {last_name or ''}"))
+        # Forme accolée, comme dans les identifiants de poste (JeanDupont)
+        terms.add(('operator', ''.join(split_search_text(f"{first_name or ''}{last_name or ''}"))))
+    
+    if shift_id:
+        terms.add(('shift', normalize_search_text(shift_id)))
+        terms.update(('shift', word) for word in split_search_text(shift_id))
+    
+    if created_at:
+        terms.add(('date', timezone.localtime(created_at).date().isoformat()))
+    
+    return {(kind, term[:100]) for kind, term in terms if term}
+
+
+class RollSearchTermManager(models.Manager):
+    """Manager pour la maintenance et l'interrogation des termes de recherche."""
+    
+    def index_rolls(self, rolls):
+        """
+        Recalculer les termes d'une liste (ou QuerySet) de rouleaux.
+        
+        Trois requêtes quel que soit le nombre de rouleaux : lecture des
+        rouleaux avec OF et opérateur, suppression puis insertion des termes.
+        """
+        if isinstance(rolls, models.QuerySet):
+            roll_ids = list(rolls.values_list('id', flat=True))
+        else:
+            roll_ids = [roll.pk for roll in rolls]
+        if not roll_ids:
+            return 0
+        
+        rows = Roll.objects.filter(id__in=roll_ids).values_list('id', *SEARCH_SOURCE_FIELDS)
+        
+        entries = []
+        for roll_id, *values in rows:
+            entries.extend(self.model(roll_id=roll_id, kind=kind, term=term) for kind, term in build_search_terms(*values))
+        
+        with transaction.atomic():
+            self.filter(roll_id__in=roll_ids).delete()
+            self.bulk_create(entries, batch_size=1000)
+        
+        return len(roll_ids)
+    
+    def _prefix_lookup(self, word):
+        """
+        Condition « terme commençant par word », résolue par l'index (type, terme).
+        
+        PostgreSQL : LIKE 'word%' sur l'index varchar_pattern_ops. Autres bases
+        (SQLite, dont le LIKE insensible à la casse ignore les index) :
+        intervalle sur l'ordre binaire, les termes étant en [0-9a-z_].
+        """
+        if connections[self.db].vendor == 'postgresql':
+            return models.Q(term__startswith=word)
+        return models.Q(term__gte=word, term__lt=word + '\x7f')
+    
+    def created_on(self, day):
+        """Sous-requête des rouleaux créés un jour donné (date locale AAAA-MM-JJ)."""
+        return self.filter(kind='date', term=str(day)).values('roll_id')
+    
+    def filter_rolls(self, rolls, kinds, text):
+        """
+        Restreindre un QuerySet de rouleaux à ceux dont chaque mot de text
+        préfixe un terme des types donnés (texte vide : QuerySet inchangé).
+        """
+        for word in split_search_text(text):
+            rolls = rolls.filter(
+                id__in=self.filter(kind__in=kinds).filter(self._prefix_lookup(word)).values('roll_id')
+            )
+        return rolls
+
+
+class RollSearchTerm(models.Model):
+    """
+    Surface de recherche dénormalisée des rouleaux (sélection des pick-lists).
+    
+    Un terme normalisé par ligne (numéro d'OF, nom d'opérateur, identifiant
+    de poste, date de création), indexé par (type, terme) : les filtres par
+    préfixe n'ont plus à joindre OF, postes et opérateurs. Tenue à jour à la
+    sauvegarde des rouleaux, au rattachement aux postes et aux changements
+    de poste ou d'opérateur (rebuild_roll_search pour tout recalculer).
+    """
+    
+    KIND_CHOICES = [
+        ('of', 'N° OF'),
+        ('operator', 'Opérateur'),
+        ('shift', 'Poste'),
+        ('date', 'Date de création'),
+    ]
+    
+    roll = models.ForeignKey(
+        'production.Roll',
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name="Rouleau"
+    )
+    
+    kind = models.CharField(
+        max_length=10,
+        choices=KIND_CHOICES,
+        verbose_name="Type"
+    )
+    
+    term = models.CharField(
+        max_length=100,
+        verbose_name="Terme"
+    )
+    
+    objects = RollSearchTermManager()
+    
+    class Meta:
+        verbose_name = "Terme de recherche rouleau"
+        verbose_name_plural = "Termes de recherche rouleaux"
+        indexes = [
+            # varchar_pattern_ops : recherche par préfixe (LIKE 'x%') indexée sous PostgreSQL
+            models.Index(
+                fields=['kind', 'term'],
+                name='roll_search_kind_term_idx',
+                opclasses=['varchar_pattern_ops', 'varchar_pattern_ops']
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind}:{self.term}"
@@ -4,6 +4,7 @@ from .models import Roll, Shift
 from quality.models import RollThickness, RollDefect
 from catalog.models import QualityDefectType
 from wcm.models import ChecklistResponse
+from .services import roll_service
 
 
 class RollThicknessSerializer(serializers.ModelSerializer):
@@ -134,16 +135,15 @@ class RollSerializer(serializers.ModelSerializer):
         # Les champs de session seront ajoutés dans la vue
         # pour respecter la séparation des responsabilités
         
-        # Créer le rouleau
-        roll = Roll.objects.create(**validated_data)
-        
-        # Créer les épaisseurs
-        for thickness_data in thicknesses_data:
-            RollThickness.objects.create(roll=roll, **thickness_data)
+        # Moyennes et indicateurs calculés avant l'insertion du rouleau
+        thicknesses, defects = roll_service.build_measurements(thicknesses_data, defects_data)
+        validated_data.update(
+            roll_service.calculate_measurement_fields(thicknesses, defects)
+        )
         
-        # Créer les défauts
-        for defect_data in defects_data:
-            RollDefect.objects.create(roll=roll, **defect_data)
+        # Créer le rouleau puis ses mesures en masse
+        roll = Roll.objects.create(**validated_data)
+        roll_service.save_measurements(roll, thicknesses, defects)
         
         return roll
     
@@ -1,8 +1,8 @@
 from decimal import Decimal
 from datetime import timedelta
 from django.db import transaction
-from django.db.models import Avg, Q, Sum
-from .models import Roll, Shift
+from django.db.models import Avg, Q, QuerySet, Sum
+from .models import Roll, RollSearchTerm, Shift
 from quality.models import RollThickness, RollDefect
 from catalog.models import ProfileTemplate
 from wcm.models import LostTimeEntry
@@ -138,6 +138,71 @@ class RollService:
         
         return 'PRODUCTION'
     
+    @staticmethod
+    def build_measurements(thicknesses_data, defects_data):
+        """
+        Prépare les épaisseurs et défauts d'un rouleau sans les enregistrer.
+        
+        Les types de défauts sont chargés en une seule requête et les
+        doublons de la liste de défauts sont ignorés.
+        
+        Returns:
+            tuple: (épaisseurs, défauts) non enregistrés
+        """
+        from catalog.models import QualityDefectType
+        
+        thickness_objects = [RollThickness(**data) for data in thicknesses_data]
+        
+        # Types de défauts référencés par ID
+        type_ids = {
+            data['defect_type_id'] for data in defects_data
+            if data.get('defect_type_id') and not data.get('defect_type')
+        }
+        defect_types = QualityDefectType.objects.in_bulk(type_ids) if type_ids else {}
+        
+        defect_objects = []
+        seen_defects = set()
+        for defect_data in defects_data:
+            defect_data = dict(defect_data)
+            defect_type = defect_data.pop('defect_type', None)
+            defect_type_id = defect_data.pop('defect_type_id', None)
+            if defect_type is None:
+                defect_type = defect_types.get(defect_type_id)
+            
+            # Ignorer les doublons (même type, même position)
+            defect_key = (
+                defect_type.pk if defect_type else defect_type_id,
+                defect_data.get('meter_position'),
+                defect_data.get('side_position')
+            )
+            if defect_key in seen_defects:
+                continue
+            seen_defects.add(defect_key)
+            
+            defect_objects.append(RollDefect(defect_type=defect_type, **defect_data))
+        
+        return thickness_objects, defect_objects
+    
+    def calculate_measurement_fields(self, thicknesses, defects):
+        """Calcule les moyennes d'épaisseur et les indicateurs de conformité du rouleau."""
+        return {
+            'avg_thickness_left': self.calculate_avg_thickness(thicknesses, side='left'),
+            'avg_thickness_right': self.calculate_avg_thickness(thicknesses, side='right'),
+            'has_thickness_issues': self.determine_thickness_issues(thicknesses),
+            'has_blocking_defects': self.determine_blocking_defects(defects),
+        }
+    
+    @staticmethod
+    def save_measurements(roll, thicknesses, defects):
+        """Enregistre les épaisseurs et défauts d'un rouleau (un INSERT par table)."""
+        for measurement in thicknesses + defects:
+            measurement.roll = roll
+        
+        if thicknesses:
+            RollThickness.objects.bulk_create(thicknesses)
+        if defects:
+            RollDefect.objects.bulk_create(defects)
+    
     @transaction.atomic
     def create_roll_with_measurements(self, validated_data, session_data):
         """
@@ -199,55 +264,12 @@ class RollService:
         )
         validated_data['grammage_calc'] = grammage
         
-        # Créer le rouleau
-        roll = Roll.objects.create(**validated_data)
-        
-        # Créer les épaisseurs
-        thickness_objects = []
-        for thickness_data in thicknesses_data:
-            thickness = RollThickness.objects.create(
-                roll=roll,
-                **thickness_data
-            )
-            thickness_objects.append(thickness)
-        
-        # Créer les défauts (en évitant les doublons dans la liste)
-        defect_objects = []
-        seen_defects = set()
-        for defect_data in defects_data:
-            # Créer une clé unique pour détecter les doublons
-            defect_key = (
-                defect_data.get('defect_type_id') or defect_data.get('defect_type'),
-                defect_data.get('meter_position'),
-                defect_data.get('side_position')
-            )
-            
-            # Ignorer si on a déjà vu ce défaut
-            if defect_key in seen_defects:
-                continue
-                
-            seen_defects.add(defect_key)
-            
-            defect = RollDefect.objects.create(
-                roll=roll,
-                **defect_data
-            )
-            defect_objects.append(defect)
-        
-        # Calculer les moyennes d'épaisseur
-        roll.avg_thickness_left = self.calculate_avg_thickness(
-            thickness_objects, side='left'
+        # Préparer les mesures et calculer moyennes et indicateurs avant l'insertion
+        thickness_objects, defect_objects = self.build_measurements(
+            thicknesses_data, defects_data
         )
-        roll.avg_thickness_right = self.calculate_avg_thickness(
-            thickness_objects, side='right'
-        )
-        
-        # Déterminer les problèmes
-        roll.has_thickness_issues = self.determine_thickness_issues(
-            thickness_objects
-        )
-        roll.has_blocking_defects = self.determine_blocking_defects(
-            defect_objects
+        validated_data.update(
+            self.calculate_measurement_fields(thickness_objects, defect_objects)
         )
         
         # Déterminer le statut si non fourni
@@ -255,18 +277,19 @@ class RollService:
             # TODO: Vérifier le grammage par rapport au profil
             grammage_ok = True  # Pour l'instant
             
-            roll.status = self.determine_roll_status(
-                roll.has_thickness_issues,
-                roll.has_blocking_defects,
+            validated_data['status'] = self.determine_roll_status(
+                validated_data['has_thickness_issues'],
+                validated_data['has_blocking_defects'],
                 grammage_ok
             )
         
         # Déterminer la destination si non fournie
         if not validated_data.get('destination'):
-            roll.destination = self.determine_destination(roll.status)
+            validated_data['destination'] = self.determine_destination(validated_data['status'])
         
-        # Sauvegarder les changements
-        roll.save()
+        # Créer le rouleau complet en un seul INSERT, puis ses mesures
+        roll = Roll.objects.create(**validated_data)
+        self.save_measurements(roll, thickness_objects, defect_objects)
         
         return roll
 
@@ -322,37 +345,91 @@ class ShiftService:
         return availability_time if availability_time.total_seconds() > 0 else timedelta(0)
     
     @staticmethod
-    def calculate_production_totals(rolls, shift=None):
+    def aggregate_rolls(rolls):
+        """
+        Calcule les sommes de longueurs et les moyennes des rouleaux d'un poste.
+        
+        Pour un QuerySet, une seule requête d'agrégats conditionnels ; le
+        calcul en Python ne sert que pour une liste de rouleaux en mémoire
+        (non enregistrés).
+        
+        Retourne un dict avec: total_length, ok_length, nok_length,
+        raw_waste_length, avg_thickness_left, avg_thickness_right, avg_grammage
+        """
+        if isinstance(rolls, QuerySet):
+            conforme = Q(status='CONFORME')
+            dechets = Q(destination='DECHETS')
+            aggregates = rolls.aggregate(
+                total_length=Sum('length'),
+                ok_length=Sum('length', filter=conforme),
+                raw_waste_length=Sum('length', filter=~conforme & dechets),
+                nok_length=Sum('length', filter=~conforme & ~dechets),
+                avg_thickness_left=Avg('avg_thickness_left'),
+                avg_thickness_right=Avg('avg_thickness_right'),
+                avg_grammage=Avg('grammage_calc'),
+            )
+            for key in ('total_length', 'ok_length', 'nok_length', 'raw_waste_length'):
+                aggregates[key] = aggregates[key] or 0
+            return aggregates
+        
+        aggregates = {
+            'total_length': 0,
+            'ok_length': 0,
+            'nok_length': 0,
+            'raw_waste_length': 0
+        }
+        thickness_left_values = []
+        thickness_right_values = []
+        grammage_values = []
+        
+        for roll in rolls or []:
+            if roll.length:
+                aggregates['total_length'] += roll.length
+                
+                # Répartir selon le statut ET la destination
+                if roll.status == 'CONFORME':
+                    aggregates['ok_length'] += roll.length
+                elif roll.destination == 'DECHETS':
+                    aggregates['raw_waste_length'] += roll.length
+                else:
+                    aggregates['nok_length'] += roll.length
+            
+            if roll.avg_thickness_left is not None:
+                thickness_left_values.append(roll.avg_thickness_left)
+            if roll.avg_thickness_right is not None:
+                thickness_right_values.append(roll.avg_thickness_right)
+            if roll.grammage_calc is not None:
+                grammage_values.append(roll.grammage_calc)
+        
+        def average(values):
+            return sum(values) / len(values) if values else None
+        
+        aggregates['avg_thickness_left'] = average(thickness_left_values)
+        aggregates['avg_thickness_right'] = average(thickness_right_values)
+        aggregates['avg_grammage'] = average(grammage_values)
+        return aggregates
+    
+    def calculate_production_totals(self, rolls, shift=None, aggregates=None):
         """
         Calcule les totaux de production à partir des rouleaux et de la production enroulée.
         
         Args:
-            rolls: QuerySet des rouleaux du poste
+            rolls: QuerySet des rouleaux du poste (ou liste de rouleaux en mémoire)
             shift: Instance du Shift pour récupérer les métrages début/fin
+            aggregates: Résultat de aggregate_rolls déjà calculé (évite une requête)
             
         Retourne un dict avec: total_length, ok_length, nok_length, raw_waste_length
         """
+        if aggregates is None:
+            aggregates = self.aggregate_rolls(rolls)
+        
         totals = {
-            'total_length': 0,
-            'ok_length': 0,
-            'nok_length': 0,
-            'raw_waste_length': 0
+            'total_length': aggregates['total_length'],
+            'ok_length': aggregates['ok_length'],
+            'nok_length': aggregates['nok_length'],
+            'raw_waste_length': aggregates['raw_waste_length']
         }
         
-        # Calculer les totaux des rouleaux coupés
-        if rolls:
-            for roll in rolls:
-                if roll.length:
-                    totals['total_length'] += roll.length
-                    
-                    # Répartir selon le statut ET la destination
-                    if roll.status == 'CONFORME':
-                        totals['ok_length'] += roll.length
-                    elif roll.destination == 'DECHETS':
-                        totals['raw_waste_length'] += roll.length
-                    else:
-                        totals['nok_length'] += roll.length
-        
         # Gérer la production enroulée début/fin de poste
         if shift:
             # Soustraire la longueur qui était déjà enroulée en début de poste
@@ -373,57 +450,22 @@ class ShiftService:
         
         return totals
     
-    @staticmethod
-    def calculate_shift_averages(rolls):
+    def calculate_shift_averages(self, rolls, aggregates=None):
         """
         Calcule les moyennes du poste à partir des rouleaux.
         Retourne un dict avec: avg_thickness_left, avg_thickness_right, avg_grammage
         """
-        if not rolls:
-            return {
-                'avg_thickness_left_shift': None,
-                'avg_thickness_right_shift': None,
-                'avg_grammage_shift': None
-            }
-        
-        # Collecter les valeurs non nulles
-        thickness_left_values = []
-        thickness_right_values = []
-        grammage_values = []
+        if aggregates is None:
+            aggregates = self.aggregate_rolls(rolls)
         
-        for roll in rolls:
-            if roll.avg_thickness_left is not None:
-                thickness_left_values.append(roll.avg_thickness_left)
-            if roll.avg_thickness_right is not None:
-                thickness_right_values.append(roll.avg_thickness_right)
-            if roll.grammage_calc is not None:
-                grammage_values.append(roll.grammage_calc)
+        def rounded(value, digits):
+            return round(value, digits) if value is not None else None
         
-        # Calculer les moyennes
-        averages = {}
-        
-        if thickness_left_values:
-            averages['avg_thickness_left_shift'] = round(
-                sum(thickness_left_values) / len(thickness_left_values), 2
-            )
-        else:
-            averages['avg_thickness_left_shift'] = None
-        
-        if thickness_right_values:
-            averages['avg_thickness_right_shift'] = round(
-                sum(thickness_right_values) / len(thickness_right_values), 2
-            )
-        else:
-            averages['avg_thickness_right_shift'] = None
-        
-        if grammage_values:
-            averages['avg_grammage_shift'] = round(
-                sum(grammage_values) / len(grammage_values), 1
-            )
-        else:
-            averages['avg_grammage_shift'] = None
-        
-        return averages
+        return {
+            'avg_thickness_left_shift': rounded(aggregates['avg_thickness_left'], 2),
+            'avg_thickness_right_shift': rounded(aggregates['avg_thickness_right'], 2),
+            'avg_grammage_shift': rounded(aggregates['avg_grammage'], 1)
+        }
     
     @transaction.atomic
     def create_shift_with_associations(self, validated_data, session_data):
@@ -550,12 +592,16 @@ class ShiftService:
         
         # Lier les rouleaux au poste via la ForeignKey
         rolls.update(shift=shift)
+        RollSearchTerm.objects.index_rolls(rolls)
+        
+        # Sommes et moyennes des rouleaux en une seule requête
+        aggregates = self.aggregate_rolls(rolls)
         
         # Calculer les totaux de production (incluant la production enroulée)
-        production_totals = self.calculate_production_totals(rolls, shift)
+        production_totals = self.calculate_production_totals(rolls, shift, aggregates)
         
         # Calculer les moyennes
-        averages = self.calculate_shift_averages(rolls)
+        averages = self.calculate_shift_averages(rolls, aggregates)
         shift.avg_thickness_left_shift = averages['avg_thickness_left_shift']
         shift.avg_thickness_right_shift = averages['avg_thickness_right_shift']
         shift.avg_grammage_shift = averages['avg_grammage_shift']
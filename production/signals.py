@@ -1,3 +1,33 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+from planification.models import Operator
+from .models import Shift, Roll, RollSearchTerm
+
+
+@receiver(post_init, sender=Operator)
+def remember_operator_name(sender, instance, **kwargs):
+    instance._search_name = (instance.__dict__.get('first_name'), instance.__dict__.get('last_name'))
+
+
+@receiver(post_save, sender=Shift)
+def update_roll_search_on_shift_change(sender, instance, created, **kwargs):
+    """Réindexer les rouleaux d'un poste modifié (opérateur, identifiant)."""
+    if not created:
+        rolls = Roll.objects.filter(shift=instance)
+        transaction.on_commit(lambda: RollSearchTerm.objects.index_rolls(rolls))
+
+
+@receiver(post_save, sender=Operator)
+def update_roll_search_on_operator_rename(sender, instance, created, **kwargs):
+    """Réindexer les rouleaux d'un opérateur renommé."""
+    name = (instance.first_name, instance.last_name)
+    if not created and name != getattr(instance, '_search_name', name):
+        rolls = Roll.objects.filter(shift__operator=instance)
+        transaction.on_commit(lambda: RollSearchTerm.objects.index_rolls(rolls))
+    instance._search_name = name
+
+
 # Temporairement désactivé pour debug de l'erreur 400
 # from django.db.models.signals import post_save
 # from django.dispatch import receiver
@@ -1,3 +1,164 @@
+from datetime import date, time as dt_time, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.db import IntegrityError
 from django.test import TestCase
+from django.utils import timezone
+
+from planification.models import FabricationOrder, Operator
+from .models import Roll, RollNumber, RollSearchTerm, Shift
+
+
+class ProductionTestMixin:
+    """Opérateur, OF et poste de référence."""
+
+    def setUp(self):
+        super().setUp()
+        self.operator = Operator.objects.create(first_name='Jérôme', last_name='Dupont')
+        self.fabrication_order = FabricationOrder.objects.create(order_number='AB_12')
+        self.shift = Shift.objects.create(
+            date=date(2025, 1, 1), operator=self.operator, vacation='Matin',
+            start_time=dt_time(6), end_time=dt_time(14)
+        )
+
+    def create_roll(self, number, **kwargs):
+        values = {
+            'fabrication_order': self.fabrication_order,
+            'roll_number': number,
+            'shift': self.shift,
+            'length': Decimal('100'),
+            'tube_mass': Decimal('1'),
+            'total_mass': Decimal('81'),
+        }
+        values.update(kwargs)
+        return Roll.objects.create(**values)
+
+
+class RollNumberTests(ProductionTestMixin, TestCase):
+    """Attribution des numéros de rouleaux par OF."""
+
+    def test_first_free_number_fills_gaps(self):
+        self.assertEqual(RollNumber.objects.first_free_number('AB_12'), 1)
+
+        for number in (1, 2, 4):
+            self.create_roll(number)
+
+        self.assertEqual(RollNumber.objects.first_free_number('AB_12'), 3)
+        self.assertEqual(RollNumber.objects.reserve('AB_12'), 3)
+        self.assertEqual(RollNumber.objects.reserve('AB_12'), 5)
+
+    def test_deleting_roll_frees_its_number(self):
+        first = self.create_roll(1)
+        self.create_roll(2)
+
+        first.delete()
+
+        self.assertEqual(RollNumber.objects.reserve('AB_12'), 1)
+
+    def test_renumbering_moves_the_allocation(self):
+        roll = self.create_roll(1)
+
+        roll.roll_number = 7
+        roll.save()
+
+        self.assertEqual(
+            list(RollNumber.objects.filter(of_number='AB_12').values_list('number', 'roll')),
+            [(7, roll.id)]
+        )
+
+    def test_saving_unchanged_roll_id_skips_registration(self):
+        roll = self.create_roll(1)
+        roll.comment = 'Contrôlé'
+
+        with mock.patch.object(RollNumber.objects, 'register_roll') as register_roll:
+            roll.save()
+
+        register_roll.assert_not_called()
+
+    def test_failed_registration_rolls_back_save(self):
+        roll = self.create_roll(1)
+        roll.roll_number = 2
+
+        with mock.patch.object(RollNumber.objects, 'register_roll', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                roll.save()
+
+        self.assertEqual(Roll.objects.get(pk=roll.pk).roll_number, 1)
+
+    def test_session_keeps_its_reservation(self):
+        number = RollNumber.objects.reserve('AB_12', session_key='tablette-1')
+
+        self.assertEqual(RollNumber.objects.reserve('AB_12', session_key='tablette-1'), number)
+        self.assertEqual(RollNumber.objects.reserve('AB_12', session_key='tablette-2'), number + 1)
+
+    def test_expired_reservation_is_released(self):
+        RollNumber.objects.reserve('AB_12', session_key='tablette-1')
+        RollNumber.objects.update(reserved_at=timezone.now() - RollNumber.objects.reservation_ttl - timedelta(minutes=1))
+
+        self.assertEqual(RollNumber.objects.reserve('AB_12', session_key='tablette-2'), 1)
+
+    def test_concurrent_reservation_retries_next_number(self):
+        # Une autre tablette a pris le numéro 1 entre le calcul et l'insertion
+        RollNumber.objects.create(of_number='AB_12', number=1, session_key='tablette-1')
+
+        with mock.patch.object(RollNumber.objects, 'first_free_number', side_effect=[1, 2]):
+            number = RollNumber.objects.reserve('AB_12', session_key='tablette-2')
+
+        self.assertEqual(number, 2)
+        self.assertEqual(
+            list(RollNumber.objects.values_list('number', 'session_key')),
+            [(1, 'tablette-1'), (2, 'tablette-2')]
+        )
+
+    def test_registering_reserved_number_takes_over_reservation(self):
+        RollNumber.objects.reserve('AB_12', session_key='tablette-1')
+
+        roll = self.create_roll(1)
+
+        allocation = RollNumber.objects.get(of_number='AB_12', number=1)
+        self.assertEqual((allocation.roll_id, allocation.session_key), (roll.id, None))
+
+
+class RollSearchTermTests(ProductionTestMixin, TestCase):
+    """Recherche des rouleaux par préfixe (sélection des pick-lists)."""
+
+    def search(self, kinds, text):
+        return set(RollSearchTerm.objects.filter_rolls(Roll.objects.all(), kinds, text))
+
+    def test_prefix_matches_normalized_words(self):
+        roll = self.create_roll(1)
+        other_order = FabricationOrder.objects.create(order_number='XY-99')
+        other = self.create_roll(1, fabrication_order=other_order, shift=None)
+
+        self.assertEqual(self.search(['operator'], 'jer'), {roll})
+        self.assertEqual(self.search(['operator'], 'JÉRÔME dup'), {roll})
+        self.assertEqual(self.search(['of'], 'ab_1'), {roll})
+        self.assertEqual(self.search(['of'], 'xy 99'), {other})
+        self.assertEqual(self.search(['of'], ''), {roll, other})
+
+    def test_only_prefixes_match(self):
+        self.create_roll(1)
+
+        self.assertEqual(self.search(['operator'], 'pont'), set())
+        self.assertEqual(self.search(['operator'], 'dupontx'), set())
+        self.assertEqual(self.search(['of'], 'dup'), set())
+
+    def test_operator_rename_reindexes_rolls(self):
+        roll = self.create_roll(1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.operator.last_name = 'Martin'
+            self.operator.save()
+
+        self.assertEqual(self.search(['operator'], 'martin'), {roll})
+        self.assertEqual(self.search(['operator'], 'dupont'), set())
+
+    def test_comment_save_does_not_reindex(self):
+        roll = self.create_roll(1)
+        roll.comment = 'Contrôlé'
+
+        with mock.patch.object(RollSearchTerm.objects, 'index_rolls') as index_rolls:
+            roll.save()
 
-# Create your tests here.
+        index_rolls.assert_not_called()
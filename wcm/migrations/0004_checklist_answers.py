@@ -0,0 +1,66 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Copie figée de wcm.models.build_checklist_answers à la date de la
+# migration : ses évolutions ne doivent pas modifier ce remplissage.
+def build_checklist_answers(responses):
+    comments = responses.get('_comments') or {}
+    answers = []
+    for key, value in responses.items():
+        if key.startswith('_') or not isinstance(value, str):
+            continue
+        try:
+            item_id = int(key)
+        except ValueError:
+            continue
+        answers.append((item_id, value, comments.get(key) or ''))
+    return answers
+
+
+def fill_checklist_answers(apps, schema_editor):
+    """Calcule les réponses normalisées des check-lists existantes."""
+    ChecklistResponse = apps.get_model('wcm', 'ChecklistResponse')
+    ChecklistAnswer = apps.get_model('wcm', 'ChecklistAnswer')
+
+    answers = []
+    for checklist_id, responses in ChecklistResponse.objects.values_list('id', 'responses').iterator():
+        answers.extend(
+            ChecklistAnswer(checklist_id=checklist_id, item_id=item_id, value=value, comment=comment)
+            for item_id, value, comment in build_checklist_answers(responses or {})
+        )
+        if len(answers) >= 5000:
+            ChecklistAnswer.objects.bulk_create(answers)
+            answers = []
+
+    ChecklistAnswer.objects.bulk_create(answers)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_production_alert_rules'),
+        ('wcm', '0003_add_mood_counter_last_reset'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChecklistAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.CharField(choices=[('ok', 'OK'), ('nok', 'NOK'), ('na', 'N/A')], max_length=10, verbose_name='Réponse')),
+                ('comment', models.TextField(blank=True, verbose_name='Commentaire')),
+                ('checklist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='wcm.checklistresponse', verbose_name='Check-list')),
+                ('item', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='answers', to='catalog.wcmchecklistitem', verbose_name='Item')),
+            ],
+            options={
+                'verbose_name': 'Réponse à un item de check-list',
+                'verbose_name_plural': 'Réponses aux items de check-list',
+                'indexes': [models.Index(fields=['value', 'item'], name='wcm_checkli_value_d6a164_idx')],
+                'unique_together': {('checklist', 'item')},
+            },
+        ),
+        migrations.RunPython(fill_checklist_answers, migrations.RunPython.noop),
+    ]
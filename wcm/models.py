@@ -1,4 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.dispatch import Signal
+
+
+# Émis après la remise à zéro des compteurs d'humeur (argument: reset_at)
+mood_counters_reset = Signal()
 
 
 class Mode(models.Model):
@@ -118,6 +123,9 @@ class MoodCounter(models.Model):
             last_reset_at=now
         )
         
+        # update() n'émet pas post_save : prévenir les caches dépendants
+        mood_counters_reset.send(sender=cls, reset_at=now)
+        
         return now
 
 
@@ -268,6 +276,106 @@ class ChecklistResponse(models.Model):
     
     def __str__(self):
         return f"Checklist - {self.shift}"
+    
+    def save(self, *args, **kwargs):
+        """Enregistrer la check-list et (ré)écrire ses réponses normalisées (ChecklistAnswer)."""
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            # Visa management, etc. : le JSON n'a pas changé
+            if update_fields is None or 'responses' in update_fields:
+                ChecklistAnswer.objects.write_answers(self)
+
+
+def build_checklist_answers(responses):
+    """
+    Réponses par item d'un JSON de check-list (clés numériques de
+    ChecklistResponse.responses, commentaires lus dans _comments).
+    
+    Fonction sans accès base. La migration 0004 en garde une copie figée.
+    
+    Returns:
+        list: [(item_id, valeur, commentaire)]
+    """
+    comments = responses.get('_comments') or {}
+    answers = []
+    for key, value in responses.items():
+        if key.startswith('_') or not isinstance(value, str):
+            continue
+        try:
+            item_id = int(key)
+        except ValueError:
+            continue
+        answers.append((item_id, value, comments.get(key) or ''))
+    return answers
+
+
+class ChecklistAnswerManager(models.Manager):
+    """Manager pour l'écriture des réponses normalisées."""
+    
+    def write_answers(self, checklist):
+        """(Ré)écrire les réponses d'une check-list depuis son JSON."""
+        self.filter(checklist=checklist).delete()
+        return self.bulk_create([
+            self.model(checklist=checklist, item_id=item_id, value=value, comment=comment)
+            for item_id, value, comment in build_checklist_answers(checklist.responses)
+        ])
+
+
+class ChecklistAnswer(models.Model):
+    """
+    Réponse à un item de check-list (une ligne par item).
+    
+    Copie normalisée de ChecklistResponse.responses, écrite en même temps
+    que le JSON : les statistiques de non-conformité sont calculées par
+    requêtes groupées au lieu de parcourir chaque JSON.
+    """
+    
+    VALUE_CHOICES = [
+        ('ok', 'OK'),
+        ('nok', 'NOK'),
+        ('na', 'N/A'),
+    ]
+    
+    checklist = models.ForeignKey(
+        ChecklistResponse,
+        on_delete=models.CASCADE,
+        related_name='answers',
+        verbose_name="Check-list"
+    )
+    
+    # Sans contrainte : la réponse reste rattachée à l'identifiant d'un item supprimé du catalogue
+    item = models.ForeignKey(
+        'catalog.WcmChecklistItem',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='answers',
+        verbose_name="Item"
+    )
+    
+    value = models.CharField(
+        max_length=10,
+        choices=VALUE_CHOICES,
+        verbose_name="Réponse"
+    )
+    
+    comment = models.TextField(
+        blank=True,
+        verbose_name="Commentaire"
+    )
+    
+    objects = ChecklistAnswerManager()
+    
+    class Meta:
+        verbose_name = "Réponse à un item de check-list"
+        verbose_name_plural = "Réponses aux items de check-list"
+        unique_together = [['checklist', 'item']]
+        indexes = [
+            models.Index(fields=['value', 'item']),
+        ]
+    
+    def __str__(self):
+        return f"{self.checklist_id} - item {self.item_id} : {self.value}"
 
 
 class TRS(models.Model):